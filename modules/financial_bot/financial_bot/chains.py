@@ -1,11 +1,15 @@
+import datetime
+import heapq
 import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Dict, List, Optional
 
-import qdrant_client
 from langchain import chains
 from langchain.callbacks.manager import CallbackManagerForChainRun
 from langchain.chains.base import Chain
 from langchain.llms import HuggingFacePipeline
+from qdrant_client.http.models import FieldCondition, Filter, Range
 from unstructured.cleaners.core import (
     clean,
     clean_extra_whitespace,
@@ -89,16 +93,34 @@ class ContextExtractorChain(Chain):
         The number of top matches to retrieve from the vector store.
     embedding_model : EmbeddingModelSingleton
         The embedding model to use for encoding the question.
-    vector_store : qdrant_client.QdrantClient
-        The vector store to search for matches.
+    vector_store : Any
+        The vector store to search for matches: a qdrant_client.QdrantClient or any object
+        with a compatible `search(collection_name, query_vector, limit)` method (and `retrieve`,
+        together with documents_collection).
     vector_collection : str
         The name of the collection to search in the vector store.
+    vector_name : Optional[str]
+        If the collection stores a single point per article with named vectors, the vector to search,
+        e.g., "summary".
+    documents_collection : Optional[str]
+        If the metadata of every article is stored once in a payload-only collection, while the chunks only
+        reference it by "document_id", the name of that collection.
+    partition_granularity : Optional[str]
+        If the news are written into daily ("day") or weekly ("week") collections, named
+        `<vector_collection>__<YYYYMMDD>`, the buckets overlapping the time horizon are searched in parallel
+        and their top-k matches are merged. Otherwise, the `vector_collection` alias only holds the latest bucket.
+    horizon_days : Optional[float]
+        If provided, together with partition_granularity, only the news from the latest N days are searched.
     """
 
     top_k: int = 1
     embedding_model: EmbeddingModelSingleton
-    vector_store: qdrant_client.QdrantClient
+    vector_store: Any
     vector_collection: str
+    vector_name: Optional[str] = None
+    documents_collection: Optional[str] = None
+    partition_granularity: Optional[str] = None
+    horizon_days: Optional[float] = None
 
     @property
     def input_keys(self) -> List[str]:
@@ -117,14 +139,21 @@ class ContextExtractorChain(Chain):
         # pass them through the model and average the embeddings.
         cleaned_question = cleaned_question[: self.embedding_model.max_input_length]
         embeddings = self.embedding_model(cleaned_question)
+        if self.vector_name is not None:
+            embeddings = (self.vector_name, embeddings)
 
         # TODO: Using the metadata, use the filter to take into consideration only the news from the last 24 hours
         # (or other time frame).
-        matches = self.vector_store.search(
-            query_vector=embeddings,
-            k=self.top_k,
-            collection_name=self.vector_collection,
-        )
+        if self.partition_granularity is not None:
+            matches = self.search_partitions(embeddings)
+        else:
+            matches = self.vector_store.search(
+                query_vector=embeddings,
+                limit=self.top_k,
+                collection_name=self.vector_collection,
+            )
+        if self.documents_collection is not None:
+            matches = self.hydrate(matches)
 
         context = ""
         for match in matches:
@@ -134,6 +163,118 @@ class ContextExtractorChain(Chain):
             "context": context,
         }
 
+    def search_partitions(self, query_vector: Any) -> list:
+        """
+        Search the buckets overlapping the time horizon in parallel and merge their top-k matches.
+        """
+
+        if self.partition_granularity not in ("day", "week"):
+            raise ValueError(
+                f"Unknown partition granularity: {self.partition_granularity}. Choose one of ['day', 'week']."
+            )
+
+        from_datetime = None
+        from_start = None
+        if self.horizon_days is not None:
+            from_datetime = datetime.datetime.now(
+                datetime.timezone.utc
+            ) - datetime.timedelta(days=self.horizon_days)
+            from_start = from_datetime.date()
+            if self.partition_granularity == "week":
+                from_start -= datetime.timedelta(days=from_start.weekday())
+
+        prefix = f"{self.vector_collection}__"
+        collection_names = []
+        for collection_name in self.list_collection_names():
+            suffix = collection_name[len(prefix) :]
+            if not collection_name.startswith(prefix) or not suffix.isdigit():
+                continue
+
+            start = datetime.datetime.strptime(suffix, "%Y%m%d").date()
+            if from_start is None or start >= from_start:
+                collection_names.append(collection_name)
+        if len(collection_names) == 0:
+            return []
+
+        # The buckets are aligned to days, hence the start of the horizon is filtered exactly.
+        query_filter = None
+        if from_datetime is not None:
+            query_filter = Filter(
+                must=[
+                    FieldCondition(
+                        key="created_at_timestamp",
+                        range=Range(gte=int(from_datetime.timestamp())),
+                    )
+                ]
+            )
+
+        def search_bucket(collection_name: str) -> list:
+            return self.vector_store.search(
+                query_vector=query_vector,
+                query_filter=query_filter,
+                limit=self.top_k,
+                collection_name=collection_name,
+            )
+
+        with ThreadPoolExecutor(max_workers=min(8, len(collection_names))) as executor:
+            matches = [
+                match
+                for bucket_matches in executor.map(search_bucket, collection_names)
+                for match in bucket_matches
+            ]
+
+        return heapq.nlargest(self.top_k, matches, key=lambda match: match.score)
+
+    def list_collection_names(self) -> List[str]:
+        """
+        List the names of the collections of the vector store.
+        """
+
+        local_client = getattr(self.vector_store, "_client", None)
+        if type(local_client).__name__ == "QdrantLocal":
+            # The local client fails to list its collections.
+            return list(local_client.collections)
+
+        return [
+            collection.name
+            for collection in self.vector_store.get_collections().collections
+        ]
+
+    def hydrate(self, matches: list) -> list:
+        """
+        Merge the metadata of their articles into the payloads of the matches, looked up in a single request.
+        The matches without a document ID (e.g., the points indexed before it was stored) are left as they are.
+        """
+
+        document_ids = {
+            match.payload["document_id"]
+            for match in matches
+            if match.payload.get("document_id") is not None
+        }
+        if len(document_ids) == 0:
+            return matches
+
+        # The document IDs are MD5 hex digests, stored under the equivalent UUID.
+        records = self.vector_store.retrieve(
+            collection_name=self.documents_collection,
+            ids=[str(uuid.UUID(hex=document_id)) for document_id in document_ids],
+            with_payload=True,
+            with_vectors=False,
+        )
+        documents = {
+            record.payload["document_id"]: record.payload for record in records
+        }
+        for match in matches:
+            if match.payload.get("document_id") is None:
+                continue
+
+            match.payload = {
+                **documents.get(match.payload["document_id"], {}),
+                **match.payload,
+            }
+
+        return matches
+
     def clean(self, question: str) -> str:
         """
         Clean the input question by removing unwanted characters.
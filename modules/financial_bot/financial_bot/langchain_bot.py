@@ -1,7 +1,7 @@
 import logging
 import os
 from pathlib import Path
-from typing import Iterable, List, Tuple
+from typing import Any, Iterable, List, Optional, Tuple
 
 from langchain import chains
 from langchain.memory import ConversationBufferWindowMemory
@@ -36,6 +36,17 @@ class FinancialBot:
         model_cache_dir (Path): The directory to use for caching the language model and embedding model.
         streaming (bool): Whether to use the Hugging Face streaming API for inference.
         embedding_model_device (str): The device to use for the embedding model.
+        vector_store (Optional[Any]): The vector store to search, e.g., the local vector store of the streaming
+            pipeline. Any object with a Qdrant-compatible `search` method is accepted. Defaults to a Qdrant client.
+        vector_name (Optional[str]): If the news are stored as a single point per article with named vectors,
+            the vector to search, e.g., "summary". Defaults to None, for one unnamed vector per chunk.
+        documents_collection_name (Optional[str]): If the streaming pipeline stores the metadata of every article
+            once, in a payload-only collection, its name, to hydrate the matches from. Defaults to None.
+        partition_granularity (Optional[str]): If the streaming pipeline writes the news into daily ("day") or
+            weekly ("week") collections, search the buckets within the time horizon in parallel. Otherwise, only
+            the latest bucket is searched, through the collection alias. Defaults to None.
+        horizon_days (Optional[float]): If provided, together with partition_granularity, only the news from
+            the latest N days are searched. Defaults to None.
         debug (bool): Whether to enable debug mode.
 
     Attributes:
@@ -54,6 +65,11 @@ class FinancialBot:
         model_cache_dir: Path = constants.CACHE_DIR,
         streaming: bool = False,
         embedding_model_device: str = "cuda:0",
+        vector_store: Optional[Any] = None,
+        vector_name: Optional[str] = None,
+        documents_collection_name: Optional[str] = None,
+        partition_granularity: Optional[str] = None,
+        horizon_days: Optional[float] = None,
         debug: bool = False,
     ):
         self._llm_model_id = llm_model_id
@@ -64,9 +80,15 @@ class FinancialBot:
         self._llm_inference_temperature = llm_inference_temperature
         self._vector_collection_name = vector_collection_name
         self._vector_db_search_topk = vector_db_search_topk
+        self._vector_name = vector_name
+        self._documents_collection_name = documents_collection_name
+        self._partition_granularity = partition_granularity
+        self._horizon_days = horizon_days
         self._debug = debug
 
-        self._qdrant_client = build_qdrant_client()
+        self._qdrant_client = (
+            vector_store if vector_store is not None else build_qdrant_client()
+        )
 
         self._embd_model = EmbeddingModelSingleton(
             cache_dir=model_cache_dir, device=embedding_model_device
@@ -121,6 +143,10 @@ class FinancialBot:
             embedding_model=self._embd_model,
             vector_store=self._qdrant_client,
             vector_collection=self._vector_collection_name,
+            vector_name=self._vector_name,
+            documents_collection=self._documents_collection_name,
+            partition_granularity=self._partition_granularity,
+            horizon_days=self._horizon_days,
             top_k=self._vector_db_search_topk,
         )
 
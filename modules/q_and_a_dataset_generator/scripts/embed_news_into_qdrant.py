@@ -1,3 +1,6 @@
+# DEPRECATED: embed the news dumps through the streaming pipeline instead, which reuses its optimized flow
+# (cleaning, chunking, batched embeddings & upserts) and scales across workers:
+#   cd ../streaming_pipeline && make run_from_files INPUT_PATH=<path to news_*.json>
 from typing import Dict, Optional, List
 
 import hashlib
@@ -144,6 +147,9 @@ def embed_news_into_qdrant(news_data: List[Dict], n_processes: int = 1) -> None:
 
 if __name__ == '__main__':
     """"""
+    logger.warning(
+        'This script is deprecated. Use `make run_from_files` from the streaming_pipeline module instead.'
+    )
     import json
     with open(NEWS_FILE, 'r') as json_file:
         news_data = json.load(json_file)
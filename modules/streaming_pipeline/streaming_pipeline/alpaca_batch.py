@@ -1,12 +1,14 @@
 import datetime
 import logging
 import os
+import time
 from typing import List, Optional
 
 import requests
 from bytewax.inputs import DynamicInput, StatelessSource
 
 from streaming_pipeline import utils
+from streaming_pipeline.replay import NewsRecorder
 
 logger = logging.getLogger()
 
@@ -102,6 +104,8 @@ def build_alpaca_client(
     api_key: Optional[str] = None,
     api_secret: Optional[str] = None,
     tickers: Optional[List[str]] = None,
+    recorder: Optional[NewsRecorder] = None,
+    news_url: Optional[str] = None,
 ) -> "AlpacaNewsBatchClient":
     """
     Builds an AlpacaNewsBatchClient object with the specified parameters.
@@ -112,6 +116,10 @@ def build_alpaca_client(
         api_key (Optional[str], optional): The Alpaca API key. Defaults to None.
         api_secret (Optional[str], optional): The Alpaca API secret. Defaults to None.
         tickers (Optional[List[str]], optional): The list of tickers to retrieve news for. Defaults to None.
+        recorder (Optional[NewsRecorder], optional): If provided, all the fetched news are recorded with it.
+            Defaults to None.
+        news_url (Optional[str], optional): The URL of the news RESTful API. If not provided, it is read
+            from the ALPACA_NEWS_BATCH_URL environment variable or it defaults to the Alpaca API.
 
     Raises:
         KeyError: If api_key or api_secret is not provided and is not found in the environment variables.
@@ -139,12 +147,19 @@ def build_alpaca_client(
     if tickers is None:
         tickers = ["*"]
 
+    if news_url is None:
+        news_url = os.environ.get(
+            "ALPACA_NEWS_BATCH_URL", AlpacaNewsBatchClient.NEWS_URL
+        )
+
     return AlpacaNewsBatchClient(
         from_datetime=from_datetime,
         to_datetime=to_datetime,
         api_key=api_key,
         api_secret=api_secret,
         tickers=tickers,
+        recorder=recorder,
+        news_url=news_url,
     )
 
 
@@ -153,7 +168,9 @@ class AlpacaNewsBatchClient:
     Alpaca News API Client that uses a RESTful API to fetch news data.
 
     Attributes:
-        NEWS_URL (str): The URL for the Alpaca News API.
+        NEWS_URL (str): The default URL for the Alpaca News API.
+        MAX_RETRIES (int): How many times a failed request is retried before giving up.
+        _news_url (str): The URL used to fetch the news data.
         _from_datetime (datetime.datetime): The start datetime for the news data.
         _to_datetime (datetime.datetime): The end datetime for the news data.
         _api_key (str): The API key for the Alpaca News API.
@@ -161,9 +178,11 @@ class AlpacaNewsBatchClient:
         _tickers (List[str]): A list of tickers to filter the news data.
         _page_token (str): The page token for the next page of news data.
         _first_request (bool): A flag indicating whether this is the first request for news data.
+        _recorder (Optional[NewsRecorder]): If provided, all the fetched news are recorded with it.
     """
 
     NEWS_URL = "https://data.alpaca.markets/v1beta1/news"
+    MAX_RETRIES = 5
 
     def __init__(
         self,
@@ -172,6 +191,8 @@ class AlpacaNewsBatchClient:
         api_key: str,
         api_secret: str,
         tickers: List[str],
+        recorder: Optional[NewsRecorder] = None,
+        news_url: Optional[str] = None,
     ):
         """
         Initializes a new instance of the AlpacaNewsBatchClient class.
@@ -182,6 +203,8 @@ class AlpacaNewsBatchClient:
             api_key (str): The API key for the Alpaca News API.
             api_secret (str): The API secret for the Alpaca News API.
             tickers (List[str]): A list of tickers to filter the news data.
+            recorder (Optional[NewsRecorder]): If provided, all the fetched news are recorded with it.
+            news_url (Optional[str]): The URL of the news RESTful API. Defaults to NEWS_URL.
         """
 
         self._from_datetime = from_datetime
@@ -189,6 +212,8 @@ class AlpacaNewsBatchClient:
         self._api_key = api_key
         self._api_secret = api_secret
         self._tickers = tickers
+        self._recorder = recorder
+        self._news_url = news_url or self.NEWS_URL
 
         self._page_token = None
         self._first_request = True
@@ -235,20 +260,41 @@ class AlpacaNewsBatchClient:
         if self._page_token is not None:
             params["page_token"] = self._page_token
 
-        response = requests.get(self.NEWS_URL, headers=headers, params=params)
+        news_json = self._request(headers=headers, params=params)
 
-        # parse output
-        next_page_token = None
-        if response.status_code == 200:  # Check if the request was successful
-            # parse response into json
-            news_json = response.json()
+        # extract next page token (if any)
+        self._page_token = news_json.get("next_page_token", None)
 
-            # extract next page token (if any)
-            next_page_token = news_json.get("next_page_token", None)
+        news = news_json["news"]
+        if self._recorder is not None and len(news) > 0:
+            self._recorder.record(news)
+
+        return news
 
-        else:
-            logger.error("Request failed with status code:", response.status_code)
+    def _request(self, headers: dict, params: dict) -> dict:
+        """
+        Fetches a page of news, retrying with an exponential backoff on failures.
+
+        Args:
+            headers (dict): The headers of the request.
+            params (dict): The parameters of the request.
 
-        self._page_token = next_page_token
+        Raises:
+            RuntimeError: If the request failed after MAX_RETRIES retries.
 
-        return news_json["news"]
+        Returns:
+            dict: The parsed response.
+        """
+
+        for attempt in range(self.MAX_RETRIES + 1):
+            response = requests.get(self._news_url, headers=headers, params=params)
+            if response.status_code == 200:  # Check if the request was successful
+                return response.json()
+
+            logger.error(f"Request failed with status code: {response.status_code}")
+            if attempt < self.MAX_RETRIES:
+                time.sleep(min(2**attempt * 0.5, 30))
+
+        raise RuntimeError(
+            f"Request to {self._news_url} failed after {self.MAX_RETRIES} retries."
+        )
@@ -0,0 +1,506 @@
+import base64
+import datetime
+import hashlib
+import json
+import logging
+import random
+import select
+import socket
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from streaming_pipeline.mocked import generate_financial_news
+from streaming_pipeline.replay import read_recording
+
+logger = logging.getLogger(__name__)
+
+
+NEWS_PATH = "/v1beta1/news"
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+_OPCODE_TEXT = 0x1
+_OPCODE_CLOSE = 0x8
+_OPCODE_PING = 0x9
+_OPCODE_PONG = 0xA
+
+
+class AlpacaNewsLocalServer:
+    """
+    A local stand-in for the Alpaca news API used for offline & reproducible ingestion benchmarks.
+
+    It implements only the subset of the protocols used by the streaming pipeline:
+    * the RESTful API: `GET /v1beta1/news` with the `start`, `end`, `limit`, `sort` & `page_token` parameters;
+    * the websocket API: the `connected` handshake & the `auth`, `subscribe` and `unsubscribe` actions.
+
+    Args:
+        articles (List[dict]): The articles to serve, in the Alpaca news API format.
+        host (str): The host to bind to.
+        port (int): The port to bind to. Use 0 to pick a free port.
+        api_key (Optional[str]): If provided, only clients with this API key are accepted.
+        api_secret (Optional[str]): If provided, only clients with this API secret are accepted.
+        stream_rate (float): How many articles per second are pushed to every websocket subscriber.
+        stream_loop (bool): Whether to restart from the first article after all of them were streamed.
+        latency_seconds (float): The latency injected before every REST response and websocket message.
+        latency_jitter_seconds (float): The maximum random jitter added to the injected latency.
+        error_rate (float): The probability of a REST request to fail with a 5xx/429 status code
+            or of a websocket connection to be dropped before pushing an article.
+        seed (Optional[int]): The seed of the random generator used for the latency jitter & errors.
+
+    Raises:
+        ValueError: If the stream rate isn't positive.
+    """
+
+    def __init__(
+        self,
+        articles: List[dict],
+        host: str = "127.0.0.1",
+        port: int = 8090,
+        api_key: Optional[str] = None,
+        api_secret: Optional[str] = None,
+        stream_rate: float = 10.0,
+        stream_loop: bool = True,
+        latency_seconds: float = 0.0,
+        latency_jitter_seconds: float = 0.0,
+        error_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        if stream_rate <= 0:
+            raise ValueError(f"The stream rate must be positive, got {stream_rate}.")
+
+        self.articles = sorted(articles, key=lambda article: article["created_at"])
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.stream_rate = stream_rate
+        self.stream_loop = stream_loop
+        self.latency_seconds = latency_seconds
+        self.latency_jitter_seconds = latency_jitter_seconds
+        self.error_rate = error_rate
+
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        self._httpd = ThreadingHTTPServer((host, port), _AlpacaNewsRequestHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.news_server = self
+
+    @property
+    def address(self) -> str:
+        host, port = self._httpd.server_address[:2]
+
+        return f"{host}:{port}"
+
+    @property
+    def rest_url(self) -> str:
+        """
+        Returns the URL to be used as ALPACA_NEWS_BATCH_URL.
+        """
+
+        return f"http://{self.address}{NEWS_PATH}"
+
+    @property
+    def stream_url(self) -> str:
+        """
+        Returns the URL to be used as ALPACA_NEWS_STREAM_URL.
+        """
+
+        return f"ws://{self.address}{NEWS_PATH}"
+
+    @property
+    def is_stopped(self) -> bool:
+        return self._stop_event.is_set()
+
+    def start(self) -> "AlpacaNewsLocalServer":
+        """
+        Starts serving requests in a background thread.
+        """
+
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+
+        return self
+
+    def serve_forever(self) -> None:
+        """
+        Serves requests in the current thread until stop() is called.
+        """
+
+        logger.info(
+            f"Serving {len(self.articles)} articles at {self.rest_url} and {self.stream_url}."
+        )
+        self._httpd.serve_forever(poll_interval=0.1)
+
+    def stop(self) -> None:
+        """
+        Stops the server and closes all the websocket connections.
+        """
+
+        self._stop_event.set()
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> "AlpacaNewsLocalServer":
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    def is_authorized(self, api_key: Optional[str], api_secret: Optional[str]) -> bool:
+        if self.api_key is not None and api_key != self.api_key:
+            return False
+        if self.api_secret is not None and api_secret != self.api_secret:
+            return False
+
+        return True
+
+    def inject_latency(self) -> None:
+        if self.latency_seconds <= 0 and self.latency_jitter_seconds <= 0:
+            return
+
+        with self._rng_lock:
+            jitter = self._rng.uniform(0, self.latency_jitter_seconds)
+        time.sleep(self.latency_seconds + jitter)
+
+    def draw_error(self) -> Optional[int]:
+        """
+        Returns the status code of an injected error or None if the request should succeed.
+        """
+
+        if self.error_rate <= 0:
+            return None
+
+        with self._rng_lock:
+            if self._rng.random() >= self.error_rate:
+                return None
+
+            return self._rng.choice([429, 500, 503])
+
+    def list_news(
+        self,
+        start: Optional[str],
+        end: Optional[str],
+        limit: int,
+        sort: str,
+        offset: int,
+    ) -> dict:
+        """
+        Returns a page of news in the same format as the Alpaca RESTful API.
+        """
+
+        start_datetime = _parse_datetime(start) if start else None
+        end_datetime = _parse_datetime(end) if end else None
+
+        news = [
+            article
+            for article in self.articles
+            if (
+                start_datetime is None
+                or _parse_datetime(article["created_at"]) >= start_datetime
+            )
+            and (
+                end_datetime is None
+                or _parse_datetime(article["created_at"]) <= end_datetime
+            )
+        ]
+        if sort.upper() == "DESC":
+            news = news[::-1]
+
+        page = news[offset : offset + limit]
+        next_offset = offset + limit
+        next_page_token = (
+            _encode_page_token(next_offset) if next_offset < len(news) else None
+        )
+
+        return {"news": page, "next_page_token": next_page_token}
+
+
+class _AlpacaNewsRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def news_server(self) -> AlpacaNewsLocalServer:
+        return self.server.news_server
+
+    def log_message(self, format, *args):
+        logger.debug(f"[AlpacaNewsLocalServer]: {format % args}")
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path.rstrip("/") != NEWS_PATH:
+            self._send_json(404, {"message": "not found"})
+
+            return
+
+        if self.headers.get("Upgrade", "").lower() == "websocket":
+            self._handle_websocket()
+        else:
+            self._handle_rest(parse_qs(url.query))
+
+    def _handle_rest(self, query: dict):
+        self.news_server.inject_latency()
+
+        if not self.news_server.is_authorized(
+            self.headers.get("Apca-Api-Key-Id"),
+            self.headers.get("Apca-Api-Secret-Key"),
+        ):
+            self._send_json(401, {"message": "unauthorized."})
+
+            return
+
+        error_status_code = self.news_server.draw_error()
+        if error_status_code is not None:
+            self._send_json(error_status_code, {"message": "injected error"})
+
+            return
+
+        def get(key: str, default: Optional[str] = None) -> Optional[str]:
+            return query.get(key, [default])[0]
+
+        try:
+            limit = min(int(get("limit", "10")), 50)
+            offset = _decode_page_token(get("page_token"))
+            response = self.news_server.list_news(
+                start=get("start"),
+                end=get("end"),
+                limit=limit,
+                sort=get("sort", "DESC"),
+                offset=offset,
+            )
+        except ValueError as e:
+            self._send_json(400, {"message": str(e)})
+
+            return
+
+        self._send_json(200, response)
+
+    def _send_json(self, status_code: int, body: dict):
+        data = json.dumps(body).encode()
+
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _handle_websocket(self):
+        key = self.headers.get("Sec-WebSocket-Key")
+        if key is None:
+            self._send_json(400, {"message": "missing Sec-WebSocket-Key"})
+
+            return
+
+        accept = base64.b64encode(
+            hashlib.sha1((key + WEBSOCKET_GUID).encode()).digest()
+        ).decode()
+        self.send_response(101)
+        self.send_header("Upgrade", "websocket")
+        self.send_header("Connection", "Upgrade")
+        self.send_header("Sec-WebSocket-Accept", accept)
+        self.end_headers()
+        self.wfile.flush()
+        self.close_connection = True
+
+        try:
+            _AlpacaNewsWebsocketSession(
+                connection=self.connection, news_server=self.news_server
+            ).run()
+        except (ConnectionError, OSError) as e:
+            logger.debug(f"[AlpacaNewsLocalServer]: Websocket connection lost: {e}")
+
+
+class _AlpacaNewsWebsocketSession:
+    def __init__(self, connection: socket.socket, news_server: AlpacaNewsLocalServer):
+        self._connection = connection
+        self._news_server = news_server
+
+        self._is_authenticated = False
+        self._subscribed_tickers = []
+        self._next_article_index = 0
+        self._next_push_at = None
+
+    def run(self):
+        self._send([{"T": "success", "msg": "connected"}])
+
+        while not self._news_server.is_stopped:
+            timeout = 0.1
+            if self._next_push_at is not None:
+                timeout = max(0.0, min(timeout, self._next_push_at - time.monotonic()))
+
+            readable, _, _ = select.select([self._connection], [], [], timeout)
+            if readable:
+                opcode, payload = self._recv_frame()
+                if opcode == _OPCODE_CLOSE:
+                    self._send_frame(_OPCODE_CLOSE, payload[:2])
+
+                    return
+                elif opcode == _OPCODE_PING:
+                    self._send_frame(_OPCODE_PONG, payload)
+                elif opcode == _OPCODE_TEXT:
+                    self._handle_action(json.loads(payload.decode()))
+
+            if (
+                self._next_push_at is not None
+                and time.monotonic() >= self._next_push_at
+            ):
+                if not self._push_article():
+                    return
+
+    def _handle_action(self, message: dict):
+        action = message.get("action")
+        if action == "auth":
+            if self._news_server.is_authorized(
+                message.get("key"), message.get("secret")
+            ):
+                self._is_authenticated = True
+                self._send([{"T": "success", "msg": "authenticated"}])
+            else:
+                self._send([{"T": "error", "code": 402, "msg": "auth failed"}])
+        elif not self._is_authenticated:
+            self._send([{"T": "error", "code": 401, "msg": "not authenticated"}])
+        elif action == "subscribe":
+            self._subscribed_tickers = sorted(
+                set(self._subscribed_tickers) | set(message.get("news", []))
+            )
+            self._send([{"T": "subscription", "news": self._subscribed_tickers}])
+            if self._next_push_at is None:
+                self._next_push_at = time.monotonic()
+        elif action == "unsubscribe":
+            self._subscribed_tickers = sorted(
+                set(self._subscribed_tickers) - set(message.get("news", []))
+            )
+            self._send([{"T": "subscription", "news": self._subscribed_tickers}])
+            if len(self._subscribed_tickers) == 0:
+                self._next_push_at = None
+        else:
+            self._send([{"T": "error", "code": 400, "msg": "invalid syntax"}])
+
+    def _push_article(self) -> bool:
+        articles = self._news_server.articles
+        if self._next_article_index >= len(articles):
+            if not self._news_server.stream_loop or len(articles) == 0:
+                self._next_push_at = None
+
+                return True
+            self._next_article_index = 0
+
+        article = articles[self._next_article_index]
+        self._next_article_index += 1
+        self._next_push_at += 1.0 / self._news_server.stream_rate
+
+        if not self._is_subscribed_to(article):
+            return True
+
+        self._news_server.inject_latency()
+        if self._news_server.draw_error() is not None:
+            logger.info("[AlpacaNewsLocalServer]: Injecting a dropped websocket.")
+            self._send([{"T": "error", "code": 500, "msg": "internal error"}])
+
+            return False
+
+        # Stamp the article as if it was published right now.
+        now = datetime.datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")
+        self._send([{**article, "T": "n", "created_at": now, "updated_at": now}])
+
+        return True
+
+    def _is_subscribed_to(self, article: dict) -> bool:
+        if "*" in self._subscribed_tickers:
+            return True
+
+        return len(set(article.get("symbols", [])) & set(self._subscribed_tickers)) > 0
+
+    def _send(self, message: list):
+        self._send_frame(_OPCODE_TEXT, json.dumps(message).encode())
+
+    def _send_frame(self, opcode: int, payload: bytes):
+        header = bytes([0x80 | opcode])
+        length = len(payload)
+        if length < 126:
+            header += bytes([length])
+        elif length < 2**16:
+            header += bytes([126]) + struct.pack("!H", length)
+        else:
+            header += bytes([127]) + struct.pack("!Q", length)
+
+        self._connection.sendall(header + payload)
+
+    def _recv_frame(self):
+        first_byte, second_byte = self._recv_exactly(2)
+        opcode = first_byte & 0x0F
+        is_masked = second_byte & 0x80
+        length = second_byte & 0x7F
+        if length == 126:
+            (length,) = struct.unpack("!H", self._recv_exactly(2))
+        elif length == 127:
+            (length,) = struct.unpack("!Q", self._recv_exactly(8))
+
+        mask = self._recv_exactly(4) if is_masked else None
+        payload = self._recv_exactly(length)
+        if mask is not None:
+            payload = bytes(byte ^ mask[i % 4] for i, byte in enumerate(payload))
+
+        return opcode, payload
+
+    def _recv_exactly(self, n: int) -> bytes:
+        data = b""
+        while len(data) < n:
+            chunk = self._connection.recv(n - len(data))
+            if not chunk:
+                raise ConnectionError("Websocket connection closed by the client.")
+            data += chunk
+
+        return data
+
+
+def load_articles(
+    n_articles: int = 1000, recording_file_path: Optional[str] = None
+) -> List[dict]:
+    """
+    Loads the articles to serve, either from a recording or synthetically generated.
+
+    Args:
+        n_articles (int): The number of synthetic articles to generate.
+        recording_file_path (Optional[str]): If provided, the articles are loaded from this recording
+            created by NewsRecorder instead.
+
+    Returns:
+        List[dict]: A list of news articles.
+    """
+
+    if recording_file_path is None:
+        return generate_financial_news(n_articles=n_articles)
+
+    articles = {}
+    for _, message in read_recording(recording_file_path):
+        for article in message:
+            article = {key: value for key, value in article.items() if key != "T"}
+            articles[article["id"]] = article
+
+    return list(articles.values())
+
+
+def _parse_datetime(value: str) -> datetime.datetime:
+    return datetime.datetime.strptime(value[:19], "%Y-%m-%dT%H:%M:%S")
+
+
+def _encode_page_token(offset: int) -> str:
+    return base64.urlsafe_b64encode(str(offset).encode()).decode()
+
+
+def _decode_page_token(page_token: Optional[str]) -> int:
+    if page_token is None:
+        return 0
+
+    try:
+        return int(base64.urlsafe_b64decode(page_token.encode()).decode())
+    except Exception:
+        raise ValueError(f"Invalid page token: {page_token}")
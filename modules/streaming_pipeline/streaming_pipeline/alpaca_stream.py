@@ -4,7 +4,9 @@ import os
 from typing import List, Optional, Union
 
 from bytewax.inputs import DynamicInput, StatelessSource
-from websocket import create_connection
+from websocket import WebSocketTimeoutException, create_connection
+
+from streaming_pipeline.replay import NewsRecorder
 
 # Creating an object
 logger = logging.getLogger()
@@ -16,10 +18,13 @@ class AlpacaNewsStreamInput(DynamicInput):
 
     Args:
         tickers: list - should be a list of tickers, use "*" for all
+        recv_timeout_seconds: Optional[float] - if provided, the source returns None when no news
+            is received within this timeout instead of blocking the worker
     """
 
-    def __init__(self, tickers):
+    def __init__(self, tickers, recv_timeout_seconds: Optional[float] = None):
         self._tickers = tickers
+        self._recv_timeout_seconds = recv_timeout_seconds
 
     def build(self, worker_index, worker_count):
         """
@@ -43,7 +48,9 @@ class AlpacaNewsStreamInput(DynamicInput):
             )
         ]
 
-        return AlpacaNewsStreamSource(tickers=worker_tickers)
+        return AlpacaNewsStreamSource(
+            tickers=worker_tickers, recv_timeout_seconds=self._recv_timeout_seconds
+        )
 
 
 class AlpacaNewsStreamSource(StatelessSource):
@@ -52,18 +59,25 @@ class AlpacaNewsStreamSource(StatelessSource):
 
     Args:
         tickers (List[str]): A list of ticker symbols to subscribe to.
+        recv_timeout_seconds (Optional[float]): If provided, next() returns None when no news
+            is received within this timeout instead of blocking the worker.
 
     Attributes:
         _alpaca_client (AlpacaStreamClient): An instance of the AlpacaStreamClient class.
     """
 
-    def __init__(self, tickers: List[str]):
+    def __init__(
+        self, tickers: List[str], recv_timeout_seconds: Optional[float] = None
+    ):
         """
         Initializes the AlpacaNewsStreamSource object.
 
         Args:
             tickers (List[str]): A list of ticker symbols to subscribe to.
+            recv_timeout_seconds (Optional[float]): If provided, next() returns None when no news
+                is received within this timeout instead of blocking the worker.
         """
+        self._recv_timeout_seconds = recv_timeout_seconds
         self._alpaca_client = build_alpaca_client(tickers=tickers)
         self._alpaca_client.start()
         self._alpaca_client.subscribe()
@@ -73,9 +87,9 @@ class AlpacaNewsStreamSource(StatelessSource):
         Returns the next news item from the Alpaca API.
 
         Returns:
-            dict: A dictionary containing the news item data.
+            Optional[dict]: A dictionary containing the news item data or None if the receive timed out.
         """
-        return self._alpaca_client.recv()
+        return self._alpaca_client.recv(timeout=self._recv_timeout_seconds)
 
     def close(self):
         """
@@ -93,6 +107,8 @@ def build_alpaca_client(
     api_key: Optional[str] = None,
     api_secret: Optional[str] = None,
     tickers: Optional[List[str]] = None,
+    recorder: Optional[NewsRecorder] = None,
+    news_url: Optional[str] = None,
 ) -> "AlpacaNewsStreamClient":
     """
     Builds an AlpacaNewsStreamClient object with the given API key, API secret, and tickers.
@@ -104,6 +120,9 @@ def build_alpaca_client(
             it will be retrieved from the environment variable "ALPACA_API_SECRET".
         tickers (Optional[List[str]]): A list of tickers to subscribe to.
             If not provided, it will subscribe to all tickers.
+        recorder (Optional[NewsRecorder]): If provided, all the received news messages are recorded with it.
+        news_url (Optional[str]): The URL of the news websocket. If not provided, it is read from
+            the environment variable "ALPACA_NEWS_STREAM_URL" or it defaults to the Alpaca API.
 
     Returns:
         AlpacaNewsStreamClient: An AlpacaNewsStreamClient object with the given API key, API secret, and tickers.
@@ -128,8 +147,17 @@ def build_alpaca_client(
     if tickers is None:
         tickers = ["*"]
 
+    if news_url is None:
+        news_url = os.environ.get(
+            "ALPACA_NEWS_STREAM_URL", AlpacaNewsStreamClient.NEWS_URL
+        )
+
     return AlpacaNewsStreamClient(
-        api_key=api_key, api_secret=api_secret, tickers=tickers
+        api_key=api_key,
+        api_secret=api_secret,
+        tickers=tickers,
+        recorder=recorder,
+        news_url=news_url,
     )
 
 
@@ -144,7 +172,14 @@ class AlpacaNewsStreamClient:
 
     NEWS_URL = "wss://stream.data.alpaca.markets/v1beta1/news"
 
-    def __init__(self, api_key: str, api_secret: str, tickers: List[str]):
+    def __init__(
+        self,
+        api_key: str,
+        api_secret: str,
+        tickers: List[str],
+        recorder: Optional[NewsRecorder] = None,
+        news_url: Optional[str] = None,
+    ):
         """
         Initializes the AlpacaNewsStreamClient.
 
@@ -152,11 +187,15 @@ class AlpacaNewsStreamClient:
             api_key (str): The Alpaca API key.
             api_secret (str): The Alpaca API secret.
             tickers (List[str]): A list of tickers to subscribe to.
+            recorder (Optional[NewsRecorder]): If provided, all the received news messages are recorded with it.
+            news_url (Optional[str]): The URL of the news websocket. Defaults to NEWS_URL.
         """
 
         self._api_key = api_key
         self._api_secret = api_secret
         self._tickers = tickers
+        self._recorder = recorder
+        self._news_url = news_url or self.NEWS_URL
         self._ws = None
 
     def start(self):
@@ -172,7 +211,7 @@ class AlpacaNewsStreamClient:
         Connects to the Alpaca News Stream.
         """
 
-        self._ws = create_connection(self.NEWS_URL)
+        self._ws = create_connection(self._news_url)
 
         msg = self.recv()
 
@@ -219,7 +258,7 @@ class AlpacaNewsStreamClient:
         else:
             logger.info("[AlpacaNewsStream]: Subscribed to Alpaca News Stream.")
 
-    def ubsubscribe(self):
+    def unsubscribe(self):
         """
         Unsubscribes from the Alpaca News Stream.
         """
@@ -247,19 +286,31 @@ class AlpacaNewsStreamClient:
 
         return json.dumps(message)
 
-    def recv(self) -> Union[dict, List[dict]]:
+    def recv(self, timeout: Optional[float] = None) -> Union[None, dict, List[dict]]:
         """
         Receives a message from the Alpaca News Stream.
 
+        Args:
+            timeout (Optional[float]): If provided, the maximum number of seconds to wait for a message.
+
         Returns:
-            Union[dict, List[dict]]: The received message.
+            Union[None, dict, List[dict]]: The received message or None if the timeout expired.
         """
 
         if self._ws:
-            message = self._ws.recv()
-            logger.info(f"[AlpacaNewsStream]: Received message: {message}")
+            self._ws.settimeout(timeout)
+            try:
+                message = self._ws.recv()
+            except WebSocketTimeoutException:
+                return None
+            logger.debug(f"[AlpacaNewsStream]: Received message: {message}")
             message = json.loads(message)
 
+            if self._recorder is not None:
+                news = [item for item in message if item.get("T") == "n"]
+                if len(news) > 0:
+                    self._recorder.record(news)
+
             return message
         else:
             raise RuntimeError("Websocket not initialized. Call start() first.")
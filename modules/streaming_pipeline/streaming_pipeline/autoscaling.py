@@ -0,0 +1,289 @@
+import datetime
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Optional, Union
+
+from streaming_pipeline import constants
+from streaming_pipeline.metrics import MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+
+class AutoscalingAdvisor:
+    """
+    Computes a sustained lag signal from the pipeline metrics and recommends the number of workers
+    that keeps up with the news volume.
+
+    Every interval, it measures over a sliding window:
+    * the arrival rate: the articles received per second;
+    * the processing rate: the articles written to the vector DB per second;
+    * the capacity of a worker: the articles it processes per second of busy time (the time spent
+      in the stages of the flow), independent of how idle the workers are;
+    * the backlog age: the time the in-flight articles need to be processed at the current
+      processing rate (Little's law), an estimate of the age of the oldest queued article.
+
+    The recommended number of workers serves the arrival rate at the target utilization and,
+    when the backlog is older than max_backlog_age_seconds, also drains it within that time.
+    A scale-up is published as soon as it is recommended for scale_up_intervals consecutive intervals,
+    while a scale-down requires scale_down_intervals, so short bursts don't cause flapping.
+    When the articles are in flight but none was processed within the window, the backlog age is unbounded
+    and is written as null.
+
+    The metrics are kept per process, hence, when running with multiple processes (the `-p` option of Bytewax),
+    every process computes the signal for its own share of the stream only. In that case, write a file per process
+    with the "{pid}" placeholder and add up their recommended workers.
+
+    Args:
+        current_workers (int): The number of workers of this process, not of the whole cluster.
+        interval_seconds (float): How often the signal is computed.
+        window_seconds (float): The length of the sliding window the rates are computed over.
+        target_utilization (float): The fraction of their capacity the workers should be busy.
+        max_backlog_age_seconds (float): The maximum accepted backlog age.
+        min_workers (int): The minimum recommended number of workers.
+        max_workers (int): The maximum recommended number of workers.
+        scale_up_intervals (int): The consecutive intervals a scale-up must be recommended for.
+        scale_down_intervals (int): The consecutive intervals a scale-down must be recommended for.
+        output_file_path (Optional[Union[str, Path]]): If provided, the latest recommendation is
+            atomically written as JSON to this file. The "{pid}" placeholder is replaced with the process ID.
+        history_file_path (Optional[Union[str, Path]]): If provided, every computed signal is appended
+            as a JSON line to this file.
+        time_scale (float): The speed of the clock of the input relative to the wall clock
+            (e.g., the replay speed). The rates are divided by it and the timestamps are scaled by it,
+            so a replay at 10x simulates the recommendations for the recorded volume.
+        registry (Optional[MetricsRegistry]): The registry the metrics are read from and published to.
+    """
+
+    def __init__(
+        self,
+        current_workers: int = 1,
+        interval_seconds: float = constants.AUTOSCALING_INTERVAL_SECONDS,
+        window_seconds: float = constants.AUTOSCALING_WINDOW_SECONDS,
+        target_utilization: float = constants.AUTOSCALING_TARGET_UTILIZATION,
+        max_backlog_age_seconds: float = constants.AUTOSCALING_MAX_BACKLOG_AGE_SECONDS,
+        min_workers: int = 1,
+        max_workers: int = 16,
+        scale_up_intervals: int = 2,
+        scale_down_intervals: int = 10,
+        output_file_path: Optional[Union[str, Path]] = None,
+        history_file_path: Optional[Union[str, Path]] = None,
+        time_scale: float = 1.0,
+        registry: Optional[MetricsRegistry] = None,
+    ):
+        self._current_workers = current_workers
+        self._interval_seconds = interval_seconds
+        self._target_utilization = target_utilization
+        self._max_backlog_age_seconds = max_backlog_age_seconds
+        self._min_workers = min_workers
+        self._max_workers = max_workers
+        self._scale_up_intervals = scale_up_intervals
+        self._scale_down_intervals = scale_down_intervals
+        self._time_scale = time_scale or 1.0
+        self._output_file_path = (
+            Path(str(output_file_path).format(pid=os.getpid()))
+            if output_file_path is not None
+            else None
+        )
+        self._history_file_path = (
+            Path(str(history_file_path).format(pid=os.getpid()))
+            if history_file_path is not None
+            else None
+        )
+        self._registry = registry or MetricsRegistry()
+
+        n_samples = max(2, math.ceil(window_seconds / interval_seconds) + 1)
+        self._samples = deque(maxlen=n_samples)
+        self._n_consecutive = 0
+        self._pending_workers = current_workers
+        self._started_at = None
+        self._thread = None
+
+    def start(self) -> None:
+        """
+        Computes the signal every interval from a background thread.
+        Calling it multiple times is a no-op.
+        """
+
+        if self._thread is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(self._interval_seconds)
+                try:
+                    self.step()
+                except Exception:
+                    logger.exception("Failed to compute the autoscaling signal.")
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+
+        logger.info(
+            f"Computing the autoscaling signal every {self._interval_seconds} seconds."
+        )
+
+    def step(self, now: Optional[float] = None) -> Optional[dict]:
+        """
+        Samples the metrics and computes the signal.
+
+        Args:
+            now (Optional[float]): The current monotonic time. Defaults to time.monotonic().
+
+        Returns:
+            Optional[dict]: The signal or None if there are not enough samples yet.
+        """
+
+        now = time.monotonic() if now is None else now
+        if self._started_at is None:
+            self._started_at = now
+
+        counters = self._registry.counters()
+        busy_seconds = sum(
+            stage["total_seconds"] for stage in self._registry.stages().values()
+        )
+        self._samples.append(
+            (
+                now,
+                counters.get("articles_received", 0),
+                counters.get("documents_written", 0),
+                busy_seconds,
+            )
+        )
+        if len(self._samples) < 2:
+            return None
+
+        (first_at, first_received, first_written, first_busy) = self._samples[0]
+        (_, last_received, last_written, last_busy) = self._samples[-1]
+        elapsed_seconds = (now - first_at) * self._time_scale
+        if elapsed_seconds <= 0:
+            return None
+
+        arrival_rate = (last_received - first_received) / elapsed_seconds
+        processing_rate = (last_written - first_written) / elapsed_seconds
+        # The busy time is measured by the wall clock, as it is the actual cost of processing the articles.
+        busy_seconds = last_busy - first_busy
+        utilization = busy_seconds / (elapsed_seconds * self._current_workers)
+        in_flight = max(0.0, self._registry.get_gauge("in_flight_articles"))
+        backlog_age_seconds = (
+            in_flight / processing_rate
+            if processing_rate > 0
+            else (math.inf if in_flight > 0 else 0.0)
+        )
+
+        recommended_workers = self._recommend(
+            arrival_rate=arrival_rate,
+            processed=last_written - first_written,
+            busy_seconds=busy_seconds,
+            in_flight=in_flight,
+            backlog_age_seconds=backlog_age_seconds,
+        )
+        event = self._to_event(recommended_workers)
+
+        signal = {
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "elapsed_seconds": (now - self._started_at) * self._time_scale,
+            "arrival_rate": arrival_rate,
+            "processing_rate": processing_rate,
+            "utilization": utilization,
+            "in_flight_articles": in_flight,
+            # JSON has no infinity, hence an unbounded backlog age is written as null.
+            "backlog_age_seconds": backlog_age_seconds
+            if math.isfinite(backlog_age_seconds)
+            else None,
+            "current_workers": self._current_workers,
+            "recommended_workers": recommended_workers,
+            "event": event,
+        }
+        self._publish(signal)
+
+        return signal
+
+    def _recommend(
+        self,
+        arrival_rate: float,
+        processed: float,
+        busy_seconds: float,
+        in_flight: float,
+        backlog_age_seconds: float,
+    ) -> int:
+        if processed == 0 or busy_seconds <= 0:
+            # The capacity can't be measured yet. Scale up only if articles are piling up.
+            if in_flight > 0 and backlog_age_seconds > self._max_backlog_age_seconds:
+                return self._clip(self._current_workers + 1)
+
+            return self._current_workers
+
+        worker_capacity = processed / busy_seconds
+        required_rate = arrival_rate
+        if backlog_age_seconds > self._max_backlog_age_seconds:
+            required_rate += in_flight / self._max_backlog_age_seconds
+
+        return self._clip(
+            math.ceil(required_rate / (worker_capacity * self._target_utilization))
+        )
+
+    def _clip(self, workers: int) -> int:
+        return max(self._min_workers, min(self._max_workers, workers))
+
+    def _to_event(self, recommended_workers: int) -> str:
+        if recommended_workers == self._current_workers:
+            self._n_consecutive = 0
+
+            return "steady"
+
+        is_same_direction = (recommended_workers > self._current_workers) == (
+            self._pending_workers > self._current_workers
+        )
+        self._n_consecutive = self._n_consecutive + 1 if is_same_direction else 1
+        self._pending_workers = recommended_workers
+
+        if recommended_workers > self._current_workers:
+            if self._n_consecutive >= self._scale_up_intervals:
+                return "scale_up"
+        elif self._n_consecutive >= self._scale_down_intervals:
+            return "scale_down"
+
+        return "steady"
+
+    def _publish(self, signal: dict) -> None:
+        self._registry.set_gauge("autoscaling_arrival_rate", signal["arrival_rate"])
+        self._registry.set_gauge(
+            "autoscaling_processing_rate", signal["processing_rate"]
+        )
+        self._registry.set_gauge("autoscaling_utilization", signal["utilization"])
+        backlog_age_seconds = signal["backlog_age_seconds"]
+        if backlog_age_seconds is None:
+            backlog_age_seconds = math.inf
+        self._registry.set_gauge("autoscaling_backlog_age_seconds", backlog_age_seconds)
+        self._registry.set_gauge(
+            "autoscaling_recommended_workers", signal["recommended_workers"]
+        )
+
+        if signal["event"] != "steady":
+            self._registry.increment(
+                "autoscaling_events", labels={"event": signal["event"]}
+            )
+            logger.info(
+                f"Autoscaling: {signal['event']} from {signal['current_workers']} "
+                f"to {signal['recommended_workers']} workers "
+                f"[arrival_rate={signal['arrival_rate']:.2f}/s, "
+                f"backlog_age={backlog_age_seconds:.1f}s]"
+            )
+
+        if self._output_file_path is not None:
+            self._output_file_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file_path = self._output_file_path.with_name(
+                f".{self._output_file_path.name}.tmp"
+            )
+            tmp_file_path.write_text(json.dumps(signal))
+            os.replace(tmp_file_path, self._output_file_path)
+
+        if self._history_file_path is not None:
+            self._history_file_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self._history_file_path, "a") as f:
+                f.write(f"{json.dumps(signal)}\n")
@@ -0,0 +1,267 @@
+import atexit
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+from streaming_pipeline import constants
+from streaming_pipeline.metrics import MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+_DIGITS_PATTERN = re.compile(r"\d+(?:[.,]\d+)*")
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+class BoilerplateStore:
+    """
+    Learns which paragraphs recur across many articles (e.g., "About <company>" sections,
+    disclaimers or "Price Action" footers) and strips them before the articles are chunked & embedded.
+
+    Every paragraph is fingerprinted after normalizing its case, whitespace and numbers,
+    so footers that differ only by prices still match. The number of articles a fingerprint
+    was seen in decays exponentially over time, so paragraphs that are no longer used are forgotten.
+
+    A fingerprint is counted at most once per article, so the revisions, the replays and the reindexes
+    of an article don't turn its own paragraphs into boilerplate. To bound the memory, only the
+    latest max_document_ids articles are remembered per fingerprint, which is enough to count exactly
+    the fingerprints below the threshold.
+
+    Args:
+        file_path (Optional[Union[str, Path]]): If provided, the counts are loaded from
+            and periodically persisted to this JSON file. The "{pid}" placeholder is replaced with the process ID,
+            to keep a file per process.
+        min_documents (float): The decayed number of articles a paragraph must have been seen in
+            to be considered boilerplate.
+        half_life_seconds (float): The time after which the counts are halved.
+        min_paragraph_chars (int): Shorter paragraphs are never considered boilerplate.
+        max_fingerprints (int): The maximum number of fingerprints kept. The least frequent ones are pruned.
+        max_document_ids (Optional[int]): The maximum number of articles remembered per fingerprint.
+            Defaults to twice min_documents.
+        save_interval_seconds (float): How often the counts are persisted.
+    """
+
+    def __init__(
+        self,
+        file_path: Optional[Union[str, Path]] = None,
+        min_documents: float = constants.BOILERPLATE_MIN_DOCUMENTS,
+        half_life_seconds: float = constants.BOILERPLATE_HALF_LIFE_SECONDS,
+        min_paragraph_chars: int = 40,
+        max_fingerprints: int = 100000,
+        max_document_ids: Optional[int] = None,
+        save_interval_seconds: float = 60.0,
+    ):
+        self._file_path = (
+            Path(str(file_path).format(pid=os.getpid()))
+            if file_path is not None
+            else None
+        )
+        self._min_documents = min_documents
+        self._decay_rate = math.log(2) / half_life_seconds
+        self._min_paragraph_chars = min_paragraph_chars
+        self._max_fingerprints = max_fingerprints
+        self._max_document_ids = (
+            max_document_ids
+            if max_document_ids is not None
+            else 2 * math.ceil(min_documents)
+        )
+        self._save_interval_seconds = save_interval_seconds
+
+        # fingerprint -> (count, last updated at as a unix timestamp)
+        self._counts: Dict[str, Tuple[float, float]] = {}
+        # fingerprint -> {document ID -> first seen at as a unix timestamp}, ordered from the oldest to the newest.
+        self._document_ids: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+        self._last_saved_at = time.time()
+        self._metrics = MetricsRegistry()
+
+        if self._file_path is not None:
+            self.load()
+            atexit.register(self.save)
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def strip(self, paragraphs: List[str], document_id: str) -> List[str]:
+        """
+        Records the paragraphs of an article and returns the ones that are not boilerplate.
+        The article's own contribution is left out when checking whether its paragraphs are boilerplate.
+
+        Args:
+            paragraphs (List[str]): The cleaned paragraphs of an article.
+            document_id (str): The ID of the article, stable across its revisions.
+
+        Returns:
+            List[str]: The paragraphs that are not boilerplate, in their original order.
+        """
+
+        now = time.time()
+        fingerprints = [self._fingerprint(paragraph) for paragraph in paragraphs]
+        with self._lock:
+            # Count every paragraph once per article.
+            for fingerprint in set(fingerprints):
+                if fingerprint is not None:
+                    self._record(fingerprint, document_id, now)
+
+            kept_paragraphs = []
+            for paragraph, fingerprint in zip(paragraphs, fingerprints):
+                if (
+                    fingerprint is not None
+                    and self._decayed_count(fingerprint, now)
+                    - self._own_count(fingerprint, document_id, now)
+                    >= self._min_documents
+                ):
+                    self._metrics.increment("boilerplate_paragraphs_stripped")
+                    self._metrics.increment(
+                        "boilerplate_bytes_stripped", len(paragraph.encode())
+                    )
+                else:
+                    kept_paragraphs.append(paragraph)
+
+            if len(self._counts) > self._max_fingerprints:
+                self._prune(now)
+            self._metrics.set_gauge("boilerplate_fingerprints", len(self._counts))
+
+        if (
+            self._file_path is not None
+            and now - self._last_saved_at > self._save_interval_seconds
+        ):
+            self.save()
+
+        return kept_paragraphs
+
+    def is_boilerplate(self, paragraph: str) -> bool:
+        """
+        Checks whether a paragraph is boilerplate, without recording it.
+
+        Args:
+            paragraph (str): The cleaned paragraph.
+
+        Returns:
+            bool: Whether the paragraph is boilerplate.
+        """
+
+        fingerprint = self._fingerprint(paragraph)
+        if fingerprint is None:
+            return False
+
+        with self._lock:
+            return self._decayed_count(fingerprint, time.time()) >= self._min_documents
+
+    def load(self) -> None:
+        """
+        Loads the counts from the JSON file, if it exists.
+        """
+
+        if self._file_path is None or not self._file_path.exists():
+            return
+
+        with open(self._file_path, "r") as f:
+            counts = json.load(f)
+
+        with self._lock:
+            # The files persisted before the document IDs were tracked hold only the counts.
+            self._counts = {
+                fingerprint: (entry[0], entry[1])
+                for fingerprint, entry in counts.items()
+            }
+            self._document_ids = {
+                fingerprint: entry[2]
+                for fingerprint, entry in counts.items()
+                if len(entry) > 2
+            }
+        logger.info(
+            f"Loaded {len(self._counts)} boilerplate fingerprints from {self._file_path}."
+        )
+
+    def save(self) -> None:
+        """
+        Prunes the forgotten fingerprints and atomically persists the counts to the JSON file.
+        """
+
+        if self._file_path is None:
+            return
+
+        now = time.time()
+        with self._lock:
+            self._prune(now)
+            counts = {
+                fingerprint: [
+                    count,
+                    updated_at,
+                    self._document_ids.get(fingerprint, {}),
+                ]
+                for fingerprint, (count, updated_at) in self._counts.items()
+            }
+            self._last_saved_at = now
+
+        self._file_path.parent.mkdir(parents=True, exist_ok=True)
+        # A unique temporary file, so concurrent saves never write into the same file.
+        tmp_file_path = self._file_path.with_name(
+            f".{self._file_path.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+        )
+        with open(tmp_file_path, "w") as f:
+            json.dump(counts, f)
+        os.replace(tmp_file_path, self._file_path)
+
+    def _fingerprint(self, paragraph: str) -> Optional[str]:
+        normalized_paragraph = _WHITESPACE_PATTERN.sub(
+            " ", _DIGITS_PATTERN.sub("0", paragraph.lower())
+        ).strip()
+        if len(normalized_paragraph) < self._min_paragraph_chars:
+            return None
+
+        return hashlib.md5(normalized_paragraph.encode()).hexdigest()
+
+    def _record(self, fingerprint: str, document_id: str, now: float) -> None:
+        document_ids = self._document_ids.setdefault(fingerprint, {})
+        if document_id in document_ids:
+            return
+
+        count = self._decayed_count(fingerprint, now)
+        self._counts[fingerprint] = (count + 1, now)
+        document_ids[document_id] = now
+        if len(document_ids) > self._max_document_ids:
+            del document_ids[next(iter(document_ids))]
+
+    def _own_count(self, fingerprint: str, document_id: str, now: float) -> float:
+        seen_at = self._document_ids.get(fingerprint, {}).get(document_id)
+        if seen_at is None:
+            return 0.0
+
+        return math.exp(-self._decay_rate * max(0.0, now - seen_at))
+
+    def _decayed_count(self, fingerprint: str, now: float) -> float:
+        count, updated_at = self._counts.get(fingerprint, (0.0, now))
+
+        return count * math.exp(-self._decay_rate * max(0.0, now - updated_at))
+
+    def _prune(self, now: float) -> None:
+        decayed_counts = {
+            fingerprint: self._decayed_count(fingerprint, now)
+            for fingerprint in self._counts
+        }
+        # Forget the paragraphs seen in less than a tenth of an article, after decaying.
+        kept_fingerprints = [
+            fingerprint for fingerprint, count in decayed_counts.items() if count >= 0.1
+        ]
+        if len(kept_fingerprints) > self._max_fingerprints:
+            # Leave some headroom, to not prune again on every new paragraph.
+            kept_fingerprints = sorted(
+                kept_fingerprints, key=decayed_counts.get, reverse=True
+            )[: int(0.9 * self._max_fingerprints)]
+
+        self._counts = {
+            fingerprint: self._counts[fingerprint] for fingerprint in kept_fingerprints
+        }
+        self._document_ids = {
+            fingerprint: self._document_ids[fingerprint]
+            for fingerprint in kept_fingerprints
+            if fingerprint in self._document_ids
+        }
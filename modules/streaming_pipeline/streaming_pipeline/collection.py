@@ -0,0 +1,599 @@
+import datetime
+import heapq
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Union
+
+from pydantic import BaseModel
+from qdrant_client import QdrantClient
+from qdrant_client.http.api_client import UnexpectedResponse
+from qdrant_client.http.models import (
+    CollectionInfo,
+    CreateAlias,
+    CreateAliasOperation,
+    Distance,
+    FieldCondition,
+    Filter,
+    HnswConfigDiff,
+    OptimizersConfigDiff,
+    PayloadSchemaType,
+    QuantizationSearchParams,
+    Range,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    ScoredPoint,
+    SearchParams,
+    VectorParams,
+)
+
+from streaming_pipeline import constants
+from streaming_pipeline.metrics import COUNT_BUCKETS, MetricsRegistry
+from streaming_pipeline.vector_store import LocalVectorStore, VectorStore
+
+logger = logging.getLogger(__name__)
+
+
+class CollectionSpec(BaseModel):
+    """
+    The layout of a Qdrant collection, which directly drives its search latency & memory footprint.
+
+    Attributes:
+        collection_name (str): The name of the collection.
+        vector_size (int): The dimension of the embeddings (the hidden size of the embedding model).
+        distance (Distance): The distance between the embeddings.
+        vector_names (Optional[List[str]]): If provided, every point holds one named vector per name,
+            all of the same size & distance, e.g., for the "article" point layout. Use None for a single vector.
+        hnsw_m (int): The number of edges per node of the HNSW graph. Higher is more accurate but uses more memory.
+        hnsw_ef_construct (int): The number of neighbours considered while building the HNSW graph.
+        hnsw_on_disk (bool): Whether to store the HNSW graph on disk instead of in RAM.
+        search_hnsw_ef (int): The number of neighbours considered while searching.
+        quantization (bool): Whether to keep int8 scalar quantized embeddings in RAM, for faster searches.
+            The candidates are rescored with the original embeddings.
+        quantization_quantile (float): The quantile of the embedding values used to compute the quantization bounds.
+        on_disk_payload (bool): Whether to store the payloads on disk instead of in RAM.
+        memmap_threshold_kb (Optional[int]): Segments larger than this store their embeddings on disk
+            in memory-mapped files. Use None to keep them in RAM.
+        indexing_threshold_kb (int): Segments larger than this are indexed with HNSW.
+        default_segment_number (int): The target number of segments, 0 to derive it from the number of CPUs.
+        payload_indexes (Dict[str, PayloadSchemaType]): The payload fields to index, to filter on them efficiently.
+    """
+
+    collection_name: str = constants.VECTOR_DB_OUTPUT_COLLECTION_NAME
+    vector_size: int
+    distance: Distance = Distance.COSINE
+    vector_names: Optional[List[str]] = None
+    hnsw_m: int = constants.VECTOR_DB_HNSW_M
+    hnsw_ef_construct: int = constants.VECTOR_DB_HNSW_EF_CONSTRUCT
+    hnsw_on_disk: bool = False
+    search_hnsw_ef: int = constants.VECTOR_DB_SEARCH_HNSW_EF
+    quantization: bool = True
+    quantization_quantile: float = 0.99
+    on_disk_payload: bool = True
+    memmap_threshold_kb: Optional[int] = constants.VECTOR_DB_MEMMAP_THRESHOLD_KB
+    indexing_threshold_kb: int = constants.VECTOR_DB_INDEXING_THRESHOLD_KB
+    default_segment_number: int = 0
+    payload_indexes: Dict[str, PayloadSchemaType] = {
+        # Used to look up the chunks of a document when it is updated.
+        "document_id": PayloadSchemaType.KEYWORD,
+        # Qdrant doesn't index datetimes, hence the creation time is also stored as a unix timestamp.
+        "created_at_timestamp": PayloadSchemaType.INTEGER,
+        # Used to catch up on the revisions made while reindexing.
+        "updated_at_timestamp": PayloadSchemaType.INTEGER,
+        "symbols": PayloadSchemaType.KEYWORD,
+        "source": PayloadSchemaType.KEYWORD,
+    }
+
+    def apply(self, client: VectorStore) -> None:
+        """
+        Idempotently applies the spec: creates the collection if it doesn't exist, otherwise updates
+        the settings that can be changed in place (the optimizers) and creates the missing payload indexes.
+        The settings that require a reindex (the HNSW graph & the quantization) are only reported.
+
+        Args:
+            client (VectorStore): The Qdrant client or a LocalVectorStore.
+
+        Raises:
+            ValueError: If the collection exists with a different vector size, distance or vector names,
+                or if named vectors are requested from a LocalVectorStore.
+        """
+
+        if isinstance(client, LocalVectorStore):
+            if self.vector_names is not None:
+                raise ValueError(
+                    "The local vector store doesn't support named vectors."
+                )
+
+            # The local vector store searches exhaustively, hence only the vectors config
+            # and the payload indexes apply.
+            client.create_collection(
+                self.collection_name,
+                vector_size=self.vector_size,
+                distance=self.distance,
+                payload_indexes=self.payload_indexes,
+            )
+
+            return
+
+        try:
+            collection_info = client.get_collection(
+                collection_name=self.collection_name
+            )
+        except (UnexpectedResponse, ValueError):
+            collection_info = self._create(client)
+
+        if collection_info is None:
+            indexed_fields = set()
+        else:
+            self._update(client, collection_info)
+            indexed_fields = set(collection_info.payload_schema.keys())
+
+        if is_local_client(client):
+            # The local client doesn't support payload indexes.
+            return
+
+        for field_name, field_schema in self.payload_indexes.items():
+            if field_name not in indexed_fields:
+                client.create_payload_index(
+                    collection_name=self.collection_name,
+                    field_name=field_name,
+                    field_schema=field_schema,
+                )
+                logger.info(
+                    f"Created the {field_schema.value} payload index on {self.collection_name}.{field_name}."
+                )
+
+    def search_params(self, exact: bool = False) -> SearchParams:
+        """
+        Returns the search parameters matching the spec.
+
+        Args:
+            exact (bool): Whether to search exhaustively, without the HNSW index.
+
+        Returns:
+            SearchParams: The search parameters.
+        """
+
+        return SearchParams(
+            hnsw_ef=self.search_hnsw_ef,
+            exact=exact,
+            quantization=QuantizationSearchParams(rescore=True)
+            if self.quantization
+            else None,
+        )
+
+    def _create(self, client: QdrantClient) -> Optional[CollectionInfo]:
+        """
+        Creates the collection. Never drops an existing one, as another process may have created it
+        in the meantime (e.g., a bucket at its rollover) and already written to it.
+
+        Returns:
+            Optional[CollectionInfo]: None if the collection was created, otherwise the info of the existing one.
+        """
+
+        try:
+            client.create_collection(
+                collection_name=self.collection_name,
+                vectors_config=self._vectors_config(),
+                on_disk_payload=self.on_disk_payload,
+                hnsw_config=self._hnsw_config(),
+                optimizers_config=self._optimizers_config(),
+                quantization_config=self._quantization_config(),
+            )
+        except (UnexpectedResponse, ValueError) as e:
+            if "already exists" not in str(e):
+                raise
+
+            logger.info(
+                f"The {self.collection_name} collection was created concurrently."
+            )
+
+            return client.get_collection(collection_name=self.collection_name)
+
+        logger.info(f"Created the {self.collection_name} collection: {self}")
+
+        return None
+
+    def _update(self, client: QdrantClient, collection_info: CollectionInfo) -> None:
+        vectors = collection_info.config.params.vectors
+        if vectors != self._vectors_config():
+            raise ValueError(
+                f"The {self.collection_name} collection stores the vectors {vectors}, "
+                f"but {self._vectors_config()} are expected. Reindex it into a new collection."
+            )
+
+        if is_local_client(client):
+            # The local client ignores the layout settings.
+            return
+
+        hnsw_config = collection_info.config.hnsw_config
+        if (
+            hnsw_config.m != self.hnsw_m
+            or hnsw_config.ef_construct != self.hnsw_ef_construct
+        ):
+            logger.warning(
+                f"The HNSW graph of the {self.collection_name} collection differs from the spec "
+                f"[m={hnsw_config.m}, ef_construct={hnsw_config.ef_construct}]. Reindex it to apply the spec."
+            )
+        if (
+            collection_info.config.quantization_config is not None
+        ) != self.quantization:
+            logger.warning(
+                f"The quantization of the {self.collection_name} collection differs from the spec. "
+                "Reindex it to apply the spec."
+            )
+
+        optimizer_config = collection_info.config.optimizer_config
+        if (
+            optimizer_config.memmap_threshold != self.memmap_threshold_kb
+            or optimizer_config.indexing_threshold != self.indexing_threshold_kb
+            or optimizer_config.default_segment_number != self.default_segment_number
+        ):
+            client.update_collection(
+                collection_name=self.collection_name,
+                optimizer_config=self._optimizers_config(),
+            )
+            logger.info(
+                f"Updated the optimizers of the {self.collection_name} collection."
+            )
+
+    def _vectors_config(self) -> Union[VectorParams, Dict[str, VectorParams]]:
+        vector_params = VectorParams(size=self.vector_size, distance=self.distance)
+        if self.vector_names is None:
+            return vector_params
+
+        return {vector_name: vector_params for vector_name in self.vector_names}
+
+    def _hnsw_config(self) -> HnswConfigDiff:
+        return HnswConfigDiff(
+            m=self.hnsw_m,
+            ef_construct=self.hnsw_ef_construct,
+            on_disk=self.hnsw_on_disk,
+        )
+
+    def _optimizers_config(self) -> OptimizersConfigDiff:
+        return OptimizersConfigDiff(
+            memmap_threshold=self.memmap_threshold_kb,
+            indexing_threshold=self.indexing_threshold_kb,
+            default_segment_number=self.default_segment_number,
+        )
+
+    def _quantization_config(self) -> Optional[ScalarQuantization]:
+        if not self.quantization:
+            return None
+
+        return ScalarQuantization(
+            scalar=ScalarQuantizationConfig(
+                type=ScalarType.INT8,
+                quantile=self.quantization_quantile,
+                # Keep the quantized embeddings in RAM, even if the original ones are memory-mapped.
+                always_ram=True,
+            )
+        )
+
+
+class TimePartitionedCollections:
+    """
+    Splits the articles into time-bucketed collections (daily or weekly) by their creation time,
+    named "<base collection name>__<YYYYMMDD of the start of the bucket>".
+
+    The buckets are created lazily from the same spec. The base collection name is kept as an alias of
+    the latest bucket, so readers unaware of the partitioning still see the most recent news.
+    Retention drops whole expired buckets, which costs the same regardless of how many articles they hold,
+    while searches fan out in parallel over only the buckets overlapping the time horizon of the query.
+
+    Args:
+        client (QdrantClient): The Qdrant client.
+        spec (CollectionSpec): The spec of the buckets. Its collection name is the base name of the buckets.
+        granularity (str): The length of a bucket: "day" or "week".
+        retention_days (Optional[float]): If provided, the buckets that ended longer ago than this are dropped.
+        max_search_workers (int): The maximum number of buckets searched in parallel.
+    """
+
+    GRANULARITIES = {
+        "day": datetime.timedelta(days=1),
+        "week": datetime.timedelta(weeks=1),
+    }
+
+    def __init__(
+        self,
+        client: QdrantClient,
+        spec: CollectionSpec,
+        granularity: str = "day",
+        retention_days: Optional[float] = None,
+        max_search_workers: int = 8,
+    ):
+        if granularity not in self.GRANULARITIES:
+            raise ValueError(
+                f"Unknown granularity: {granularity}. Choose one of {list(self.GRANULARITIES)}."
+            )
+
+        self._client = client
+        self._spec = spec
+        self._granularity = granularity
+        self._retention_days = retention_days
+        self._max_search_workers = max_search_workers
+
+        existing_buckets = self.list_buckets()
+        self._existing_buckets = set(existing_buckets.values())
+        self._latest_bucket = max(existing_buckets, default=None)
+        self._lock = threading.Lock()
+        self._metrics = MetricsRegistry()
+
+    @property
+    def base_name(self) -> str:
+        return self._spec.collection_name
+
+    def bucket_start(self, created_at: datetime.datetime) -> datetime.date:
+        """
+        Returns the start of the bucket an article created at the given time belongs to.
+
+        Args:
+            created_at (datetime.datetime): The creation time of the article.
+
+        Returns:
+            datetime.date: The start of the bucket, in UTC.
+        """
+
+        if created_at.tzinfo is not None:
+            created_at = created_at.astimezone(datetime.timezone.utc)
+        start = created_at.date()
+        if self._granularity == "week":
+            start -= datetime.timedelta(days=start.weekday())
+
+        return start
+
+    def bucket_name(self, start: datetime.date) -> str:
+        return f"{self.base_name}__{start:%Y%m%d}"
+
+    def collection_for(self, created_at: datetime.datetime) -> str:
+        """
+        Returns the bucket an article belongs to, creating it if it doesn't exist.
+
+        Args:
+            created_at (datetime.datetime): The creation time of the article.
+
+        Returns:
+            str: The name of the bucket collection.
+        """
+
+        start = self.bucket_start(created_at)
+        collection_name = self.bucket_name(start)
+        if collection_name in self._existing_buckets:
+            return collection_name
+
+        with self._lock:
+            if collection_name not in self._existing_buckets:
+                self._spec.copy(update={"collection_name": collection_name}).apply(
+                    self._client
+                )
+                self._existing_buckets.add(collection_name)
+                self._metrics.set_gauge(
+                    "partition_buckets", len(self._existing_buckets)
+                )
+                logger.info(f"Created the bucket {collection_name}.")
+
+                if self._latest_bucket is None or start > self._latest_bucket:
+                    self._latest_bucket = start
+                    self._update_alias(collection_name)
+                    self.drop_expired()
+
+        return collection_name
+
+    def list_buckets(self) -> Dict[datetime.date, str]:
+        """
+        Lists the existing buckets.
+
+        Returns:
+            Dict[datetime.date, str]: The name of every bucket by its start, sorted by start.
+        """
+
+        prefix = f"{self.base_name}__"
+        buckets = {}
+        for collection_name in _list_collection_names(self._client):
+            suffix = collection_name[len(prefix) :]
+            if collection_name.startswith(prefix) and suffix.isdigit():
+                start = datetime.datetime.strptime(suffix, "%Y%m%d").date()
+                buckets[start] = collection_name
+
+        return dict(sorted(buckets.items()))
+
+    def collections_between(
+        self,
+        from_datetime: Optional[datetime.datetime] = None,
+        to_datetime: Optional[datetime.datetime] = None,
+    ) -> List[str]:
+        """
+        Returns the existing buckets overlapping the [from_datetime, to_datetime] time horizon.
+
+        Args:
+            from_datetime (Optional[datetime.datetime]): The start of the horizon. Defaults to the oldest bucket.
+            to_datetime (Optional[datetime.datetime]): The end of the horizon. Defaults to the latest bucket.
+
+        Returns:
+            List[str]: The names of the buckets, sorted by start.
+        """
+
+        from_start = self.bucket_start(from_datetime) if from_datetime else None
+        to_start = self.bucket_start(to_datetime) if to_datetime else None
+
+        return [
+            collection_name
+            for start, collection_name in self.list_buckets().items()
+            if (from_start is None or start >= from_start)
+            and (to_start is None or start <= to_start)
+        ]
+
+    def is_expired(
+        self, created_at: datetime.datetime, now: Optional[datetime.datetime] = None
+    ) -> bool:
+        """
+        Checks whether an article created at the given time belongs to a bucket beyond the retention.
+
+        Args:
+            created_at (datetime.datetime): The creation time of the article.
+            now (Optional[datetime.datetime]): The current time. Defaults to the current UTC time.
+
+        Returns:
+            bool: Whether the article is expired. Always False without retention.
+        """
+
+        if self._retention_days is None:
+            return False
+
+        return self.bucket_start(created_at) + self.GRANULARITIES[
+            self._granularity
+        ] <= self._expired_before(now)
+
+    def drop_expired(self, now: Optional[datetime.datetime] = None) -> List[str]:
+        """
+        Drops the buckets that ended longer ago than the retention.
+
+        Args:
+            now (Optional[datetime.datetime]): The current time. Defaults to the current UTC time.
+
+        Returns:
+            List[str]: The names of the dropped buckets.
+        """
+
+        if self._retention_days is None:
+            return []
+
+        expired_before = self._expired_before(now)
+        dropped_buckets = []
+        for start, collection_name in self.list_buckets().items():
+            if start + self.GRANULARITIES[self._granularity] <= expired_before:
+                self._client.delete_collection(collection_name=collection_name)
+                self._existing_buckets.discard(collection_name)
+                dropped_buckets.append(collection_name)
+                logger.info(f"Dropped the expired bucket {collection_name}.")
+
+        self._metrics.increment("partition_buckets_dropped", len(dropped_buckets))
+        self._metrics.set_gauge("partition_buckets", len(self._existing_buckets))
+
+        return dropped_buckets
+
+    def search(
+        self,
+        query_vector: List[float],
+        limit: int = 5,
+        from_datetime: Optional[datetime.datetime] = None,
+        to_datetime: Optional[datetime.datetime] = None,
+        query_filter: Optional[Filter] = None,
+    ) -> List[ScoredPoint]:
+        """
+        Searches the buckets overlapping the time horizon in parallel and merges their top-k hits.
+
+        Args:
+            query_vector (List[float]): The embedding of the query.
+            limit (int): The number of hits to return.
+            from_datetime (Optional[datetime.datetime]): The start of the horizon. Defaults to no limit.
+            to_datetime (Optional[datetime.datetime]): The end of the horizon. Defaults to no limit.
+            query_filter (Optional[Filter]): An additional filter applied to every bucket.
+
+        Returns:
+            List[ScoredPoint]: The hits, sorted by decreasing score.
+        """
+
+        collection_names = self.collections_between(from_datetime, to_datetime)
+        if len(collection_names) == 0:
+            return []
+
+        # The buckets are aligned to days, hence the edges of the horizon are filtered exactly.
+        query_filter = _with_created_at_range(query_filter, from_datetime, to_datetime)
+        search_params = self._spec.search_params()
+
+        def search_bucket(collection_name: str) -> List[ScoredPoint]:
+            return self._client.search(
+                collection_name=collection_name,
+                query_vector=query_vector,
+                query_filter=query_filter,
+                search_params=search_params,
+                limit=limit,
+            )
+
+        with ThreadPoolExecutor(
+            max_workers=min(self._max_search_workers, len(collection_names))
+        ) as executor:
+            hits = [
+                hit
+                for bucket_hits in executor.map(search_bucket, collection_names)
+                for hit in bucket_hits
+            ]
+        self._metrics.observe(
+            "search_buckets", len(collection_names), buckets=COUNT_BUCKETS
+        )
+
+        return heapq.nlargest(limit, hits, key=lambda hit: hit.score)
+
+    def _expired_before(self, now: Optional[datetime.datetime] = None) -> datetime.date:
+        now = now or datetime.datetime.now(datetime.timezone.utc)
+
+        return self.bucket_start(now - datetime.timedelta(days=self._retention_days))
+
+    def _update_alias(self, collection_name: str) -> None:
+        if self.base_name in _list_collection_names(self._client):
+            logger.warning(
+                f"A {self.base_name} collection already exists, hence it can't alias the latest bucket."
+            )
+
+            return
+
+        self._client.update_collection_aliases(
+            change_aliases_operations=[
+                CreateAliasOperation(
+                    create_alias=CreateAlias(
+                        collection_name=collection_name, alias_name=self.base_name
+                    )
+                )
+            ]
+        )
+
+
+def _with_created_at_range(
+    query_filter: Optional[Filter],
+    from_datetime: Optional[datetime.datetime],
+    to_datetime: Optional[datetime.datetime],
+) -> Optional[Filter]:
+    if from_datetime is None and to_datetime is None:
+        return query_filter
+
+    condition = FieldCondition(
+        key="created_at_timestamp",
+        range=Range(
+            gte=int(from_datetime.timestamp()) if from_datetime else None,
+            lte=int(to_datetime.timestamp()) if to_datetime else None,
+        ),
+    )
+    if query_filter is None:
+        return Filter(must=[condition])
+
+    return Filter(
+        must=[*(query_filter.must or []), condition],
+        should=query_filter.should,
+        must_not=query_filter.must_not,
+    )
+
+
+def _list_collection_names(client: QdrantClient) -> List[str]:
+    if is_local_client(client):
+        # The local client fails to list its collections.
+        return list(client._client.collections)
+
+    return [collection.name for collection in client.get_collections().collections]
+
+
+def is_local_client(client: QdrantClient) -> bool:
+    """
+    Checks whether the client is the in-memory or on-disk local client, which doesn't support
+    the collection layout settings nor concurrent writes.
+
+    Args:
+        client (QdrantClient): The Qdrant client.
+
+    Returns:
+        bool: Whether the client is local.
+    """
+
+    return type(getattr(client, "_client", None)).__name__ == "QdrantLocal"
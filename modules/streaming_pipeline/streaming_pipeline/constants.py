@@ -3,3 +3,85 @@ EMBEDDING_MODEL_MAX_INPUT_LENGTH = 384
 EMBEDDING_MODEL_DEVICE = "cpu"
 
 VECTOR_DB_OUTPUT_COLLECTION_NAME = "alpaca_financial_news"
+
+# The maximum accepted delay between the creation of an article and the moment it becomes searchable.
+FRESHNESS_ALERT_THRESHOLD_SECONDS = 60.0
+
+# Per-article processing budget, protecting the tail latency from huge articles.
+ARTICLE_MAX_CONTENT_BYTES = 200 * 1024
+ARTICLE_CLEANING_TIME_BUDGET_SECONDS = 1.0
+DOCUMENT_MAX_CHUNKS = 64
+
+# Backfill articles are admitted only while fewer articles than this are in flight,
+# so fresh articles never queue behind a long backlog of historical ones.
+BACKFILL_MAX_IN_FLIGHT_ARTICLES = 8
+LIVE_RECV_TIMEOUT_SECONDS = 0.1
+
+# With two-phase indexing, the headline & summary are indexed right away,
+# while the full contents are batched in windows of this length.
+DEFERRED_CONTENT_WINDOW_SECONDS = 5.0
+# The number of keys the deferred contents are sharded by. Bytewax keeps the window state of every key forever.
+DEFERRED_CONTENT_N_SHARDS = 64
+
+# The number of keys the revisions of the articles are sharded by, when coalescing them.
+COALESCE_N_SHARDS = 64
+
+# Articles whose contents are more similar than this to a recently seen one are near-duplicates.
+NEAR_DUPLICATE_THRESHOLD = 0.8
+NEAR_DUPLICATE_TTL_SECONDS = 24 * 60 * 60
+NEAR_DUPLICATE_MAX_ENTRIES = 50000
+
+# Paragraphs seen in at least this many articles, after decaying their counts, are stripped as boilerplate.
+BOILERPLATE_MIN_DOCUMENTS = 5
+BOILERPLATE_HALF_LIFE_SECONDS = 7 * 24 * 60 * 60
+
+# The raw articles are appended to a local log of segment files of this size, fsynced at least this often.
+SEGMENT_LOG_SEGMENT_MAX_BYTES = 64 * 1024 * 1024
+SEGMENT_LOG_FSYNC_INTERVAL_SECONDS = 1.0
+
+# JSONL dumps are split into byte ranges of this size, distributed across the workers.
+FILE_INPUT_BYTE_RANGE_BYTES = 16 * 1024 * 1024
+
+# The autoscaling signal is computed every interval over a sliding window. The recommended number of workers
+# keeps them busy at the target utilization and drains any backlog older than the maximum age.
+AUTOSCALING_INTERVAL_SECONDS = 15.0
+AUTOSCALING_WINDOW_SECONDS = 300.0
+AUTOSCALING_TARGET_UTILIZATION = 0.7
+AUTOSCALING_MAX_BACKLOG_AGE_SECONDS = 30.0
+
+# The layout of the vector DB collection. See streaming_pipeline.collection.CollectionSpec.
+VECTOR_DB_HNSW_M = 16
+VECTOR_DB_HNSW_EF_CONSTRUCT = 100
+VECTOR_DB_SEARCH_HNSW_EF = 128
+VECTOR_DB_MEMMAP_THRESHOLD_KB = 20000
+VECTOR_DB_INDEXING_THRESHOLD_KB = 20000
+
+# A re-index embeds the stored chunks in batches of this size, large enough to keep all the cores busy.
+REINDEX_BATCH_SIZE = 256
+
+# The snapshots are exported & imported in batches of this size, with this many concurrent uploads.
+SNAPSHOT_BATCH_SIZE = 1024
+SNAPSHOT_IMPORT_PARALLELISM = 4
+
+# The local vector store multiplies the query with blocks of this many embeddings at once,
+# bounding the memory of a search regardless of the size of the collection.
+LOCAL_VECTOR_STORE_BLOCK_SIZE = 65536
+
+# The local search daemon listens on this port, on localhost only.
+SEARCH_SERVER_PORT = 8091
+
+# With the "article" point layout, every article is stored as a single point with one named vector per field,
+# instead of one point per chunk with a copy of the metadata. The content vector pools the embeddings of its chunks.
+ARTICLE_VECTOR_NAMES = ("headline", "summary", "content")
+
+# With normalized payloads, the metadata of every article is stored once in this payload-only collection,
+# while its chunks keep only these fields, used to filter them and to diff the revisions of their article.
+VECTOR_DB_DOCUMENTS_COLLECTION_NAME = "alpaca_financial_news_documents"
+CHUNK_PAYLOAD_FIELDS = (
+    "document_id",
+    "created_at_timestamp",
+    "updated_at",
+    "updated_at_timestamp",
+    "symbols",
+    "source",
+)
@@ -0,0 +1,263 @@
+import logging
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from streaming_pipeline import constants
+from streaming_pipeline.metrics import MetricsRegistry
+from streaming_pipeline.models import Document
+
+logger = logging.getLogger(__name__)
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+class MinHashLSHIndex:
+    """
+    A rolling MinHash LSH index of the recently seen texts, used to find near-duplicates.
+
+    The texts are represented as sets of word shingles. Their MinHash signatures are split into
+    bands and the texts sharing at least one band are compared by their estimated Jaccard similarity.
+    The index is bounded both in size and in time: the oldest entries are evicted
+    when it is full or when they are older than the TTL.
+
+    Args:
+        threshold (float): The minimum estimated Jaccard similarity of two near-duplicates.
+        num_perm (int): The number of hash functions of the MinHash signatures.
+        shingle_size (int): The number of words of a shingle.
+        min_words (Optional[int]): The minimum number of words of an indexed text. Shorter texts (e.g., a generic
+            "See the full story here.") are neither indexed nor matched, as they don't tell the articles apart.
+            Defaults to twice the shingle size.
+        ttl_seconds (float): The time after which an entry is evicted.
+        max_entries (int): The maximum number of entries of the index.
+        seed (int): The seed of the hash functions.
+    """
+
+    def __init__(
+        self,
+        threshold: float = constants.NEAR_DUPLICATE_THRESHOLD,
+        num_perm: int = 128,
+        shingle_size: int = 5,
+        min_words: Optional[int] = None,
+        ttl_seconds: float = constants.NEAR_DUPLICATE_TTL_SECONDS,
+        max_entries: int = constants.NEAR_DUPLICATE_MAX_ENTRIES,
+        seed: int = 42,
+    ):
+        self._threshold = threshold
+        self._num_perm = num_perm
+        self._shingle_size = shingle_size
+        self._min_words = min_words if min_words is not None else 2 * shingle_size
+        self._ttl_seconds = ttl_seconds
+        self._max_entries = max_entries
+
+        # Aim the LSH threshold below the similarity threshold, to favor the recall of the candidates,
+        # as they are verified anyway by their estimated similarity.
+        self._n_bands, self._n_rows = _find_optimal_bands(threshold * 0.85, num_perm)
+
+        generator = np.random.RandomState(seed)
+        self._a = generator.randint(
+            1, np.iinfo(np.int64).max, size=num_perm, dtype=np.int64
+        ).astype(np.uint64)
+        self._b = generator.randint(
+            0, np.iinfo(np.int64).max, size=num_perm, dtype=np.int64
+        ).astype(np.uint64)
+
+        # key -> (inserted_at, signature), ordered from the oldest to the newest entry.
+        self._entries: "OrderedDict[str, Tuple[float, np.ndarray]]" = OrderedDict()
+        self._buckets: List[Dict[bytes, Set[str]]] = [{} for _ in range(self._n_bands)]
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """
+        Computes the MinHash signature of a text.
+
+        Args:
+            text (str): The text.
+
+        Returns:
+            Optional[np.ndarray]: The signature or None if the text has fewer than min_words words.
+        """
+
+        words = _WORD_PATTERN.findall(text.lower())
+        if len(words) == 0 or len(words) < self._min_words:
+            return None
+
+        n_shingles = max(1, len(words) - self._shingle_size + 1)
+        shingles = {
+            " ".join(words[i : i + self._shingle_size]) for i in range(n_shingles)
+        }
+        hashes = np.fromiter(
+            (zlib.crc32(shingle.encode()) for shingle in shingles),
+            dtype=np.uint64,
+            count=len(shingles),
+        )
+
+        # The overflows of the multiplication are expected, as they keep the values pseudo-random.
+        with np.errstate(over="ignore"):
+            permuted = (
+                np.outer(hashes, self._a) + self._b
+            ) % _MERSENNE_PRIME & _MAX_HASH
+
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def query_and_insert(self, key: str, text: str) -> Tuple[Optional[str], float]:
+        """
+        Looks up the most similar recent text and inserts the new one into the index.
+
+        Args:
+            key (str): The key of the text (e.g., the document ID). Texts with the same key are never matched.
+            text (str): The text.
+
+        Returns:
+            Tuple[Optional[str], float]: The key of the most similar text above the threshold or None,
+                together with their estimated Jaccard similarity.
+        """
+
+        signature = self.signature(text)
+        if signature is None:
+            return None, 0.0
+
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+
+            bands = self._to_bands(signature)
+            candidates = set()
+            for band_buckets, band in zip(self._buckets, bands):
+                candidates.update(band_buckets.get(band, ()))
+            candidates.discard(key)
+
+            best_key, best_similarity = None, 0.0
+            for candidate in candidates:
+                _, candidate_signature = self._entries[candidate]
+                similarity = float(np.mean(candidate_signature == signature))
+                if similarity >= self._threshold and similarity > best_similarity:
+                    best_key, best_similarity = candidate, similarity
+
+            self._remove(key)
+            self._entries[key] = (now, signature)
+            for band_buckets, band in zip(self._buckets, bands):
+                band_buckets.setdefault(band, set()).add(key)
+
+        return best_key, best_similarity
+
+    def _to_bands(self, signature: np.ndarray) -> List[bytes]:
+        return [
+            signature[i * self._n_rows : (i + 1) * self._n_rows].tobytes()
+            for i in range(self._n_bands)
+        ]
+
+    def _evict(self, now: float) -> None:
+        while len(self._entries) > 0:
+            oldest_key, (inserted_at, _) = next(iter(self._entries.items()))
+            if (
+                len(self._entries) < self._max_entries
+                and now - inserted_at < self._ttl_seconds
+            ):
+                break
+
+            self._remove(oldest_key)
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+
+        _, signature = entry
+        for band_buckets, band in zip(self._buckets, self._to_bands(signature)):
+            keys = band_buckets.get(band)
+            if keys is not None:
+                keys.discard(key)
+                if len(keys) == 0:
+                    del band_buckets[band]
+
+
+class NearDuplicateFilter:
+    """
+    Finds the documents whose content is a near-duplicate of a recently seen one
+    (e.g., syndicated press releases) and drops or links them.
+
+    Args:
+        policy (str): "drop" to discard the near-duplicates or "link" to index only their headline & summary,
+            with the ID of the original document stored in the "duplicate_of" payload field.
+        index (Optional[MinHashLSHIndex]): The index of the recently seen contents.
+    """
+
+    POLICIES = ("drop", "link")
+
+    def __init__(self, policy: str = "drop", index: Optional[MinHashLSHIndex] = None):
+        if policy not in self.POLICIES:
+            raise ValueError(
+                f"Unknown near-duplicate policy: {policy}. Choose one of {self.POLICIES}."
+            )
+
+        self._policy = policy
+        self._index = index or MinHashLSHIndex()
+        self._metrics = MetricsRegistry()
+
+    def __call__(self, document: Document) -> Optional[Document]:
+        """
+        Checks whether the content of the document is a near-duplicate.
+
+        Args:
+            document (Document): The cleaned document, with its content as the last text item.
+
+        Returns:
+            Optional[Document]: The document, linked to the original one if it is a near-duplicate,
+                or None if it was dropped.
+        """
+
+        if len(document.text) == 0:
+            return document
+
+        original_id, similarity = self._index.query_and_insert(
+            document.id, document.text[-1]
+        )
+        self._metrics.set_gauge("near_duplicate_index_entries", len(self._index))
+        if original_id is None:
+            return document
+
+        logger.debug(
+            f"Document {document.id} is a near-duplicate of {original_id} [similarity={similarity:.2f}]."
+        )
+        self._metrics.increment("near_duplicates", labels={"action": self._policy})
+        if self._policy == "drop":
+            self._metrics.add_gauge("in_flight_articles", -1)
+
+            return None
+
+        # Keep only the headline & summary, as the content is already indexed with the original document.
+        document.text = document.text[:-1]
+        document.metadata["duplicate_of"] = original_id
+
+        return document
+
+
+def _find_optimal_bands(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """
+    Finds the number of bands & rows per band whose LSH threshold, (1 / bands) ^ (1 / rows),
+    is the closest to the given threshold.
+    """
+
+    candidates = [
+        (n_bands, num_perm // n_bands)
+        for n_bands in range(1, num_perm + 1)
+        if num_perm % n_bands == 0
+    ]
+
+    return min(
+        candidates,
+        key=lambda bands_rows: abs(
+            (1 / bands_rows[0]) ** (1 / bands_rows[1]) - threshold
+        ),
+    )
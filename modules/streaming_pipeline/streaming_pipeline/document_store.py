@@ -0,0 +1,121 @@
+import logging
+import uuid
+from typing import Dict, Iterable, List
+
+from qdrant_client.http.models import PointStruct
+
+from streaming_pipeline import constants
+from streaming_pipeline.collection import CollectionSpec
+from streaming_pipeline.models import Document
+from streaming_pipeline.vector_store import VectorStore
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentStore:
+    """
+    Holds the metadata of every article once, in a payload-only collection of the vector store, so that the chunk
+    points only carry a reference to their article and the fields they are filtered by
+    (see constants.CHUNK_PAYLOAD_FIELDS). The hits of a search are hydrated with the metadata of their
+    articles in a single batched lookup.
+
+    The metadata doesn't depend on the embedding model, hence the same store is shared by all the collections
+    of chunks, e.g., across reindexes. As every point must hold a vector, the articles hold a constant
+    1-dimensional one, which is never searched.
+
+    Args:
+        client (VectorStore): The vector store.
+        collection_name (str): The name of the payload-only collection.
+    """
+
+    def __init__(
+        self,
+        client: VectorStore,
+        collection_name: str = constants.VECTOR_DB_DOCUMENTS_COLLECTION_NAME,
+    ):
+        self._client = client
+        self.collection_name = collection_name
+
+    def apply(self) -> None:
+        """
+        Creates the payload-only collection if it doesn't exist.
+        """
+
+        CollectionSpec(
+            collection_name=self.collection_name,
+            vector_size=1,
+            quantization=False,
+            payload_indexes={},
+        ).apply(self._client)
+
+    def put(self, documents: List[Document]) -> None:
+        """
+        Writes or overwrites the metadata of the given documents.
+
+        Args:
+            documents (List[Document]): The documents.
+        """
+
+        self._client.upsert(
+            collection_name=self.collection_name,
+            points=[
+                PointStruct(
+                    id=_to_point_id(document.id),
+                    vector=[1.0],
+                    payload=document.metadata,
+                )
+                for document in documents
+            ],
+        )
+
+    def get(self, document_ids: Iterable[str]) -> Dict[str, dict]:
+        """
+        Looks up the metadata of the given documents in a single request.
+
+        Args:
+            document_ids (Iterable[str]): The IDs of the documents. The duplicates are looked up once.
+
+        Returns:
+            Dict[str, dict]: The metadata of the documents by ID. The missing documents are skipped.
+        """
+
+        document_ids = list(dict.fromkeys(document_ids))
+        if len(document_ids) == 0:
+            return {}
+
+        records = self._client.retrieve(
+            collection_name=self.collection_name,
+            ids=[_to_point_id(document_id) for document_id in document_ids],
+            with_payload=True,
+            with_vectors=False,
+        )
+
+        return {record.payload["document_id"]: record.payload for record in records}
+
+    def hydrate(self, hits: list) -> list:
+        """
+        Merges the metadata of their articles into the payloads of the hits, in place.
+
+        Args:
+            hits (list): The hits of a search, e.g., ScoredPoint objects.
+
+        Returns:
+            list: The same hits, with their full payloads.
+        """
+
+        documents = self.get(
+            hit.payload["document_id"]
+            for hit in hits
+            if hit.payload is not None and "document_id" in hit.payload
+        )
+        for hit in hits:
+            document = documents.get((hit.payload or {}).get("document_id"))
+            if document is not None:
+                hit.payload = {**document, **hit.payload}
+
+        return hits
+
+
+def _to_point_id(document_id: str) -> str:
+    # The document IDs are MD5 hex digests, hence valid UUIDs, as expected by Qdrant.
+    return str(uuid.UUID(hex=document_id))
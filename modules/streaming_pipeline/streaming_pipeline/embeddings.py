@@ -68,6 +68,17 @@ class EmbeddingModelSingleton(metaclass=SingletonMeta):
 
         return self._max_input_length
 
+    @property
+    def embedding_size(self) -> int:
+        """
+        Returns the dimension of the embeddings, as defined by the configuration of the model.
+
+        Returns:
+            int: The dimension of the embeddings.
+        """
+
+        return self._model.config.hidden_size
+
     @property
     def tokenizer(self) -> AutoTokenizer:
         """
@@ -0,0 +1,259 @@
+import glob
+import gzip
+import hashlib
+import json
+import logging
+from pathlib import Path
+from typing import Iterator, List, Optional, Set, Tuple, Union
+
+from bytewax.inputs import PartitionedInput, StatefulSource
+
+from streaming_pipeline import constants
+
+logger = logging.getLogger(__name__)
+
+_JSONL_SUFFIXES = (".jsonl", ".ndjson")
+_SUPPORTED_SUFFIXES = (".json", ".jsonl.gz", ".parquet") + _JSONL_SUFFIXES
+
+
+class NewsFileInput(PartitionedInput):
+    """Input class that reads historical news articles from JSON, JSONL or Parquet dumps.
+
+    The files are split into partitions that are distributed across the workers:
+    JSONL files by byte ranges, Parquet files by row groups, while JSON & compressed JSONL files
+    are read as a whole. Thus, large corpora are embedded through the same flow & scale with `-p`.
+
+    Every record must be a news article as returned by the Alpaca API. Dumps that only contain
+    the headline, summary, content & date (e.g., the ones of the Q&A dataset generator) are accepted too.
+
+    Args:
+        path (Union[str, Path]): A file, a directory or a glob pattern (e.g., "data/news_*.jsonl").
+        byte_range_bytes (int): The size of the byte ranges the JSONL files are split into.
+        batch_size (int): The maximum number of articles emitted at once.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        byte_range_bytes: int = constants.FILE_INPUT_BYTE_RANGE_BYTES,
+        batch_size: int = 50,
+    ):
+        self._path = str(path)
+        self._byte_range_bytes = byte_range_bytes
+        self._batch_size = batch_size
+
+    def list_parts(self) -> Set[str]:
+        parts = set()
+        for file_path in list_files(self._path):
+            if file_path.name.endswith(_JSONL_SUFFIXES):
+                size = file_path.stat().st_size
+                for start in range(0, max(size, 1), self._byte_range_bytes):
+                    end = min(start + self._byte_range_bytes, size)
+                    parts.add(f"{file_path}::{start}-{end}")
+            elif file_path.suffix == ".parquet":
+                pq = _import_parquet()
+                n_row_groups = pq.ParquetFile(file_path).num_row_groups
+                for row_group in range(n_row_groups):
+                    parts.add(f"{file_path}::rg{row_group}")
+            else:
+                parts.add(f"{file_path}::all")
+
+        return parts
+
+    def build_part(self, for_part, resume_state):
+        file_path, part_range = for_part.rsplit("::", 1)
+        file_path = Path(file_path)
+
+        if file_path.name.endswith(_JSONL_SUFFIXES):
+            start, end = (int(offset) for offset in part_range.split("-"))
+            records = _read_jsonl_range(file_path, start, end, resume_state)
+        elif file_path.suffix == ".parquet":
+            row_group = int(part_range.removeprefix("rg"))
+            records = _read_parquet_row_group(file_path, row_group, resume_state)
+        else:
+            records = _read_whole_file(file_path, resume_state)
+
+        return NewsFileSource(records, batch_size=self._batch_size)
+
+
+class NewsFileSource(StatefulSource):
+    """
+    A source that emits the articles of a partition of a file in batches.
+
+    Args:
+        records (Iterator[Tuple[dict, object]]): The records of the partition,
+            each one together with the resume state after it.
+        batch_size (int): The maximum number of articles emitted at once.
+    """
+
+    def __init__(self, records: Iterator[Tuple[dict, object]], batch_size: int = 50):
+        self._records = records
+        self._batch_size = batch_size
+        self._resume_state = None
+
+    def next(self):
+        """
+        Returns the next batch of articles.
+
+        Raises:
+            StopIteration: When the partition is consumed.
+
+        Returns:
+            List[dict]: The articles.
+        """
+
+        articles = []
+        for record, resume_state in self._records:
+            articles.append(to_raw_article(record))
+            self._resume_state = resume_state
+            if len(articles) >= self._batch_size:
+                break
+
+        if len(articles) == 0:
+            raise StopIteration()
+
+        return articles
+
+    def snapshot(self):
+        """
+        Returns the position after the last emitted article.
+        """
+
+        return self._resume_state
+
+    def close(self):
+        self._records.close()
+
+
+def list_files(path: Union[str, Path]) -> List[Path]:
+    """
+    Lists the supported files matched by a path.
+
+    Args:
+        path (Union[str, Path]): A file, a directory or a glob pattern.
+
+    Returns:
+        List[Path]: The sorted list of files.
+    """
+
+    path = str(path)
+    if Path(path).is_dir():
+        file_paths = [
+            file_path for file_path in Path(path).rglob("*") if file_path.is_file()
+        ]
+    else:
+        file_paths = [Path(file_path) for file_path in glob.glob(path, recursive=True)]
+
+    file_paths = sorted(
+        file_path
+        for file_path in file_paths
+        if file_path.name.endswith(_SUPPORTED_SUFFIXES)
+    )
+    if len(file_paths) == 0:
+        raise FileNotFoundError(f"No JSON, JSONL or Parquet files found at: {path}")
+
+    return file_paths
+
+
+def to_raw_article(record: dict) -> dict:
+    """
+    Completes a record with the fields of an Alpaca article it is missing.
+
+    Args:
+        record (dict): The record of a dump.
+
+    Returns:
+        dict: The raw article.
+    """
+
+    created_at = record.get("created_at") or record.get("date")
+    if "id" in record:
+        article_id = record["id"]
+    else:
+        # Derive a stable ID, so the article is updated in place when it is embedded again.
+        key = record.get("url") or f"{record.get('headline')}:{created_at}"
+        article_id = int(hashlib.md5(key.encode()).hexdigest()[:15], 16)
+
+    return {
+        "author": "",
+        "url": None,
+        "symbols": [],
+        "source": "",
+        "summary": "",
+        **record,
+        "id": article_id,
+        "created_at": created_at,
+        "updated_at": record.get("updated_at") or created_at,
+    }
+
+
+def _read_jsonl_range(
+    file_path: Path, start: int, end: int, resume_state: Optional[int]
+) -> Iterator[Tuple[dict, int]]:
+    """
+    Reads the lines starting within [start, end). The line overlapping start belongs to the previous range.
+    """
+
+    with open(file_path, "rb") as f:
+        if resume_state is not None:
+            f.seek(resume_state)
+        elif start > 0:
+            f.seek(start - 1)
+            # Skip the rest of the line overlapping the start, unless the range starts right after a newline.
+            f.readline()
+
+        while f.tell() < end:
+            line = f.readline()
+            if not line:
+                break
+            if line.strip():
+                yield json.loads(line), f.tell()
+
+
+def _read_parquet_row_group(
+    file_path: Path, row_group: int, resume_state: Optional[int]
+) -> Iterator[Tuple[dict, int]]:
+    pq = _import_parquet()
+
+    table = pq.ParquetFile(file_path).read_row_group(row_group)
+    first_row = resume_state or 0
+    for row, record in enumerate(table.slice(first_row).to_pylist(), start=first_row):
+        yield record, row + 1
+
+
+def _read_whole_file(
+    file_path: Path, resume_state: Optional[int]
+) -> Iterator[Tuple[dict, int]]:
+    if file_path.name.endswith(".gz"):
+        with gzip.open(file_path, "rt", encoding="utf-8") as f:
+            records = (json.loads(line) for line in f if line.strip())
+            yield from _skip(records, resume_state)
+    else:
+        with open(file_path, "r") as f:
+            records = json.load(f)
+        if isinstance(records, dict):
+            # A page of the Alpaca RESTful API.
+            records = records.get("news", [])
+
+        yield from _skip(iter(records), resume_state)
+
+
+def _skip(
+    records: Iterator[dict], resume_state: Optional[int]
+) -> Iterator[Tuple[dict, int]]:
+    first_record = resume_state or 0
+    for index, record in enumerate(records):
+        if index >= first_record:
+            yield record, index + 1
+
+
+def _import_parquet():
+    # pyarrow is imported lazily, as it is only required for reading Parquet files.
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError(
+            "Reading Parquet files requires pyarrow. Install the dependencies with: poetry install"
+        ) from e
+
+    return pq
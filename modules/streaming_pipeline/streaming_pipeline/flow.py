@@ -1,20 +1,36 @@
 import datetime
 from pathlib import Path
-from typing import List, Optional
+from typing import Callable, List, Optional, Tuple
 
 from bytewax.dataflow import Dataflow
 from bytewax.inputs import Input
-from bytewax.outputs import Output
 from bytewax.testing import TestingInput
+from bytewax.window import SystemClockConfig, TumblingWindow
 from pydantic import parse_obj_as
 from qdrant_client import QdrantClient
 
-from streaming_pipeline import mocked
+from streaming_pipeline import constants, mocked
 from streaming_pipeline.alpaca_batch import AlpacaNewsBatchInput
 from streaming_pipeline.alpaca_stream import AlpacaNewsStreamInput
+from streaming_pipeline.autoscaling import AutoscalingAdvisor
+from streaming_pipeline.boilerplate import BoilerplateStore
+from streaming_pipeline.collection import TimePartitionedCollections
+from streaming_pipeline.dedup import NearDuplicateFilter
 from streaming_pipeline.embeddings import EmbeddingModelSingleton
-from streaming_pipeline.models import NewsArticle
-from streaming_pipeline.qdrant import QdrantVectorOutput
+from streaming_pipeline.file_input import NewsFileInput
+from streaming_pipeline.metrics import MetricsRegistry, timed, utcnow
+from streaming_pipeline.models import Document, NewsArticle, PointLayout
+from streaming_pipeline.priority import PrioritizedInput
+from streaming_pipeline.qdrant import (
+    QdrantChunkDiff,
+    QdrantFastIndexer,
+    QdrantVectorOutput,
+)
+from streaming_pipeline.replay import NewsReplayInput
+from streaming_pipeline.segment_log import SegmentLogInput, SegmentLogOutput
+from streaming_pipeline.vector_store import LocalVectorStore
+
+_WINDOW_ALIGN_TO = datetime.datetime(2023, 1, 1, tzinfo=datetime.timezone.utc)
 
 
 def build(
@@ -22,6 +38,37 @@ def build(
     from_datetime: Optional[datetime.datetime] = None,
     to_datetime: Optional[datetime.datetime] = None,
     model_cache_dir: Optional[Path] = None,
+    replay_file_path: Optional[Path] = None,
+    replay_speed: Optional[float] = 1.0,
+    log_dir: Optional[Path] = None,
+    input_path: Optional[str] = None,
+    collection_name: str = constants.VECTOR_DB_OUTPUT_COLLECTION_NAME,
+    in_memory: bool = False,
+    local_vector_store_dir: Optional[Path] = None,
+    metrics_port: Optional[int] = None,
+    metrics_snapshot_path: Optional[Path] = None,
+    autoscaling_file_path: Optional[Path] = None,
+    autoscaling_history_file_path: Optional[Path] = None,
+    current_workers: int = 1,
+    freshness_alert_threshold_seconds: Optional[
+        float
+    ] = constants.FRESHNESS_ALERT_THRESHOLD_SECONDS,
+    max_content_bytes: Optional[int] = constants.ARTICLE_MAX_CONTENT_BYTES,
+    max_chunks_per_document: Optional[int] = constants.DOCUMENT_MAX_CHUNKS,
+    cleaning_time_budget_seconds: Optional[
+        float
+    ] = constants.ARTICLE_CLEANING_TIME_BUDGET_SECONDS,
+    divert_oversized: bool = False,
+    max_backfill_in_flight: int = constants.BACKFILL_MAX_IN_FLIGHT_ARTICLES,
+    deferred_content_window_seconds: Optional[float] = None,
+    coalesce_window_seconds: Optional[float] = None,
+    near_duplicate_policy: Optional[str] = None,
+    strip_boilerplate: bool = False,
+    boilerplate_file_path: Optional[Path] = None,
+    partition_granularity: Optional[str] = None,
+    retention_days: Optional[float] = None,
+    point_layout: str = PointLayout.CHUNK.value,
+    normalize_payloads: bool = False,
     debug: bool = False,
 ) -> Dataflow:
     """
@@ -30,44 +77,363 @@ def build(
     Args:
         is_batch (bool): Whether the pipeline is processing a batch of articles or a stream.
         from_datetime (Optional[datetime.datetime]): The start datetime for processing articles.
+            In real-time mode, the articles from [from_datetime, to_datetime] are backfilled in a low-priority lane.
         to_datetime (Optional[datetime.datetime]): The end datetime for processing articles.
         model_cache_dir (Optional[Path]): The directory to cache the embedding model.
-        debug (bool): Whether to enable debug mode.
+        replay_file_path (Optional[Path]): If provided, the articles are replayed from this recording
+            instead of being ingested from Alpaca.
+        replay_speed (Optional[float]): The speed of the replay relative to the recording, e.g. 10.0 for 10x.
+            Use None or 0 to replay as fast as possible.
+        log_dir (Optional[Path]): If provided, the articles are consumed from the segment-file log
+            written by the ingestion flow (see build_ingest) instead of being ingested from Alpaca.
+            In real-time mode, the flow keeps waiting for new articles, otherwise it stops at the end of the log.
+        input_path (Optional[str]): If provided, the articles are read from the JSON, JSONL or Parquet files
+            matched by this file, directory or glob pattern instead of being ingested from Alpaca.
+        collection_name (str): The name of the vector DB collection the embeddings are written to.
+        in_memory (bool): Whether to write the embeddings into an in-memory vector DB.
+        local_vector_store_dir (Optional[Path]): If provided, the embeddings are written into the embedded
+            LocalVectorStore persisted in this directory instead of Qdrant. Run it with a single process.
+        metrics_port (Optional[int]): If provided, the metrics are exposed in the Prometheus format
+            at http://0.0.0.0:<metrics_port>/metrics.
+        metrics_snapshot_path (Optional[Path]): If provided, the metrics are periodically written
+            in the Prometheus format to this file. Use the "{pid}" placeholder when running multiple processes.
+        autoscaling_file_path (Optional[Path]): If provided, the autoscaling signal (arrival & processing rates,
+            backlog age and the recommended number of workers) is periodically written as JSON to this file.
+            Use the "{pid}" placeholder when running multiple processes.
+        autoscaling_history_file_path (Optional[Path]): If provided, every autoscaling signal is appended
+            as a JSON line to this file. When replaying, the rates are scaled by the replay speed,
+            which simulates the recommendations for the recorded volume.
+        current_workers (int): The number of workers of this process, used by the autoscaling signal.
+            With multiple processes, every process computes the signal for its own share of the stream only.
+        freshness_alert_threshold_seconds (Optional[float]): A warning is logged for every article
+            that becomes searchable later than this after its creation. Use None to disable the alerts.
+        max_content_bytes (Optional[int]): Articles with a larger raw content are truncated. Use None for no limit.
+        max_chunks_per_document (Optional[int]): The maximum number of chunks embedded per article.
+            Use None for no limit.
+        cleaning_time_budget_seconds (Optional[float]): The time budget for cleaning a single article.
+            Use None for no limit.
+        divert_oversized (bool): In real-time mode, whether to divert the live articles larger than
+            max_content_bytes to the low-priority lane instead of processing them right away.
+        max_backfill_in_flight (int): The low-priority articles are admitted only while fewer articles
+            than this are in flight.
+        deferred_content_window_seconds (Optional[float]): If provided, the articles are indexed in two phases:
+            their headline & summary are indexed right away, while their contents are batched
+            in windows of this length. Use None to index the whole articles at once.
+        coalesce_window_seconds (Optional[float]): If provided, the revisions of an article received within
+            the same window of this length are coalesced, and only the latest one is processed.
+            It is also the maximum time an article is held. Use None to process every revision.
+        near_duplicate_policy (Optional[str]): What to do with the articles whose content is a near-duplicate
+            of a recent one: "drop" them or "link" them to the original one, indexing only their headline
+            & summary. Use None to disable the near-duplicate detection.
+        strip_boilerplate (bool): Whether to learn the paragraphs that recur across many articles
+            and strip them before chunking.
+        boilerplate_file_path (Optional[Path]): If provided, the learned boilerplate paragraphs are loaded from
+            and persisted to this file. The "{pid}" placeholder is replaced with the process ID.
+        partition_granularity (Optional[str]): If provided, the articles are written into time-bucketed collections
+            of this granularity ("day" or "week"), by their creation time. Use None to write into a single collection.
+        retention_days (Optional[float]): If provided, together with partition_granularity, the buckets that ended
+            longer ago than this are dropped.
+        point_layout (str): "chunk" to write one point per chunk or "article" to write a single point per article,
+            with one named vector per field: the headline, the summary & the mean of the content chunks.
+            The "article" layout doesn't support the two-phase indexing nor the local vector store.
+        normalize_payloads (bool): Whether to store the metadata of every article once in a payload-only collection
+            (see DocumentStore), while its chunks keep only the fields they are filtered by. The hits are hydrated
+            with the metadata of their articles at search time.
+        debug (bool): Whether to enable debug mode. It also implies an in-memory vector DB.
 
     Returns:
         Dataflow: The dataflow pipeline for processing news articles.
     """
 
+    point_layout = PointLayout(point_layout)
+    if (
+        point_layout == PointLayout.ARTICLE
+        and deferred_content_window_seconds is not None
+    ):
+        raise ValueError(
+            "The two-phase indexing writes the chunks of an article in separate phases, "
+            "hence it requires the 'chunk' point layout."
+        )
+
     model = EmbeddingModelSingleton(cache_dir=model_cache_dir)
-    is_input_mocked = debug is True and is_batch is False
+    boilerplate_store = (
+        BoilerplateStore(file_path=boilerplate_file_path) if strip_boilerplate else None
+    )
+    metrics = MetricsRegistry()
+    if metrics_port is not None:
+        metrics.start_http_server(port=metrics_port)
+    if metrics_snapshot_path is not None:
+        metrics.start_snapshot_writer(file_path=metrics_snapshot_path)
+    if autoscaling_file_path is not None or autoscaling_history_file_path is not None:
+        AutoscalingAdvisor(
+            current_workers=current_workers,
+            output_file_path=autoscaling_file_path,
+            history_file_path=autoscaling_history_file_path,
+            time_scale=replay_speed if replay_file_path is not None else 1.0,
+        ).start()
+    is_input_mocked = (
+        debug is True
+        and is_batch is False
+        and replay_file_path is None
+        and log_dir is None
+        and input_path is None
+    )
+
+    output = _build_output(
+        model,
+        collection_name=collection_name,
+        in_memory=debug or in_memory,
+        local_vector_store_dir=local_vector_store_dir,
+        freshness_alert_threshold_seconds=freshness_alert_threshold_seconds,
+        partition_granularity=partition_granularity,
+        retention_days=retention_days,
+        point_layout=point_layout,
+        normalize_payloads=normalize_payloads,
+    )
 
     flow = Dataflow()
     flow.input(
         "input",
         _build_input(
-            is_batch, from_datetime, to_datetime, is_input_mocked=is_input_mocked
+            is_batch,
+            from_datetime,
+            to_datetime,
+            replay_file_path=replay_file_path,
+            replay_speed=replay_speed,
+            log_dir=log_dir,
+            input_path=input_path,
+            is_input_mocked=is_input_mocked,
+            divert_content_bytes=max_content_bytes if divert_oversized else None,
+            max_backfill_in_flight=max_backfill_in_flight,
         ),
     )
-    flow.flat_map(lambda messages: parse_obj_as(List[NewsArticle], messages))
+    flow.flat_map(timed("parse", _parse_articles))
+    if coalesce_window_seconds is not None:
+        flow.map(_to_coalescing_shard)
+        # Tumbling windows bound the time an article is held, even if it keeps being revised.
+        flow.fold_window(
+            "coalesce_revisions",
+            SystemClockConfig(),
+            TumblingWindow(
+                length=datetime.timedelta(seconds=coalesce_window_seconds),
+                align_to=_WINDOW_ALIGN_TO,
+            ),
+            dict,
+            _keep_latest_revision,
+        )
+        flow.flat_map(lambda shard_revisions: list(shard_revisions[1].values()))
     if debug:
         flow.inspect(print)
-    flow.map(lambda article: article.to_document())
-    flow.map(lambda document: document.compute_chunks(model))
-    flow.map(lambda document: document.compute_embeddings(model))
-    flow.output("output", _build_output(model, in_memory=debug))
+    flow.map(
+        timed(
+            "to_document",
+            lambda article: article.to_document(
+                max_content_bytes=max_content_bytes,
+                cleaning_time_budget_seconds=cleaning_time_budget_seconds,
+                boilerplate_store=boilerplate_store,
+            ),
+        )
+    )
+    if output.partitions is not None and retention_days is not None:
+        flow.filter_map(_build_retention_filter(output.partitions))
+    if near_duplicate_policy is not None:
+        flow.filter_map(
+            timed("dedup", NearDuplicateFilter(policy=near_duplicate_policy))
+        )
+    if deferred_content_window_seconds is not None:
+        fast_indexer = QdrantFastIndexer(
+            client=output.client,
+            model=model,
+            collection_name=collection_name,
+            max_chunks=max_chunks_per_document,
+            freshness_alert_threshold_seconds=freshness_alert_threshold_seconds,
+            partitions=output.partitions,
+            document_store=output.document_store,
+        )
+        flow.filter_map(timed("fast_index", fast_indexer))
+        flow.map(_to_deferred_content_shard)
+        flow.collect_window(
+            "defer_content",
+            SystemClockConfig(),
+            TumblingWindow(
+                length=datetime.timedelta(seconds=deferred_content_window_seconds),
+                align_to=_WINDOW_ALIGN_TO,
+            ),
+        )
+        flow.flat_map(lambda shard_documents: shard_documents[1])
+    chunk_diff = QdrantChunkDiff(
+        client=output.client,
+        collection_name=collection_name,
+        partitions=output.partitions,
+        point_layout=point_layout,
+    )
+    if point_layout == PointLayout.ARTICLE:
+        # The fields are chunked & pooled while embedding them, hence only the outdated revisions are diffed.
+        flow.filter_map(timed("diff", chunk_diff))
+        flow.map(
+            timed(
+                "embed",
+                lambda document: document.compute_named_embeddings(
+                    model, max_chunks=max_chunks_per_document
+                ),
+            )
+        )
+    else:
+        flow.map(
+            timed(
+                "chunk",
+                lambda document: document.compute_chunks(
+                    model, max_chunks=max_chunks_per_document
+                ),
+            )
+        )
+        flow.filter_map(timed("diff", chunk_diff))
+        flow.map(timed("embed", lambda document: document.compute_embeddings(model)))
+    flow.output("output", output)
 
     return flow
 
 
+def build_ingest(
+    log_dir: Path,
+    is_batch: bool = False,
+    from_datetime: Optional[datetime.datetime] = None,
+    to_datetime: Optional[datetime.datetime] = None,
+    replay_file_path: Optional[Path] = None,
+    replay_speed: Optional[float] = 1.0,
+    retention_seconds: Optional[float] = None,
+    debug: bool = False,
+) -> Dataflow:
+    """
+    Builds a dataflow pipeline that only ingests the raw news articles into a local segment-file log.
+
+    The embedding flow consumes the log independently (see build(log_dir=...)), hence the ingestion
+    and the computation can be scaled and restarted separately, and the raw articles can be replayed
+    into a new embedding model without calling the Alpaca API again.
+
+    Args:
+        log_dir (Path): The directory of the log. Every worker appends to its own partition.
+        is_batch (bool): Whether the pipeline is ingesting a batch of articles or a stream.
+        from_datetime (Optional[datetime.datetime]): The start datetime for ingesting articles.
+            In real-time mode, the articles from [from_datetime, to_datetime] are backfilled in a low-priority lane.
+        to_datetime (Optional[datetime.datetime]): The end datetime for ingesting articles.
+        replay_file_path (Optional[Path]): If provided, the articles are replayed from this recording
+            instead of being ingested from Alpaca.
+        replay_speed (Optional[float]): The speed of the replay relative to the recording.
+        retention_seconds (Optional[float]): If provided, the full segments older than this are deleted.
+        debug (bool): Whether to enable debug mode, ingesting mocked articles.
+
+    Returns:
+        Dataflow: The dataflow pipeline for ingesting news articles.
+    """
+
+    flow = Dataflow()
+    flow.input(
+        "input",
+        _build_input(
+            is_batch,
+            from_datetime,
+            to_datetime,
+            replay_file_path=replay_file_path,
+            replay_speed=replay_speed,
+            is_input_mocked=debug is True
+            and is_batch is False
+            and replay_file_path is None,
+        ),
+    )
+    flow.output(
+        "output", SegmentLogOutput(log_dir, retention_seconds=retention_seconds)
+    )
+
+    return flow
+
+
+def _parse_articles(messages: List[dict]) -> List[NewsArticle]:
+    articles = parse_obj_as(List[NewsArticle], messages)
+    received_at = utcnow()
+    for article in articles:
+        article.received_at = received_at
+
+    metrics = MetricsRegistry()
+    for article in articles:
+        metrics.increment("articles_received", labels={"lane": article.priority.value})
+    metrics.add_gauge("in_flight_articles", len(articles))
+
+    return articles
+
+
+def _to_coalescing_shard(article: NewsArticle) -> Tuple[str, NewsArticle]:
+    # Shard by article ID, instead of keying by it, as Bytewax keeps the window state of every key forever.
+    shard = article.id % constants.COALESCE_N_SHARDS
+
+    return str(shard), article
+
+
+def _keep_latest_revision(revisions: dict, article: NewsArticle) -> dict:
+    previous_revision = revisions.get(article.id)
+    if previous_revision is not None:
+        metrics = MetricsRegistry()
+        metrics.increment("revisions_coalesced")
+        metrics.add_gauge("in_flight_articles", -1)
+
+        if previous_revision.updated_at > article.updated_at:
+            return revisions
+
+        # Keep the original arrival time, to account for the hold in the freshness.
+        article.received_at = previous_revision.received_at
+
+    revisions[article.id] = article
+
+    return revisions
+
+
+def _build_retention_filter(
+    partitions: TimePartitionedCollections,
+) -> Callable[[Document], Optional[Document]]:
+    def drop_expired(document: Document) -> Optional[Document]:
+        # Otherwise, old articles (e.g., from a backfill) would recreate the dropped buckets.
+        if partitions.is_expired(document.timestamps["created_at"]):
+            metrics = MetricsRegistry()
+            metrics.increment("expired_documents_dropped")
+            metrics.add_gauge("in_flight_articles", -1)
+
+            return None
+
+        return document
+
+    return drop_expired
+
+
+def _to_deferred_content_shard(document: Document) -> Tuple[str, Document]:
+    shard = int(document.id, 16) % constants.DEFERRED_CONTENT_N_SHARDS
+
+    return str(shard), document
+
+
 def _build_input(
     is_batch: bool = False,
     from_datetime: Optional[datetime.datetime] = None,
     to_datetime: Optional[datetime.datetime] = None,
+    replay_file_path: Optional[Path] = None,
+    replay_speed: Optional[float] = 1.0,
+    log_dir: Optional[Path] = None,
+    input_path: Optional[str] = None,
     is_input_mocked: bool = False,
+    divert_content_bytes: Optional[int] = None,
+    max_backfill_in_flight: int = constants.BACKFILL_MAX_IN_FLIGHT_ARTICLES,
 ) -> Input:
     if is_input_mocked is True:
         return TestingInput(mocked.financial_news)
 
+    if log_dir is not None:
+        return SegmentLogInput(dir_path=log_dir, follow=not is_batch)
+
+    if input_path is not None:
+        return NewsFileInput(path=input_path)
+
+    if replay_file_path is not None:
+        return NewsReplayInput(file_path=replay_file_path, speed=replay_speed)
+
     if is_batch:
         assert (
             from_datetime is not None and to_datetime is not None
@@ -76,17 +442,62 @@ def _build_input(
         return AlpacaNewsBatchInput(
             from_datetime=from_datetime, to_datetime=to_datetime, tickers=["*"]
         )
-    else:
+    elif from_datetime is None and divert_content_bytes is None:
         return AlpacaNewsStreamInput(tickers=["*"])
+    else:
+        # The live lane must not block the worker, otherwise the low-priority lane is never served.
+        live_input = AlpacaNewsStreamInput(
+            tickers=["*"], recv_timeout_seconds=constants.LIVE_RECV_TIMEOUT_SECONDS
+        )
+        backfill_input = None
+        if from_datetime is not None:
+            assert (
+                to_datetime is not None
+            ), "to_datetime must be provided together with from_datetime"
+
+            backfill_input = AlpacaNewsBatchInput(
+                from_datetime=from_datetime, to_datetime=to_datetime, tickers=["*"]
+            )
+
+        return PrioritizedInput(
+            live_input=live_input,
+            backfill_input=backfill_input,
+            max_backfill_in_flight=max_backfill_in_flight,
+            divert_content_bytes=divert_content_bytes,
+        )
 
 
-def _build_output(model: EmbeddingModelSingleton, in_memory: bool = False) -> Output:
-    if in_memory:
+def _build_output(
+    model: EmbeddingModelSingleton,
+    collection_name: str = constants.VECTOR_DB_OUTPUT_COLLECTION_NAME,
+    in_memory: bool = False,
+    local_vector_store_dir: Optional[Path] = None,
+    freshness_alert_threshold_seconds: Optional[float] = None,
+    partition_granularity: Optional[str] = None,
+    retention_days: Optional[float] = None,
+    point_layout: PointLayout = PointLayout.CHUNK,
+    normalize_payloads: bool = False,
+) -> QdrantVectorOutput:
+    if in_memory or local_vector_store_dir is not None:
         return QdrantVectorOutput(
-            vector_size=model.max_input_length,
-            client=QdrantClient(":memory:"),
+            vector_size=model.embedding_size,
+            collection_name=collection_name,
+            client=LocalVectorStore(dir_path=local_vector_store_dir)
+            if local_vector_store_dir is not None
+            else QdrantClient(":memory:"),
+            freshness_alert_threshold_seconds=freshness_alert_threshold_seconds,
+            partition_granularity=partition_granularity,
+            retention_days=retention_days,
+            point_layout=point_layout,
+            normalize_payloads=normalize_payloads,
         )
     else:
         return QdrantVectorOutput(
-            vector_size=model.max_input_length,
+            vector_size=model.embedding_size,
+            collection_name=collection_name,
+            freshness_alert_threshold_seconds=freshness_alert_threshold_seconds,
+            partition_granularity=partition_granularity,
+            retention_days=retention_days,
+            point_layout=point_layout,
+            normalize_payloads=normalize_payloads,
         )
@@ -0,0 +1,608 @@
+import datetime
+import functools
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from threading import Lock
+from typing import Callable, Dict, Iterator, Optional, Sequence, Tuple, Union
+
+from streaming_pipeline.base import SingletonMeta
+
+logger = logging.getLogger(__name__)
+
+
+METRICS_PREFIX = "streaming_pipeline"
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+COUNT_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+FRESHNESS_BUCKETS = (0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 900.0, 3600.0)
+SUMMARY_QUANTILES = (0.5, 0.95, 0.99)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """
+    A cumulative histogram with fixed buckets, compatible with the Prometheus histogram type.
+
+    Args:
+        buckets (Sequence[float]): The upper bounds of the buckets, in increasing order.
+    """
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.bucket_counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        for i, upper_bound in enumerate(self.buckets):
+            if value <= upper_bound:
+                self.bucket_counts[i] += 1
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "buckets": dict(zip(self.buckets, self.bucket_counts)),
+        }
+
+
+class Summary:
+    """
+    Computes quantiles over a sliding window of the latest observations,
+    compatible with the Prometheus summary type.
+
+    Args:
+        quantiles (Sequence[float]): The quantiles to compute.
+        max_samples (int): The size of the sliding window.
+    """
+
+    def __init__(
+        self,
+        quantiles: Sequence[float] = SUMMARY_QUANTILES,
+        max_samples: int = 10000,
+    ):
+        self.quantiles = tuple(quantiles)
+        self.samples = deque(maxlen=max_samples)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        self.samples.append(value)
+
+    def compute_quantiles(self) -> Dict[float, float]:
+        """
+        Returns the value of every quantile over the sliding window, using the nearest-rank method.
+        """
+
+        if len(self.samples) == 0:
+            return {quantile: math.nan for quantile in self.quantiles}
+
+        samples = sorted(self.samples)
+
+        return {
+            quantile: samples[min(len(samples) - 1, int(quantile * len(samples)))]
+            for quantile in self.quantiles
+        }
+
+
+class MetricsRegistry(metaclass=SingletonMeta):
+    """
+    A thread-safe, process-wide registry of the streaming pipeline metrics.
+
+    It holds counters, gauges, histograms and summaries identified by their name and labels,
+    and renders them in the Prometheus text exposition format.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._gauges: Dict[Tuple[str, Labels], float] = {}
+        self._histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self._summaries: Dict[Tuple[str, Labels], Summary] = {}
+
+        self._http_server = None
+        self._snapshot_writer = None
+
+    def increment(
+        self, name: str, value: float = 1, labels: Optional[dict] = None
+    ) -> None:
+        """
+        Increments a counter.
+
+        Args:
+            name (str): The name of the counter.
+            value (float): The value to add to the counter.
+            labels (Optional[dict]): The labels of the counter.
+        """
+
+        key = (name, _to_labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def add_gauge(self, name: str, value: float, labels: Optional[dict] = None) -> None:
+        """
+        Adds a (possibly negative) value to a gauge.
+
+        Args:
+            name (str): The name of the gauge.
+            value (float): The value to add to the gauge.
+            labels (Optional[dict]): The labels of the gauge.
+        """
+
+        key = (name, _to_labels(labels))
+        with self._lock:
+            self._gauges[key] = self._gauges.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, labels: Optional[dict] = None) -> None:
+        """
+        Sets the value of a gauge.
+
+        Args:
+            name (str): The name of the gauge.
+            value (float): The new value of the gauge.
+            labels (Optional[dict]): The labels of the gauge.
+        """
+
+        key = (name, _to_labels(labels))
+        with self._lock:
+            self._gauges[key] = value
+
+    def observe(
+        self,
+        name: str,
+        value: float,
+        labels: Optional[dict] = None,
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        """
+        Records a value into a histogram.
+
+        Args:
+            name (str): The name of the histogram.
+            value (float): The observed value.
+            labels (Optional[dict]): The labels of the histogram.
+            buckets (Sequence[float]): The buckets used when the histogram is created.
+        """
+
+        key = (name, _to_labels(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def observe_summary(
+        self, name: str, value: float, labels: Optional[dict] = None
+    ) -> None:
+        """
+        Records a value into a summary that tracks the p50/p95/p99 quantiles.
+
+        Args:
+            name (str): The name of the summary.
+            value (float): The observed value.
+            labels (Optional[dict]): The labels of the summary.
+        """
+
+        key = (name, _to_labels(labels))
+        with self._lock:
+            summary = self._summaries.get(key)
+            if summary is None:
+                summary = self._summaries[key] = Summary()
+            summary.observe(value)
+
+    def get_quantiles(
+        self, name: str, labels: Optional[dict] = None
+    ) -> Dict[float, float]:
+        with self._lock:
+            summary = self._summaries.get((name, _to_labels(labels)))
+            if summary is None:
+                return {}
+
+            return summary.compute_quantiles()
+
+    def observe_stage(self, stage: str, seconds: float) -> None:
+        """
+        Records that a stage processed one item in the given amount of time.
+
+        Args:
+            stage (str): The name of the stage.
+            seconds (float): The time spent processing the item.
+        """
+
+        self.observe("stage_latency_seconds", seconds, labels={"stage": stage})
+
+    @contextmanager
+    def time_stage(self, stage: str) -> Iterator[None]:
+        """
+        Context manager that records the time spent inside it under the given stage name.
+        If an exception is raised, the errors counter of the stage is incremented as well.
+
+        Args:
+            stage (str): The name of the stage.
+        """
+
+        started_at = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.increment("stage_errors", labels={"stage": stage})
+
+            raise
+        finally:
+            self.observe_stage(stage, time.perf_counter() - started_at)
+
+    def get_counter(self, name: str, labels: Optional[dict] = None) -> float:
+        with self._lock:
+            return self._counters.get((name, _to_labels(labels)), 0)
+
+    def get_gauge(self, name: str, labels: Optional[dict] = None) -> float:
+        with self._lock:
+            return self._gauges.get((name, _to_labels(labels)), 0)
+
+    def stages(self) -> Dict[str, dict]:
+        """
+        Returns the number of processed items, the total time spent and the errors of every stage.
+        """
+
+        with self._lock:
+            stages = {}
+            for (name, labels), histogram in self._histograms.items():
+                if name != "stage_latency_seconds":
+                    continue
+
+                stage = dict(labels)["stage"]
+                stages[stage] = {
+                    "count": histogram.count,
+                    "total_seconds": histogram.sum,
+                    "errors": self._counters.get(("stage_errors", labels), 0),
+                }
+
+            return stages
+
+    def counters(self) -> Dict[str, float]:
+        """
+        Returns the value of every counter, summed over all its labels.
+        """
+
+        with self._lock:
+            counters = {}
+            for (name, _), value in self._counters.items():
+                counters[name] = counters.get(name, 0) + value
+
+            return counters
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+            self._summaries.clear()
+
+    def to_prometheus(self) -> str:
+        """
+        Renders all the metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: The rendered metrics.
+        """
+
+        lines = []
+        with self._lock:
+            for metric_type, metrics in [
+                ("counter", self._counters),
+                ("gauge", self._gauges),
+                ("histogram", self._histograms),
+                ("summary", self._summaries),
+            ]:
+                declared = set()
+                for (name, labels), value in sorted(metrics.items()):
+                    full_name = f"{METRICS_PREFIX}_{name}"
+                    if metric_type == "counter":
+                        full_name = f"{full_name}_total"
+
+                    if full_name not in declared:
+                        lines.append(f"# TYPE {full_name} {metric_type}")
+                        declared.add(full_name)
+
+                    if metric_type == "histogram":
+                        lines.extend(_render_histogram(full_name, labels, value))
+                    elif metric_type == "summary":
+                        lines.extend(_render_summary(full_name, labels, value))
+                    else:
+                        lines.append(
+                            f"{full_name}{_render_labels(labels)} {_render_value(value)}"
+                        )
+
+        return "\n".join(lines) + "\n"
+
+    def start_http_server(self, port: int, host: str = "0.0.0.0") -> None:
+        """
+        Exposes the metrics at http://<host>:<port>/metrics from a background thread.
+        Calling it multiple times within the same process is a no-op.
+
+        Args:
+            port (int): The port to listen on.
+            host (str): The host to bind to.
+        """
+
+        if self._http_server is not None:
+            return
+
+        try:
+            self._http_server = ThreadingHTTPServer(
+                (host, port), _MetricsRequestHandler
+            )
+        except OSError as e:
+            logger.warning(f"Could not expose the metrics on port {port}: {e}")
+
+            return
+
+        self._http_server.daemon_threads = True
+        self._http_server.registry = self
+        threading.Thread(target=self._http_server.serve_forever, daemon=True).start()
+
+        logger.info(f"Exposing the metrics at http://{host}:{port}/metrics")
+
+    def start_snapshot_writer(
+        self, file_path: Union[str, Path], interval_seconds: float = 15.0
+    ) -> None:
+        """
+        Periodically writes the metrics in the Prometheus text format to a file from a background thread.
+        The file is replaced atomically, so it can be scraped by the node_exporter textfile collector.
+        Calling it multiple times within the same process is a no-op.
+
+        Args:
+            file_path (Union[str, Path]): The path of the snapshot file.
+                The "{pid}" placeholder is replaced with the process ID.
+            interval_seconds (float): How often to write the snapshot.
+        """
+
+        if self._snapshot_writer is not None:
+            return
+
+        file_path = Path(str(file_path).format(pid=os.getpid()))
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+
+        def write_snapshots():
+            while True:
+                self.write_snapshot(file_path)
+                time.sleep(interval_seconds)
+
+        self._snapshot_writer = threading.Thread(target=write_snapshots, daemon=True)
+        self._snapshot_writer.start()
+
+        logger.info(
+            f"Writing metrics snapshots to {file_path} every {interval_seconds} seconds."
+        )
+
+    def write_snapshot(self, file_path: Union[str, Path]) -> None:
+        """
+        Atomically writes the metrics in the Prometheus text format to a file.
+
+        Args:
+            file_path (Union[str, Path]): The path of the snapshot file.
+        """
+
+        file_path = Path(file_path)
+        tmp_file_path = file_path.with_name(f".{file_path.name}.tmp")
+        tmp_file_path.write_text(self.to_prometheus())
+        os.replace(tmp_file_path, file_path)
+
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") != "/metrics":
+            self.send_error(404)
+
+            return
+
+        data = self.server.registry.to_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FreshnessTracker:
+    """
+    Tracks how long after its creation an article becomes searchable in the vector DB.
+
+    The freshness lag is split into the following segments:
+    * source: from the article creation (`created_at`) until it was received by the flow;
+    * processing: from its arrival until its embeddings were computed;
+    * sink: from the computed embeddings until the vector DB acknowledged the write.
+
+    Args:
+        alert_threshold_seconds (Optional[float]): If provided, a warning is logged
+            and an alert counter is incremented for every article that became searchable later than it.
+        registry (Optional[MetricsRegistry]): The registry to record the metrics into.
+    """
+
+    def __init__(
+        self,
+        alert_threshold_seconds: Optional[float] = None,
+        registry: Optional[MetricsRegistry] = None,
+    ):
+        self._alert_threshold_seconds = alert_threshold_seconds
+        self._registry = registry or MetricsRegistry()
+
+    def observe(
+        self,
+        timestamps: dict,
+        acked_at: Optional[datetime.datetime] = None,
+        labels: Optional[dict] = None,
+        alert: bool = True,
+    ) -> Optional[float]:
+        """
+        Records the freshness lag of an article that was just written to the vector DB.
+
+        Args:
+            timestamps (dict): The "created_at", "received_at" & "embedded_at" timestamps of the article.
+            acked_at (Optional[datetime.datetime]): When the write was acknowledged. Defaults to now.
+            labels (Optional[dict]): Extra labels of the freshness metrics (e.g., the lane of the article).
+            alert (bool): Whether to alert if the article is slower than the threshold.
+
+        Returns:
+            Optional[float]: The freshness lag in seconds or None if the article was not stamped.
+        """
+
+        created_at = timestamps.get("created_at")
+        if created_at is None:
+            return None
+
+        if acked_at is None:
+            acked_at = utcnow()
+        stamps = [
+            ("source", created_at, timestamps.get("received_at")),
+            (
+                "processing",
+                timestamps.get("received_at"),
+                timestamps.get("embedded_at"),
+            ),
+            ("sink", timestamps.get("embedded_at"), acked_at),
+        ]
+        for segment, started_at, ended_at in stamps:
+            if started_at is not None and ended_at is not None:
+                self._registry.observe_summary(
+                    "freshness_segment_seconds",
+                    (ended_at - started_at).total_seconds(),
+                    labels={**(labels or {}), "segment": segment},
+                )
+
+        lag_seconds = (acked_at - created_at).total_seconds()
+        self._registry.observe_summary("freshness_lag_seconds", lag_seconds, labels)
+        self._registry.observe(
+            "freshness_lag_seconds_histogram",
+            lag_seconds,
+            labels=labels,
+            buckets=FRESHNESS_BUCKETS,
+        )
+
+        if (
+            alert
+            and self._alert_threshold_seconds is not None
+            and lag_seconds > self._alert_threshold_seconds
+        ):
+            self._registry.increment("freshness_alerts")
+            logger.warning(
+                f"Article became searchable {lag_seconds:.1f}s after its creation, "
+                f"above the {self._alert_threshold_seconds}s freshness threshold."
+            )
+
+        return lag_seconds
+
+
+def utcnow() -> datetime.datetime:
+    """
+    Returns the current time as a timezone-aware UTC datetime, comparable with the Alpaca timestamps.
+    """
+
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+def timed(stage: str, func: Callable) -> Callable:
+    """
+    Wraps a step of the flow to record its processing time and errors under the given stage name.
+
+    Args:
+        stage (str): The name of the stage.
+        func (Callable): The function applied by the step.
+
+    Returns:
+        Callable: The wrapped function.
+    """
+
+    registry = MetricsRegistry()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with registry.time_stage(stage):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def _to_labels(labels: Optional[dict]) -> Labels:
+    if not labels:
+        return ()
+
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _render_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+
+    rendered = ",".join(
+        f'{key}="{_escape_label_value(value)}"' for key, value in labels
+    )
+
+    return f"{{{rendered}}}"
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _render_value(value: float) -> str:
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _render_histogram(name: str, labels: Labels, histogram: Histogram) -> list:
+    lines = []
+    for upper_bound, count in zip(histogram.buckets, histogram.bucket_counts):
+        bucket_labels = labels + (("le", _render_value(upper_bound)),)
+        lines.append(f"{name}_bucket{_render_labels(bucket_labels)} {count}")
+    lines.append(
+        f'{name}_bucket{_render_labels(labels + (("le", "+Inf"),))} {histogram.count}'
+    )
+    lines.append(f"{name}_sum{_render_labels(labels)} {_render_value(histogram.sum)}")
+    lines.append(f"{name}_count{_render_labels(labels)} {histogram.count}")
+
+    return lines
+
+
+def _render_summary(name: str, labels: Labels, summary: Summary) -> list:
+    lines = []
+    for quantile, value in summary.compute_quantiles().items():
+        quantile_labels = labels + (("quantile", _render_value(quantile)),)
+        lines.append(f"{name}{_render_labels(quantile_labels)} {_render_value(value)}")
+    lines.append(f"{name}_sum{_render_labels(labels)} {_render_value(summary.sum)}")
+    lines.append(f"{name}_count{_render_labels(labels)} {summary.count}")
+
+    return lines
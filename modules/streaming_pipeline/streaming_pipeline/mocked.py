@@ -1,3 +1,7 @@
+import datetime
+import random
+from typing import List, Optional
+
 financial_news = [
     [
         {
@@ -30,3 +34,98 @@ financial_news = [
         }
     ],
 ]
+
+
+_SYMBOLS = [
+    "AAPL",
+    "TSLA",
+    "MSFT",
+    "NVDA",
+    "AMZN",
+    "META",
+    "GOOGL",
+    "SGMO",
+    "CFRX",
+    "AMD",
+]
+_SOURCES = ["benzinga", "realtime"]
+_AUTHORS = ["Benzinga Newsdesk", "Benzinga Insights", "Vandana Singh", "Chris Katje"]
+_WORDS = (
+    "shares company announced quarter revenue growth guidance analysts market "
+    "investors earnings trial results board approval acquisition deal product "
+    "demand supply margin outlook fiscal sales report rating target price stock "
+    "percent billion million share dividend expects strong weak higher lower"
+).split()
+
+
+def generate_financial_news(
+    n_articles: int,
+    from_datetime: Optional[datetime.datetime] = None,
+    to_datetime: Optional[datetime.datetime] = None,
+    min_paragraphs: int = 2,
+    max_paragraphs: int = 12,
+    start_id: int = 40000000,
+    seed: int = 42,
+) -> List[dict]:
+    """
+    Generates synthetic news articles with the same schema as the Alpaca news API.
+
+    The articles are deterministic for a given seed and are sorted by their creation time.
+
+    Args:
+        n_articles (int): The number of articles to generate.
+        from_datetime (Optional[datetime.datetime]): The creation time of the first article. Defaults to 1 day ago.
+        to_datetime (Optional[datetime.datetime]): The creation time of the last article. Defaults to now.
+        min_paragraphs (int): The minimum number of HTML paragraphs of an article's content.
+        max_paragraphs (int): The maximum number of HTML paragraphs of an article's content.
+        start_id (int): The ID of the first article.
+        seed (int): The seed of the random generator.
+
+    Returns:
+        List[dict]: A list of news articles.
+    """
+
+    rng = random.Random(seed)
+
+    if to_datetime is None:
+        to_datetime = datetime.datetime.utcnow()
+    if from_datetime is None:
+        from_datetime = to_datetime - datetime.timedelta(days=1)
+    step = (to_datetime - from_datetime) / max(n_articles, 1)
+
+    def sentence(n_words: int) -> str:
+        words = [rng.choice(_WORDS) for _ in range(n_words)]
+
+        return " ".join(words).capitalize() + "."
+
+    articles = []
+    for i in range(n_articles):
+        symbols = rng.sample(_SYMBOLS, k=rng.randint(1, 3))
+        created_at = from_datetime + i * step
+        updated_at = created_at + datetime.timedelta(seconds=rng.randint(0, 120))
+        summary = " ".join(sentence(rng.randint(8, 20)) for _ in range(2))
+        paragraphs = [
+            " ".join(sentence(rng.randint(8, 25)) for _ in range(rng.randint(2, 6)))
+            for _ in range(rng.randint(min_paragraphs, max_paragraphs))
+        ]
+        paragraphs.append(
+            f"<strong>Price Action:</strong> {symbols[0]} shares are "
+            f"{rng.choice(['up', 'down'])} {rng.uniform(0.1, 15):.2f}% at ${rng.uniform(1, 500):.2f}."
+        )
+
+        articles.append(
+            {
+                "id": start_id + i,
+                "headline": f"{symbols[0]} {sentence(rng.randint(6, 14))}",
+                "summary": summary,
+                "author": rng.choice(_AUTHORS),
+                "created_at": created_at.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "updated_at": updated_at.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "url": f"https://www.benzinga.com/news/{start_id + i}",
+                "content": "".join(f"<p>{paragraph}</p>" for paragraph in paragraphs),
+                "symbols": symbols,
+                "source": rng.choice(_SOURCES),
+            }
+        )
+
+    return articles
@@ -1,6 +1,10 @@
 import hashlib
+import re
+import time
+import uuid
 from datetime import datetime
-from typing import List, Optional, Tuple
+from enum import Enum
+from typing import List, Optional, Sequence, Tuple
 
 from pydantic import BaseModel
 from unstructured.cleaners.core import (
@@ -11,7 +15,40 @@ from unstructured.cleaners.core import (
 from unstructured.partition.html import partition_html
 from unstructured.staging.huggingface import chunk_by_attention_window
 
+from streaming_pipeline import constants
+from streaming_pipeline.boilerplate import BoilerplateStore
 from streaming_pipeline.embeddings import EmbeddingModelSingleton
+from streaming_pipeline.metrics import MetricsRegistry, utcnow
+
+# Blocks that never contain any article text, but can be huge (e.g., inlined scripts or styles).
+_NON_TEXT_HTML_BLOCKS = re.compile(
+    r"<(script|style|noscript)\b[^>]*>.*?</\1\s*>", flags=re.IGNORECASE | re.DOTALL
+)
+# Closing tags after which the HTML can be safely cut without splitting a paragraph.
+_HTML_BLOCK_BOUNDARY = re.compile(
+    r"</(?:p|div|table|ul|ol|li|h[1-6]|blockquote|pre)\s*>", flags=re.IGNORECASE
+)
+# The HTML is partitioned in segments of roughly this size to enforce the cleaning time budget.
+_HTML_SEGMENT_BYTES = 16 * 1024
+
+
+class Priority(str, Enum):
+    """
+    The lane an article is processed in. Live articles are always served before the backfill ones.
+    """
+
+    LIVE = "live"
+    BACKFILL = "backfill"
+
+
+class PointLayout(str, Enum):
+    """
+    How a document is stored in the vector DB: one point per chunk or a single point per article,
+    with one named vector per field (see constants.ARTICLE_VECTOR_NAMES).
+    """
+
+    CHUNK = "chunk"
+    ARTICLE = "article"
 
 
 class NewsArticle(BaseModel):
@@ -29,6 +66,8 @@ class NewsArticle(BaseModel):
         content (str): Content of the news article (might contain HTML)
         symbols (List[str]): List of related or mentioned symbols
         source (str): Source where the news originated from (e.g. Benzinga)
+        received_at (Optional[datetime]): Date the article was received by the streaming pipeline
+        priority (Priority): The lane the article is processed in
     """
 
     id: int
@@ -41,21 +80,51 @@ class NewsArticle(BaseModel):
     content: str
     symbols: List[str]
     source: str
-
-    def to_document(self) -> "Document":
+    received_at: Optional[datetime] = None
+    priority: Priority = Priority.LIVE
+
+    def to_document(
+        self,
+        max_content_bytes: Optional[int] = constants.ARTICLE_MAX_CONTENT_BYTES,
+        cleaning_time_budget_seconds: Optional[
+            float
+        ] = constants.ARTICLE_CLEANING_TIME_BUDGET_SECONDS,
+        boilerplate_store: Optional[BoilerplateStore] = None,
+    ) -> "Document":
         """
         Converts the news article to a Document object.
 
+        Oversized articles are deterministically truncated at the last paragraph boundary
+        that fits within max_content_bytes. The HTML is partitioned segment by segment
+        and the remaining segments are skipped once the cleaning time budget is exhausted.
+
+        Args:
+            max_content_bytes (Optional[int]): The maximum size of the raw content. Use None for no limit.
+            cleaning_time_budget_seconds (Optional[float]): The time budget for partitioning & cleaning the content.
+                Use None for no limit.
+            boilerplate_store (Optional[BoilerplateStore]): If provided, the boilerplate paragraphs are stripped.
+
         Returns:
             Document: A Document object representing the news article.
         """
 
-        document_id = hashlib.md5(self.content.encode()).hexdigest()
-        document = Document(id=document_id)
+        # The document ID is stable across the revisions of the article, to find its stale chunks on update.
+        document_id = hashlib.md5(str(self.id).encode()).hexdigest()
+        document = Document(id=document_id, priority=self.priority)
+        document.timestamps["created_at"] = self.created_at
+        document.timestamps["received_at"] = self.received_at
 
-        article_elements = partition_html(text=self.content)
+        content = _truncate_html(self.content, max_content_bytes=max_content_bytes)
+        article_elements = _partition_html_within_budget(
+            content, time_budget_seconds=cleaning_time_budget_seconds
+        )
+        paragraphs = [str(x) for x in article_elements]
+        if boilerplate_store is not None:
+            paragraphs = boilerplate_store.strip(
+                [clean(x) for x in paragraphs], document_id=document_id
+            )
         cleaned_content = clean_non_ascii_chars(
-            replace_unicode_quotes(clean(" ".join([str(x) for x in article_elements])))
+            replace_unicode_quotes(clean(" ".join(paragraphs)))
         )
         cleaned_headline = clean_non_ascii_chars(
             replace_unicode_quotes(clean(self.headline))
@@ -64,6 +133,8 @@ class NewsArticle(BaseModel):
             replace_unicode_quotes(clean(self.summary))
         )
 
+        # The text items are ordered by importance. Keep the headline & summary first,
+        # as they are indexed right away when the content is deferred.
         document.text = [cleaned_headline, cleaned_summary, cleaned_content]
         document.metadata["headline"] = cleaned_headline
         document.metadata["summary"] = cleaned_summary
@@ -71,6 +142,11 @@ class NewsArticle(BaseModel):
         document.metadata["symbols"] = self.symbols
         document.metadata["author"] = self.author
         document.metadata["created_at"] = self.created_at
+        document.metadata["created_at_timestamp"] = int(self.created_at.timestamp())
+        document.metadata["source"] = self.source
+        document.metadata["updated_at"] = self.updated_at
+        document.metadata["updated_at_timestamp"] = int(self.updated_at.timestamp())
+        document.metadata["document_id"] = document_id
 
         return document
 
@@ -86,11 +162,19 @@ class Document(BaseModel):
         text (list): The text of the document.
         chunks (list): The chunks of the document.
         embeddings (list): The embeddings of the document.
+        named_embeddings (dict): The embeddings of the fields of the document, by vector name,
+            used by the "article" point layout.
+        timestamps (dict): When the document was created, received and embedded, used to track its freshness.
+        priority (Priority): The lane the document is processed in.
+        unchanged_chunk_ids (list): The IDs of the chunks already indexed by a previous revision, not re-embedded.
+        stale_chunk_ids (list): The IDs of the chunks of previous revisions that are no longer part of the document.
+        indexed_chunk_ids (list): The IDs of the chunks of this revision already indexed by a previous phase.
 
     Methods:
         to_payloads: Returns the payloads of the document.
         compute_chunks: Computes the chunks of the document.
         compute_embeddings: Computes the embeddings of the document.
+        compute_named_embeddings: Computes the embeddings of the fields of the document.
     """
 
     id: str
@@ -99,34 +183,135 @@ class Document(BaseModel):
     text: list = []
     chunks: list = []
     embeddings: list = []
+    named_embeddings: dict = {}
+    timestamps: dict = {}
+    priority: Priority = Priority.LIVE
+    unchanged_chunk_ids: list = []
+    stale_chunk_ids: list = []
+    indexed_chunk_ids: list = []
+
+    def split(self, n_items: int) -> Tuple["Document", "Document"]:
+        """
+        Splits the document into two documents with the same ID & metadata: one with the first n_items
+        text items and one with the remaining ones.
+
+        Args:
+            n_items (int): The number of text items of the first document.
+
+        Returns:
+            Tuple[Document, Document]: The document with the first n_items text items and the one with the rest.
+        """
 
-    def to_payloads(self) -> Tuple[List[str], List[dict]]:
+        head = self.copy(deep=True, update={"text": self.text[:n_items]})
+        tail = self.copy(deep=True, update={"text": self.text[n_items:]})
+
+        return head, tail
+
+    def to_payloads(
+        self,
+        point_layout: PointLayout = PointLayout.CHUNK,
+        payload_fields: Optional[Sequence[str]] = None,
+    ) -> Tuple[List[str], List[dict]]:
         """
         Returns the payloads of the document.
 
+        Args:
+            point_layout (PointLayout): With the "chunk" layout, one payload per chunk, holding its text.
+                With the "article" layout, a single payload holding only the metadata.
+            payload_fields (Optional[Sequence[str]]): If provided, only these metadata fields are copied into
+                the payload of every chunk, e.g., when the rest is stored once by a DocumentStore.
+
         Returns:
             Tuple[List[str], List[dict]]: A tuple containing the IDs and payloads of the document.
         """
 
-        payloads = []
-        ids = []
-        for chunk in self.chunks:
-            payload = self.metadata
-            payload.update({"text": chunk})
-            # Create the chunk ID using the hash of the chunk to avoid storing duplicates.
-            chunk_id = hashlib.md5(chunk.encode()).hexdigest()
+        if point_layout == PointLayout.ARTICLE:
+            return [self.point_id()], [dict(self.metadata)]
 
-            payloads.append(payload)
-            ids.append(chunk_id)
+        metadata = self.chunk_metadata(payload_fields)
+        payloads = [{**metadata, "text": chunk} for chunk in self.chunks]
 
-        return ids, payloads
+        return self.chunk_ids(), payloads
 
-    def compute_chunks(self, model: EmbeddingModelSingleton) -> "Document":
+    def chunk_metadata(self, payload_fields: Optional[Sequence[str]] = None) -> dict:
+        """
+        Returns the metadata copied into the payload of every chunk.
+
+        Args:
+            payload_fields (Optional[Sequence[str]]): If provided, only these metadata fields are kept.
+
+        Returns:
+            dict: The metadata of the chunks.
+        """
+
+        if payload_fields is None:
+            return dict(self.metadata)
+
+        return {
+            field: self.metadata[field]
+            for field in payload_fields
+            if field in self.metadata
+        }
+
+    def point_id(self) -> str:
+        """
+        Returns the ID of the single point of the document, used by the "article" point layout.
+
+        Returns:
+            str: The ID of the point, stable across the revisions of the document.
+        """
+
+        return str(uuid.UUID(hashlib.md5(f"{self.id}:article".encode()).hexdigest()))
+
+    def chunk_ids(self) -> List[str]:
+        """
+        Returns the IDs of the chunks of the document.
+
+        Returns:
+            List[str]: The IDs of the chunks, in the same order as the chunks.
+        """
+
+        # Scope the chunk IDs by document, so a revision of the article only touches its own chunks,
+        # while the unchanged chunks keep their IDs and are not re-embedded.
+        return [
+            str(uuid.UUID(hashlib.md5(f"{self.id}:{chunk}".encode()).hexdigest()))
+            for chunk in self.chunks
+        ]
+
+    def skip_unchanged_chunks(self, unchanged_chunk_ids: List[str]) -> "Document":
+        """
+        Removes the chunks that are already indexed, so they are not embedded again.
+
+        Args:
+            unchanged_chunk_ids (List[str]): The IDs of the chunks already indexed.
+
+        Returns:
+            Document: The document object without the unchanged chunks.
+        """
+
+        unchanged_chunk_ids = set(unchanged_chunk_ids)
+        chunks = []
+        for chunk, chunk_id in zip(self.chunks, self.chunk_ids()):
+            if chunk_id in unchanged_chunk_ids:
+                self.unchanged_chunk_ids.append(chunk_id)
+            else:
+                chunks.append(chunk)
+        self.chunks = chunks
+
+        return self
+
+    def compute_chunks(
+        self,
+        model: EmbeddingModelSingleton,
+        max_chunks: Optional[int] = constants.DOCUMENT_MAX_CHUNKS,
+    ) -> "Document":
         """
         Computes the chunks of the document.
 
         Args:
             model (EmbeddingModelSingleton): The embedding model to use for computing the chunks.
+            max_chunks (Optional[int]): The maximum number of chunks to keep. As the text is ordered
+                by importance (headline, summary & content), the trailing chunks are dropped. Use None for no limit.
 
         Returns:
             Document: The document object with the computed chunks.
@@ -139,6 +324,13 @@ class Document(BaseModel):
 
             self.chunks.extend(chunked_item)
 
+            if max_chunks is not None and len(self.chunks) >= max_chunks:
+                break
+
+        if max_chunks is not None and len(self.chunks) > max_chunks:
+            self.chunks = self.chunks[:max_chunks]
+            _record_guard_triggered("max_chunks")
+
         return self
 
     def compute_embeddings(self, model: EmbeddingModelSingleton) -> "Document":
@@ -156,5 +348,121 @@ class Document(BaseModel):
             embedding = model(chunk, to_list=True)
 
             self.embeddings.append(embedding)
+        self.timestamps["embedded_at"] = utcnow()
 
         return self
+
+    def compute_named_embeddings(
+        self,
+        model: EmbeddingModelSingleton,
+        max_chunks: Optional[int] = constants.DOCUMENT_MAX_CHUNKS,
+    ) -> "Document":
+        """
+        Computes one embedding per field of the document (headline, summary & content), for the "article"
+        point layout. A field longer than the input of the model is chunked and its embedding is the mean
+        of the embeddings of its chunks, computed in a single batch.
+
+        Args:
+            model (EmbeddingModelSingleton): The embedding model to use for computing the embeddings.
+            max_chunks (Optional[int]): The maximum number of chunks embedded per field. Use None for no limit.
+
+        Returns:
+            Document: The document object with the computed named embeddings.
+        """
+
+        # The content may be missing, e.g., for the linked near-duplicates.
+        fields = [*self.text[:2], " ".join(self.text[2:])]
+        fields += [""] * (len(constants.ARTICLE_VECTOR_NAMES) - len(fields))
+
+        for vector_name, field in zip(constants.ARTICLE_VECTOR_NAMES, fields):
+            chunks = chunk_by_attention_window(
+                field, model.tokenizer, max_input_size=model.max_input_length
+            )
+            if max_chunks is not None and len(chunks) > max_chunks:
+                chunks = chunks[:max_chunks]
+                _record_guard_triggered("max_chunks")
+            if len(chunks) == 0:
+                continue
+
+            embeddings = model(chunks, to_list=False)
+            if embeddings.size > 0:
+                self.named_embeddings[vector_name] = embeddings.mean(axis=0).tolist()
+
+        if len(self.named_embeddings) > 0:
+            # Every point must hold all the named vectors, hence the empty fields reuse another one.
+            fallback = next(iter(self.named_embeddings.values()))
+            for vector_name in constants.ARTICLE_VECTOR_NAMES:
+                self.named_embeddings.setdefault(vector_name, fallback)
+        self.timestamps["embedded_at"] = utcnow()
+
+        return self
+
+
+def _truncate_html(content: str, max_content_bytes: Optional[int]) -> str:
+    """
+    Removes the non-text blocks and cuts the content at the last block boundary that fits within max_content_bytes.
+    """
+
+    if max_content_bytes is None or len(content.encode()) <= max_content_bytes:
+        return content
+
+    content = _NON_TEXT_HTML_BLOCKS.sub("", content)
+    encoded_content = content.encode()
+    if len(encoded_content) <= max_content_bytes:
+        return content
+
+    _record_guard_triggered("max_content_bytes")
+
+    truncated_content = encoded_content[:max_content_bytes].decode(errors="ignore")
+    boundaries = list(_HTML_BLOCK_BOUNDARY.finditer(truncated_content))
+    if len(boundaries) > 0:
+        truncated_content = truncated_content[: boundaries[-1].end()]
+
+    return truncated_content
+
+
+def _partition_html_within_budget(
+    content: str, time_budget_seconds: Optional[float]
+) -> list:
+    """
+    Partitions the HTML content segment by segment, skipping the remaining segments when the time budget is exhausted.
+    """
+
+    if time_budget_seconds is None or len(content.encode()) <= _HTML_SEGMENT_BYTES:
+        return partition_html(text=content)
+
+    started_at = time.monotonic()
+    elements = []
+    for segment in _split_html(content, segment_bytes=_HTML_SEGMENT_BYTES):
+        if time.monotonic() - started_at > time_budget_seconds:
+            _record_guard_triggered("cleaning_time_budget")
+            break
+
+        elements.extend(partition_html(text=segment))
+
+    return elements
+
+
+def _split_html(content: str, segment_bytes: int) -> List[str]:
+    segments = []
+    # The segments are sliced by character offsets, while their sizes are measured in UTF-8 bytes.
+    segment_start, segment_start_bytes = 0, 0
+    segment_end, segment_end_bytes = 0, 0
+    for boundary in _HTML_BLOCK_BOUNDARY.finditer(content):
+        boundary_end_bytes = segment_end_bytes + len(
+            content[segment_end : boundary.end()].encode()
+        )
+        if (
+            boundary_end_bytes - segment_start_bytes > segment_bytes
+            and segment_end > segment_start
+        ):
+            segments.append(content[segment_start:segment_end])
+            segment_start, segment_start_bytes = segment_end, segment_end_bytes
+        segment_end, segment_end_bytes = boundary.end(), boundary_end_bytes
+    segments.append(content[segment_start:])
+
+    return [segment for segment in segments if segment.strip()]
+
+
+def _record_guard_triggered(guard: str) -> None:
+    MetricsRegistry().increment("guard_triggered", labels={"guard": guard})
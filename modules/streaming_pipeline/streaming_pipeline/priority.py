@@ -0,0 +1,210 @@
+import logging
+import math
+from collections import deque
+from typing import List, Optional
+
+from bytewax.inputs import DynamicInput, StatelessSource
+
+from streaming_pipeline import constants
+from streaming_pipeline.metrics import MetricsRegistry
+from streaming_pipeline.models import Priority
+
+logger = logging.getLogger(__name__)
+
+
+class PrioritizedInput(DynamicInput):
+    """Input class that merges a live and a backfill input into two priority lanes.
+
+    The live lane is always served first. The backfill lane only consumes the leftover
+    throughput: its articles are admitted only when the live lane is idle and fewer than
+    max_backfill_in_flight articles are being processed, so the live articles never
+    queue behind a long backlog of historical ones. Every time the live lane is idle,
+    the backfill lane fills all the free in-flight slots at once.
+
+    Args:
+        live_input (DynamicInput): The input of the live lane. Its sources must not block
+            when no articles are available (e.g., AlpacaNewsStreamInput with a receive timeout).
+        backfill_input (Optional[DynamicInput]): The input of the backfill lane.
+        max_backfill_in_flight (int): The maximum number of in-flight articles for admitting backfill articles.
+        divert_content_bytes (Optional[int]): If provided, live articles with a larger raw content
+            are diverted to the backfill lane.
+    """
+
+    def __init__(
+        self,
+        live_input: DynamicInput,
+        backfill_input: Optional[DynamicInput] = None,
+        max_backfill_in_flight: int = constants.BACKFILL_MAX_IN_FLIGHT_ARTICLES,
+        divert_content_bytes: Optional[int] = None,
+    ):
+        self._live_input = live_input
+        self._backfill_input = backfill_input
+        self._max_backfill_in_flight = max_backfill_in_flight
+        self._divert_content_bytes = divert_content_bytes
+
+    def build(self, worker_index, worker_count):
+        return PrioritizedSource(
+            live_source=self._live_input.build(worker_index, worker_count),
+            backfill_source=self._backfill_input.build(worker_index, worker_count)
+            if self._backfill_input is not None
+            else None,
+            max_backfill_in_flight=self._max_backfill_in_flight,
+            divert_content_bytes=self._divert_content_bytes,
+        )
+
+
+class PrioritizedSource(StatelessSource):
+    """
+    A source that tags the articles with their priority and serves the live lane first.
+
+    Args:
+        live_source (StatelessSource): The source of the live lane.
+        backfill_source (Optional[StatelessSource]): The source of the backfill lane.
+        max_backfill_in_flight (int): The maximum number of in-flight articles for admitting backfill articles.
+        divert_content_bytes (Optional[int]): If provided, live articles with a larger raw content
+            are diverted to the backfill lane.
+    """
+
+    def __init__(
+        self,
+        live_source: StatelessSource,
+        backfill_source: Optional[StatelessSource] = None,
+        max_backfill_in_flight: int = constants.BACKFILL_MAX_IN_FLIGHT_ARTICLES,
+        divert_content_bytes: Optional[int] = None,
+    ):
+        self._live_source = live_source
+        self._backfill_source = backfill_source
+        self._max_backfill_in_flight = max_backfill_in_flight
+        self._divert_content_bytes = divert_content_bytes
+
+        self._is_live_exhausted = False
+        self._is_backfill_exhausted = backfill_source is None
+        self._diverted = deque()
+        self._backfill_buffer = deque()
+        self._metrics = MetricsRegistry()
+
+    def next(self):
+        """
+        Returns the next live articles if any, otherwise the next backfill articles if they are admitted.
+
+        Raises:
+            StopIteration: When both lanes are exhausted.
+
+        Returns:
+            Optional[List[dict]]: The articles tagged with their priority or None if there is nothing to emit.
+        """
+
+        live_articles = self._next_live()
+        if live_articles:
+            return live_articles
+
+        if (
+            self._is_live_exhausted
+            and self._is_backfill_exhausted
+            and not self._backfill_buffer
+            and not self._diverted
+        ):
+            raise StopIteration()
+
+        if not self._is_backfill_admitted():
+            return None
+
+        return self._next_backfill()
+
+    def _next_live(self) -> Optional[List[dict]]:
+        if self._is_live_exhausted:
+            return None
+
+        try:
+            message = self._live_source.next()
+        except StopIteration:
+            logger.info("The live lane is exhausted.")
+            self._is_live_exhausted = True
+
+            return None
+
+        articles = _to_articles(message)
+        if self._divert_content_bytes is not None:
+            oversized_articles = [
+                article
+                for article in articles
+                if len(article.get("content", "").encode()) > self._divert_content_bytes
+            ]
+            if oversized_articles:
+                self._diverted.extend(oversized_articles)
+                self._metrics.increment(
+                    "guard_triggered",
+                    len(oversized_articles),
+                    labels={"guard": "divert_content_bytes"},
+                )
+                articles = [
+                    article for article in articles if article not in oversized_articles
+                ]
+
+        return _tag(articles, Priority.LIVE)
+
+    def _next_backfill(self) -> Optional[List[dict]]:
+        # Emit only as many articles as there are free in-flight slots, to never hold the live lane
+        # behind a whole backfill page, but fill all of them, as the live lane is polled with a timeout
+        # between two calls.
+        n_free_slots = self._n_free_backfill_slots()
+        articles = []
+        while self._diverted and len(articles) < n_free_slots:
+            articles.append(self._diverted.popleft())
+
+        while len(articles) < n_free_slots:
+            if not self._backfill_buffer:
+                if self._is_backfill_exhausted:
+                    break
+
+                try:
+                    message = self._backfill_source.next()
+                except StopIteration:
+                    logger.info("The backfill lane is exhausted.")
+                    self._is_backfill_exhausted = True
+
+                    break
+
+                if message is None:
+                    break
+                self._backfill_buffer.extend(_to_articles(message))
+
+                continue
+
+            articles.append(self._backfill_buffer.popleft())
+
+        return _tag(articles, Priority.BACKFILL)
+
+    def _is_backfill_admitted(self) -> bool:
+        return self._n_free_backfill_slots() > 0
+
+    def _n_free_backfill_slots(self) -> int:
+        return math.ceil(
+            self._max_backfill_in_flight - self._metrics.get_gauge("in_flight_articles")
+        )
+
+    def close(self):
+        """
+        Closes the sources of both lanes.
+        """
+
+        self._live_source.close()
+        if self._backfill_source is not None:
+            self._backfill_source.close()
+
+
+def _to_articles(message) -> List[dict]:
+    if message is None:
+        return []
+    if isinstance(message, dict):
+        message = [message]
+
+    # The stream also emits control messages (e.g., subscriptions) besides the news.
+    return [article for article in message if article.get("T", "n") == "n"]
+
+
+def _tag(articles: List[dict], priority: Priority) -> Optional[List[dict]]:
+    if len(articles) == 0:
+        return None
+
+    return [{**article, "priority": priority.value} for article in articles]
@@ -1,14 +1,32 @@
+import datetime
 import os
-from typing import Optional
+from typing import Dict, Iterable, List, Optional, Sequence, Union
 
 from bytewax.outputs import DynamicOutput, StatelessSink
 from qdrant_client import QdrantClient
-from qdrant_client.http.api_client import UnexpectedResponse
-from qdrant_client.http.models import Distance, VectorParams
-from qdrant_client.models import PointStruct
+from qdrant_client.models import (
+    FieldCondition,
+    Filter,
+    FilterSelector,
+    IsEmptyCondition,
+    MatchValue,
+    PayloadField,
+    PointIdsList,
+    PointStruct,
+)
 
 from streaming_pipeline import constants
-from streaming_pipeline.models import Document
+from streaming_pipeline.collection import CollectionSpec, TimePartitionedCollections
+from streaming_pipeline.document_store import DocumentStore
+from streaming_pipeline.embeddings import EmbeddingModelSingleton
+from streaming_pipeline.metrics import (
+    COUNT_BUCKETS,
+    FreshnessTracker,
+    MetricsRegistry,
+    utcnow,
+)
+from streaming_pipeline.models import Document, PointLayout, Priority
+from streaming_pipeline.vector_store import LocalVectorStore, VectorStore
 
 
 class QdrantVectorOutput(DynamicOutput):
@@ -18,35 +36,86 @@ class QdrantVectorOutput(DynamicOutput):
     at-least-once processing. Messages from the resume epoch will be duplicated right after resume.
 
     Args:
-        vector_size (int): The size of the vector.
+        vector_size (int): The dimension of the embeddings.
         collection_name (str, optional): The name of the collection.
             Defaults to constants.VECTOR_DB_OUTPUT_COLLECTION_NAME.
-        client (Optional[QdrantClient], optional): The Qdrant client. Defaults to None.
+        client (Optional[VectorStore], optional): The vector store: a Qdrant client or a LocalVectorStore.
+            Defaults to a Qdrant client built from the environment.
+        freshness_alert_threshold_seconds (Optional[float], optional): If provided, a warning is logged for every
+            article that becomes searchable later than this after its creation. Defaults to None.
+        collection_spec (Optional[CollectionSpec], optional): The layout of the collection, applied idempotently.
+            Defaults to the default spec for the given collection name & vector size.
+        partition_granularity (Optional[str], optional): If provided, the documents are written into
+            time-bucketed collections of this granularity ("day" or "week"), by their creation time. Defaults to None.
+        retention_days (Optional[float], optional): If provided, the buckets that ended longer ago than this
+            are dropped. Only used together with partition_granularity. Defaults to None.
+        point_layout (PointLayout, optional): Whether to write one point per chunk or a single point per article,
+            with one named vector per field. Defaults to PointLayout.CHUNK.
+        normalize_payloads (bool, optional): Whether to store the metadata of every article once in a DocumentStore,
+            while its chunks keep only the fields they are filtered by. Defaults to False.
     """
 
     def __init__(
         self,
         vector_size: int,
         collection_name: str = constants.VECTOR_DB_OUTPUT_COLLECTION_NAME,
-        client: Optional[QdrantClient] = None,
+        client: Optional[VectorStore] = None,
+        freshness_alert_threshold_seconds: Optional[float] = None,
+        collection_spec: Optional[CollectionSpec] = None,
+        partition_granularity: Optional[str] = None,
+        retention_days: Optional[float] = None,
+        point_layout: PointLayout = PointLayout.CHUNK,
+        normalize_payloads: bool = False,
     ):
         self._collection_name = collection_name
         self._vector_size = vector_size
+        self._freshness_alert_threshold_seconds = freshness_alert_threshold_seconds
+        self._point_layout = point_layout
 
         if client:
             self.client = client
         else:
             self.client = build_qdrant_client()
 
-        try:
-            self.client.get_collection(collection_name=self._collection_name)
-        except (UnexpectedResponse, ValueError):
-            self.client.recreate_collection(
-                collection_name=self._collection_name,
-                vectors_config=VectorParams(
-                    size=self._vector_size, distance=Distance.COSINE
-                ),
+        if collection_spec is None:
+            collection_spec = CollectionSpec(
+                collection_name=self._collection_name, vector_size=self._vector_size
+            )
+        if point_layout == PointLayout.ARTICLE and collection_spec.vector_names is None:
+            collection_spec = collection_spec.copy(
+                update={"vector_names": list(constants.ARTICLE_VECTOR_NAMES)}
+            )
+        if partition_granularity is not None:
+            if isinstance(self.client, LocalVectorStore):
+                raise ValueError(
+                    "The local vector store doesn't support time-partitioned collections."
+                )
+
+            self.partitions = TimePartitionedCollections(
+                self.client,
+                spec=collection_spec,
+                granularity=partition_granularity,
+                retention_days=retention_days,
             )
+            self.partitions.drop_expired()
+        else:
+            self.partitions = None
+            collection_spec.apply(self.client)
+
+        self.document_store = None
+        if normalize_payloads:
+            if point_layout == PointLayout.ARTICLE:
+                raise ValueError(
+                    "The 'article' point layout already stores the metadata of every article once."
+                )
+            if self.partitions is not None:
+                raise ValueError(
+                    "The document store doesn't support time-partitioned collections, "
+                    "as it would outlive the dropped buckets."
+                )
+
+            self.document_store = DocumentStore(self.client)
+            self.document_store.apply()
 
     def build(self, worker_index, worker_count):
         """Builds a QdrantVectorSink object.
@@ -59,7 +128,14 @@ class QdrantVectorOutput(DynamicOutput):
             QdrantVectorSink: A QdrantVectorSink object.
         """
 
-        return QdrantVectorSink(self.client, self._collection_name)
+        return QdrantVectorSink(
+            self.client,
+            self._collection_name,
+            freshness_alert_threshold_seconds=self._freshness_alert_threshold_seconds,
+            partitions=self.partitions,
+            point_layout=self._point_layout,
+            document_store=self.document_store,
+        )
 
 
 def build_qdrant_client(url: Optional[str] = None, api_key: Optional[str] = None):
@@ -101,29 +177,414 @@ def build_qdrant_client(url: Optional[str] = None, api_key: Optional[str] = None
     return client
 
 
+def delete_legacy_points(client: QdrantClient, collection_name: str) -> int:
+    """
+    Deletes the points written before the chunks were keyed by their article, i.e., without a "document_id"
+    payload. As their IDs were derived from the content only, the updates of their articles can't find them,
+    hence they would stay next to the new chunks forever. Run it once, after upgrading, then re-ingest the news
+    (e.g., with tools.run_batch), or reindex the collection from a raw archive instead.
+
+    Args:
+        client (QdrantClient): The Qdrant client.
+        collection_name (str): The collection (or alias) to clean up.
+
+    Returns:
+        int: The number of deleted points.
+    """
+
+    legacy_filter = Filter(
+        must=[IsEmptyCondition(is_empty=PayloadField(key="document_id"))]
+    )
+    n_points = client.count(
+        collection_name=collection_name, count_filter=legacy_filter, exact=True
+    ).count
+    if n_points > 0:
+        client.delete(
+            collection_name=collection_name,
+            points_selector=FilterSelector(filter=legacy_filter),
+        )
+
+    return n_points
+
+
 class QdrantVectorSink(StatelessSink):
     """
     A sink that writes document embeddings to a Qdrant collection.
 
     Args:
-        client (QdrantClient): The Qdrant client to use for writing.
+        client (VectorStore): The vector store to write to.
         collection_name (str, optional): The name of the collection to write to.
             Defaults to constants.VECTOR_DB_OUTPUT_COLLECTION_NAME.
+        freshness_alert_threshold_seconds (Optional[float], optional): If provided, a warning is logged for every
+            article that becomes searchable later than this after its creation. Defaults to None.
+        partitions (Optional[TimePartitionedCollections], optional): If provided, the documents are written into
+            the bucket of their creation time instead. Defaults to None.
+        point_layout (PointLayout, optional): Whether to write one point per chunk or a single point per article,
+            with one named vector per field. Defaults to PointLayout.CHUNK.
+        document_store (Optional[DocumentStore], optional): If provided, the metadata of every document is stored
+            once in it, while its chunks keep only the fields they are filtered by. Defaults to None.
     """
 
     def __init__(
         self,
-        client: QdrantClient,
+        client: VectorStore,
         collection_name: str = constants.VECTOR_DB_OUTPUT_COLLECTION_NAME,
+        freshness_alert_threshold_seconds: Optional[float] = None,
+        partitions: Optional[TimePartitionedCollections] = None,
+        point_layout: PointLayout = PointLayout.CHUNK,
+        document_store: Optional[DocumentStore] = None,
     ):
         self._client = client
         self._collection_name = collection_name
+        self._partitions = partitions
+        self._point_layout = point_layout
+        self._document_store = document_store
+        self._metrics = MetricsRegistry()
+        self._freshness = FreshnessTracker(
+            alert_threshold_seconds=freshness_alert_threshold_seconds,
+            registry=self._metrics,
+        )
 
     def write(self, document: Document):
-        ids, payloads = document.to_payloads()
-        points = [
-            PointStruct(id=idx, vector=vector, payload=_payload)
-            for idx, vector, _payload in zip(ids, document.embeddings, payloads)
+        collection_name = _resolve_collection_name(
+            document, self._collection_name, self._partitions
+        )
+        points = _build_points(
+            document,
+            point_layout=self._point_layout,
+            document_store=self._document_store,
+        )
+
+        if self._document_store is not None:
+            # Written before the chunks, so their hits can always be hydrated.
+            with self._metrics.time_stage("document_upsert"):
+                self._document_store.put([document])
+        if len(points) > 0:
+            with self._metrics.time_stage("upsert"):
+                self._client.upsert(collection_name=collection_name, points=points)
+        _refresh_unchanged_chunks(
+            self._client, collection_name, document, self._document_store
+        )
+        if len(document.stale_chunk_ids) > 0:
+            self._client.delete(
+                collection_name=collection_name,
+                points_selector=PointIdsList(points=document.stale_chunk_ids),
+            )
+            self._metrics.increment(
+                "stale_chunks_deleted", len(document.stale_chunk_ids)
+            )
+
+        if "searchable_at" in document.timestamps:
+            # The document was already made searchable by the fast indexing phase.
+            self._metrics.observe_summary(
+                "deferred_content_lag_seconds",
+                (utcnow() - document.timestamps["searchable_at"]).total_seconds(),
+            )
+        else:
+            self._freshness.observe(
+                document.timestamps,
+                labels={"lane": document.priority.value},
+                # Only the live articles are expected to be fresh.
+                alert=document.priority == Priority.LIVE,
+            )
+
+        self._metrics.increment(
+            "documents_written", labels={"lane": document.priority.value}
+        )
+        self._metrics.increment("chunks_written", len(points))
+        self._metrics.observe("chunks_per_document", len(points), buckets=COUNT_BUCKETS)
+        self._metrics.add_gauge("in_flight_articles", -1)
+
+
+class QdrantChunkDiff:
+    """
+    Diffs the chunks of a document against the ones already indexed by its previous revisions.
+
+    The unchanged chunks are skipped, so that only the new or changed chunks are embedded,
+    while the chunks no longer part of the document are marked as stale, to be deleted by the sink.
+    Outdated revisions, older than the indexed one, are dropped.
+
+    With the "article" point layout, the single point of the document is always rewritten,
+    while any other point of the document (e.g., chunks written before switching the layout) is stale.
+
+    Args:
+        client (VectorStore): The vector store.
+        collection_name (str, optional): The name of the collection.
+            Defaults to constants.VECTOR_DB_OUTPUT_COLLECTION_NAME.
+        partitions (Optional[TimePartitionedCollections], optional): If provided, the chunks are looked up
+            in the bucket of the creation time of the document instead. Defaults to None.
+        point_layout (PointLayout, optional): Whether the documents are written as one point per chunk
+            or a single point per article. Defaults to PointLayout.CHUNK.
+    """
+
+    def __init__(
+        self,
+        client: VectorStore,
+        collection_name: str = constants.VECTOR_DB_OUTPUT_COLLECTION_NAME,
+        partitions: Optional[TimePartitionedCollections] = None,
+        point_layout: PointLayout = PointLayout.CHUNK,
+    ):
+        self._client = client
+        self._collection_name = collection_name
+        self._partitions = partitions
+        self._point_layout = point_layout
+        self._metrics = MetricsRegistry()
+
+    def __call__(self, document: Document) -> Optional[Document]:
+        """
+        Diffs the chunks of the document.
+
+        Args:
+            document (Document): The chunked document.
+
+        Returns:
+            Optional[Document]: The document without its unchanged chunks or None if it is outdated.
+        """
+
+        indexed_chunks = scroll_document_chunks(
+            self._client,
+            _resolve_collection_name(document, self._collection_name, self._partitions),
+            document.id,
+        )
+        if _is_outdated(document, indexed_chunks.values()):
+            self._metrics.increment("outdated_revisions_dropped")
+            self._metrics.add_gauge("in_flight_articles", -1)
+
+            return None
+
+        if self._point_layout == PointLayout.ARTICLE:
+            document.stale_chunk_ids = [
+                chunk_id
+                for chunk_id in indexed_chunks
+                if chunk_id != document.point_id()
+            ]
+
+            return document
+
+        current_chunk_ids = set(document.chunk_ids()) | set(document.indexed_chunk_ids)
+        document.stale_chunk_ids = [
+            chunk_id for chunk_id in indexed_chunks if chunk_id not in current_chunk_ids
+        ]
+        document.skip_unchanged_chunks(list(indexed_chunks))
+        self._metrics.increment(
+            "unchanged_chunks_skipped", len(document.unchanged_chunk_ids)
+        )
+
+        return document
+
+
+class QdrantFastIndexer:
+    """
+    The fast phase of the two-phase indexing: it embeds & upserts the headline and summary of a document
+    right away, making it searchable, and returns the rest of the document for deferred indexing.
+
+    Args:
+        client (VectorStore): The vector store to write to.
+        model (EmbeddingModelSingleton): The embedding model.
+        collection_name (str, optional): The name of the collection to write to.
+            Defaults to constants.VECTOR_DB_OUTPUT_COLLECTION_NAME.
+        max_chunks (Optional[int], optional): The maximum number of chunks to index in the fast phase.
+            Defaults to constants.DOCUMENT_MAX_CHUNKS.
+        freshness_alert_threshold_seconds (Optional[float], optional): If provided, a warning is logged for every
+            article that becomes searchable later than this after its creation. Defaults to None.
+        partitions (Optional[TimePartitionedCollections], optional): If provided, the documents are written into
+            the bucket of their creation time instead. Defaults to None.
+        document_store (Optional[DocumentStore], optional): If provided, the metadata of every document is stored
+            once in it, while its chunks keep only the fields they are filtered by. Defaults to None.
+    """
+
+    # The headline & the summary.
+    N_FAST_ITEMS = 2
+
+    def __init__(
+        self,
+        client: VectorStore,
+        model: EmbeddingModelSingleton,
+        collection_name: str = constants.VECTOR_DB_OUTPUT_COLLECTION_NAME,
+        max_chunks: Optional[int] = constants.DOCUMENT_MAX_CHUNKS,
+        freshness_alert_threshold_seconds: Optional[float] = None,
+        partitions: Optional[TimePartitionedCollections] = None,
+        document_store: Optional[DocumentStore] = None,
+    ):
+        self._client = client
+        self._model = model
+        self._collection_name = collection_name
+        self._partitions = partitions
+        self._document_store = document_store
+        self._max_chunks = max_chunks
+        self._metrics = MetricsRegistry()
+        self._freshness = FreshnessTracker(
+            alert_threshold_seconds=freshness_alert_threshold_seconds,
+            registry=self._metrics,
+        )
+
+    def __call__(self, document: Document) -> Optional[Document]:
+        """
+        Indexes the headline & summary of the document.
+
+        Args:
+            document (Document): The document to index.
+
+        Returns:
+            Optional[Document]: The rest of the document, to be indexed in the deferred phase,
+                or None if the document is an outdated revision.
+        """
+
+        collection_name = _resolve_collection_name(
+            document, self._collection_name, self._partitions
+        )
+        fast_document, deferred_document = document.split(n_items=self.N_FAST_ITEMS)
+        fast_document.compute_chunks(self._model, max_chunks=self._max_chunks)
+
+        indexed_chunks = scroll_document_chunks(
+            self._client, collection_name, document.id
+        )
+        if _is_outdated(document, indexed_chunks.values()):
+            self._metrics.increment("outdated_revisions_dropped")
+            self._metrics.add_gauge("in_flight_articles", -1)
+
+            return None
+
+        # The stale chunks are deleted only by the deferred phase, which knows all the chunks of the revision.
+        deferred_document.indexed_chunk_ids = fast_document.chunk_ids()
+        fast_document.skip_unchanged_chunks(list(indexed_chunks))
+        fast_document.compute_embeddings(self._model)
+
+        points = _build_points(fast_document, document_store=self._document_store)
+        if self._document_store is not None:
+            self._document_store.put([fast_document])
+        if len(points) > 0:
+            with self._metrics.time_stage("fast_upsert"):
+                self._client.upsert(collection_name=collection_name, points=points)
+        _refresh_unchanged_chunks(
+            self._client, collection_name, fast_document, self._document_store
+        )
+
+        deferred_document.timestamps["searchable_at"] = utcnow()
+        self._freshness.observe(
+            fast_document.timestamps,
+            acked_at=deferred_document.timestamps["searchable_at"],
+            labels={"lane": document.priority.value},
+            alert=document.priority == Priority.LIVE,
+        )
+        self._metrics.increment(
+            "fast_documents_written", labels={"lane": document.priority.value}
+        )
+        self._metrics.increment("chunks_written", len(points))
+
+        return deferred_document
+
+
+def _resolve_collection_name(
+    document: Document,
+    collection_name: str,
+    partitions: Optional[TimePartitionedCollections] = None,
+) -> str:
+    if partitions is None:
+        return collection_name
+
+    # The creation time never changes across revisions, hence all of them land in the same bucket.
+    return partitions.collection_for(document.timestamps["created_at"])
+
+
+def _build_points(
+    document: Document,
+    point_layout: PointLayout = PointLayout.CHUNK,
+    document_store: Optional[DocumentStore] = None,
+) -> List[PointStruct]:
+    ids, payloads = document.to_payloads(
+        point_layout=point_layout, payload_fields=_payload_fields(document_store)
+    )
+    if point_layout == PointLayout.ARTICLE:
+        if len(document.named_embeddings) == 0:
+            return []
+
+        return [
+            PointStruct(
+                id=ids[0], vector=document.named_embeddings, payload=payloads[0]
+            )
         ]
 
-        self._client.upsert(collection_name=self._collection_name, points=points)
+    return [
+        PointStruct(id=idx, vector=vector, payload=_payload)
+        for idx, vector, _payload in zip(ids, document.embeddings, payloads)
+    ]
+
+
+def scroll_document_chunks(
+    client: VectorStore, collection_name: str, document_id: str
+) -> Dict[str, dict]:
+    """
+    Returns the IDs & "updated_at" payloads of all the indexed chunks of a document.
+    """
+
+    chunks = {}
+    offset = None
+    while True:
+        records, offset = client.scroll(
+            collection_name=collection_name,
+            scroll_filter=Filter(
+                must=[
+                    FieldCondition(
+                        key="document_id", match=MatchValue(value=document_id)
+                    )
+                ]
+            ),
+            limit=256,
+            offset=offset,
+            with_payload=["updated_at"],
+            with_vectors=False,
+        )
+        chunks.update({str(record.id): record.payload for record in records})
+
+        if offset is None:
+            return chunks
+
+
+def _is_outdated(document: Document, indexed_payloads: Iterable[dict]) -> bool:
+    updated_at = document.metadata.get("updated_at")
+    if updated_at is None:
+        return False
+
+    return any(
+        _to_datetime(payload["updated_at"]) > updated_at
+        for payload in indexed_payloads
+        if payload.get("updated_at") is not None
+    )
+
+
+def _refresh_unchanged_chunks(
+    client: VectorStore,
+    collection_name: str,
+    document: Document,
+    document_store: Optional[DocumentStore] = None,
+) -> None:
+    """
+    Updates the payload of the unchanged chunks with the metadata of the latest revision.
+    """
+
+    if len(document.unchanged_chunk_ids) == 0:
+        return
+
+    client.set_payload(
+        collection_name=collection_name,
+        payload=document.chunk_metadata(_payload_fields(document_store)),
+        points=document.unchanged_chunk_ids,
+    )
+
+
+def _payload_fields(
+    document_store: Optional[DocumentStore],
+) -> Optional[Sequence[str]]:
+    if document_store is None:
+        return None
+
+    return constants.CHUNK_PAYLOAD_FIELDS
+
+
+def _to_datetime(value: Union[str, datetime.datetime]) -> datetime.datetime:
+    # The remote Qdrant returns the datetimes as ISO formatted strings.
+    if isinstance(value, str):
+        return datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+    return value
@@ -0,0 +1,462 @@
+import datetime
+import json
+import logging
+import os
+import re
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+import torch
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import (
+    CreateAlias,
+    CreateAliasOperation,
+    DeleteAlias,
+    DeleteAliasOperation,
+    FieldCondition,
+    Filter,
+    PointIdsList,
+    PointStruct,
+    Range,
+    Record,
+    VectorParams,
+)
+
+from streaming_pipeline import constants
+from streaming_pipeline.collection import CollectionSpec
+from streaming_pipeline.embeddings import EmbeddingModelSingleton
+from streaming_pipeline.metrics import MetricsRegistry
+from streaming_pipeline.qdrant import scroll_document_chunks
+
+logger = logging.getLogger(__name__)
+
+
+class CollectionReindexer:
+    """
+    Re-embeds the chunks stored in a collection into a new collection, e.g., to roll out a new embedding model
+    while the bot keeps reading the old collection.
+
+    The chunks are scrolled in large batches and embedded at once, using all the cores through the intra-op
+    parallelism of the model, while their IDs & payloads are kept. The scroll offset is checkpointed after
+    every batch, hence an interrupted reindex resumes where it stopped. Once the whole collection is
+    reindexed, a catch-up pass reindexes the chunks of the articles created or revised since the reindex
+    started, and deletes the chunks the revisions dropped.
+
+    Args:
+        client (QdrantClient): The Qdrant client.
+        model (EmbeddingModelSingleton): The new embedding model.
+        source_collection_name (str): The collection (or alias) to reindex.
+        target_spec (CollectionSpec): The spec of the new collection.
+        batch_size (int): The number of chunks embedded at once.
+        checkpoint_file_path (Optional[Union[str, Path]]): If provided, the progress is checkpointed to this file.
+        report_interval_seconds (float): How often the throughput is reported.
+    """
+
+    def __init__(
+        self,
+        client: QdrantClient,
+        model: EmbeddingModelSingleton,
+        source_collection_name: str,
+        target_spec: CollectionSpec,
+        batch_size: int = constants.REINDEX_BATCH_SIZE,
+        checkpoint_file_path: Optional[Union[str, Path]] = None,
+        report_interval_seconds: float = 10.0,
+    ):
+        self._client = client
+        self._model = model
+        self._source_collection_name = source_collection_name
+        self._target_spec = target_spec
+        self._batch_size = batch_size
+        self._checkpoint_file_path = (
+            Path(checkpoint_file_path) if checkpoint_file_path is not None else None
+        )
+        self._report_interval_seconds = report_interval_seconds
+        self._metrics = MetricsRegistry()
+
+    def run(self) -> dict:
+        """
+        Reindexes the source collection into the target collection.
+
+        Returns:
+            dict: The number of reindexed chunks, the elapsed time and the throughput.
+
+        Raises:
+            ValueError: If the source collection stores named vectors, e.g., with the "article" point layout,
+                as its points hold no chunk text to re-embed.
+        """
+
+        source_info = self._client.get_collection(
+            collection_name=self._source_collection_name
+        )
+        if isinstance(source_info.config.params.vectors, dict):
+            raise ValueError(
+                f"The {self._source_collection_name} collection stores named vectors, which the reindex "
+                "doesn't support. Reindex it from the raw archive instead."
+            )
+
+        self._target_spec.apply(self._client)
+
+        checkpoint = self._load_checkpoint()
+        n_total = source_info.points_count
+        started_at = time.perf_counter()
+        n_points_at_start = checkpoint["n_points"]
+        last_reported_at = started_at
+
+        logger.info(
+            f"Reindexing {n_total} chunks from {self._source_collection_name} "
+            f"into {self._target_spec.collection_name} [resumed at {checkpoint['n_points']} chunks]."
+        )
+        while not checkpoint["is_done"]:
+            records, next_offset = self._client.scroll(
+                collection_name=self._source_collection_name,
+                scroll_filter=_changed_since(checkpoint["catch_up_since"]),
+                limit=self._batch_size,
+                offset=checkpoint["offset"],
+                with_payload=True,
+                with_vectors=False,
+            )
+            checkpoint["n_points"] += self._reindex(records)
+            checkpoint["offset"] = next_offset
+            if checkpoint["catch_up_since"] is not None:
+                checkpoint["caught_up_document_ids"] = sorted(
+                    set(checkpoint["caught_up_document_ids"])
+                    | {
+                        record.payload["document_id"]
+                        for record in records
+                        if record.payload.get("document_id") is not None
+                    }
+                )
+            if next_offset is None:
+                if checkpoint["catch_up_since"] is None:
+                    # Reindex the articles created or revised during the first pass,
+                    # with some slack for the late ones.
+                    checkpoint["catch_up_since"] = checkpoint["started_at"] - 3600
+                else:
+                    self._delete_dropped_chunks(checkpoint["caught_up_document_ids"])
+                    checkpoint["is_done"] = True
+            self._save_checkpoint(checkpoint)
+
+            now = time.perf_counter()
+            if now - last_reported_at > self._report_interval_seconds:
+                self._report(
+                    checkpoint["n_points"], n_total, n_points_at_start, now - started_at
+                )
+                last_reported_at = now
+
+        elapsed_seconds = time.perf_counter() - started_at
+        self._report(
+            checkpoint["n_points"], n_total, n_points_at_start, elapsed_seconds
+        )
+
+        return {
+            "source_collection_name": self._source_collection_name,
+            "target_collection_name": self._target_spec.collection_name,
+            "n_points": checkpoint["n_points"],
+            "elapsed_seconds": elapsed_seconds,
+            "points_per_second": (checkpoint["n_points"] - n_points_at_start)
+            / max(elapsed_seconds, 1e-9),
+        }
+
+    def _reindex(self, records: List[Record]) -> int:
+        records = [record for record in records if record.payload.get("text")]
+        if len(records) == 0:
+            return 0
+
+        with self._metrics.time_stage("reindex_embed"), torch.no_grad():
+            embeddings = self._model(
+                [record.payload["text"] for record in records], to_list=False
+            )
+        with self._metrics.time_stage("reindex_upsert"):
+            self._client.upsert(
+                collection_name=self._target_spec.collection_name,
+                points=[
+                    PointStruct(
+                        id=record.id, vector=embedding.tolist(), payload=record.payload
+                    )
+                    for record, embedding in zip(records, embeddings)
+                ],
+            )
+        self._metrics.increment("reindex_points", len(records))
+
+        return len(records)
+
+    def _delete_dropped_chunks(self, document_ids: List[str]) -> None:
+        """
+        Deletes the chunks the revisions made while reindexing dropped from the source collection.
+        """
+
+        n_deleted = 0
+        for document_id in document_ids:
+            source_ids = scroll_document_chunks(
+                self._client, self._source_collection_name, document_id
+            )
+            target_ids = scroll_document_chunks(
+                self._client, self._target_spec.collection_name, document_id
+            )
+            dropped_ids = [
+                point_id for point_id in target_ids if point_id not in source_ids
+            ]
+            if len(dropped_ids) > 0:
+                self._client.delete(
+                    collection_name=self._target_spec.collection_name,
+                    points_selector=PointIdsList(points=dropped_ids),
+                )
+                n_deleted += len(dropped_ids)
+
+        logger.info(
+            f"Caught up on {len(document_ids)} articles, deleting {n_deleted} dropped chunks."
+        )
+
+    def _report(
+        self,
+        n_points: int,
+        n_total: int,
+        n_points_at_start: int,
+        elapsed_seconds: float,
+    ) -> None:
+        points_per_second = (n_points - n_points_at_start) / max(elapsed_seconds, 1e-9)
+        self._metrics.set_gauge("reindex_points_per_second", points_per_second)
+        eta_seconds = (
+            max(0, n_total - n_points) / points_per_second
+            if points_per_second > 0
+            else float("inf")
+        )
+        logger.info(
+            f"Reindexed {n_points}/{n_total} chunks "
+            f"[{points_per_second:.1f} chunks/s, eta={eta_seconds:.0f}s]"
+        )
+
+    def _load_checkpoint(self) -> dict:
+        checkpoint = {
+            "source_collection_name": self._source_collection_name,
+            "target_collection_name": self._target_spec.collection_name,
+            "started_at": time.time(),
+            "offset": None,
+            "n_points": 0,
+            "catch_up_since": None,
+            "caught_up_document_ids": [],
+            "is_done": False,
+        }
+        if (
+            self._checkpoint_file_path is None
+            or not self._checkpoint_file_path.exists()
+        ):
+            return checkpoint
+
+        with open(self._checkpoint_file_path, "r") as f:
+            saved_checkpoint = json.load(f)
+        if (
+            saved_checkpoint["source_collection_name"] != self._source_collection_name
+            or saved_checkpoint["target_collection_name"]
+            != self._target_spec.collection_name
+        ):
+            logger.warning(
+                f"Ignoring the checkpoint at {self._checkpoint_file_path}, as it belongs to another reindex."
+            )
+
+            return checkpoint
+
+        # The checkpoints saved by older versions don't track the caught up articles.
+        saved_checkpoint.setdefault("caught_up_document_ids", [])
+
+        return saved_checkpoint
+
+    def _save_checkpoint(self, checkpoint: dict) -> None:
+        if self._checkpoint_file_path is None:
+            return
+
+        self._checkpoint_file_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file_path = self._checkpoint_file_path.with_name(
+            f".{self._checkpoint_file_path.name}.tmp"
+        )
+        tmp_file_path.write_text(json.dumps(checkpoint))
+        os.replace(tmp_file_path, self._checkpoint_file_path)
+
+
+def verify_reindex(
+    client: QdrantClient, source_collection_name: str, target_collection_name: str
+) -> None:
+    """
+    Checks that the target collection holds as many points as the source one, before switching the alias to it.
+
+    Args:
+        client (QdrantClient): The Qdrant client.
+        source_collection_name (str): The reindexed collection (or alias).
+        target_collection_name (str): The new collection.
+
+    Raises:
+        ValueError: If the collections hold a different number of points.
+    """
+
+    n_source_points = client.count(
+        collection_name=source_collection_name, exact=True
+    ).count
+    n_target_points = client.count(
+        collection_name=target_collection_name, exact=True
+    ).count
+    if n_source_points != n_target_points:
+        raise ValueError(
+            f"The {target_collection_name} collection holds {n_target_points} points, while "
+            f"{source_collection_name} holds {n_source_points}."
+        )
+
+
+def verify_vectors_config(
+    client: QdrantClient, current_collection_name: str, target_collection_name: str
+) -> None:
+    """
+    Checks that the target collection lays out its vectors like the current one (the same vector names
+    & distances), so the readers can query it the same way, before switching the alias to it.
+    The vector sizes may differ, as they depend on the embedding model.
+
+    Args:
+        client (QdrantClient): The Qdrant client.
+        current_collection_name (str): The collection (or alias) the readers use. Skipped if it doesn't exist.
+        target_collection_name (str): The new collection.
+
+    Raises:
+        ValueError: If the collections have different vector names or distances.
+    """
+
+    if not _collection_exists(client, current_collection_name):
+        return
+
+    current_vectors = _vector_params(client, current_collection_name)
+    target_vectors = _vector_params(client, target_collection_name)
+    current_distances = {
+        name: params.distance.value for name, params in current_vectors.items()
+    }
+    target_distances = {
+        name: params.distance.value for name, params in target_vectors.items()
+    }
+    if current_distances != target_distances:
+        raise ValueError(
+            f"The {target_collection_name} collection stores the vectors {target_distances}, while "
+            f"{current_collection_name} stores {current_distances}."
+        )
+
+    current_sizes = {name: params.size for name, params in current_vectors.items()}
+    target_sizes = {name: params.size for name, params in target_vectors.items()}
+    if current_sizes != target_sizes:
+        logger.warning(
+            f"The vectors of {target_collection_name} are of size {target_sizes}, while the ones of "
+            f"{current_collection_name} are of size {current_sizes}. Update the embedding model of the readers."
+        )
+
+
+def swap_alias(
+    client: QdrantClient,
+    alias_name: str,
+    collection_name: str,
+    replace_collection: bool = False,
+) -> Optional[str]:
+    """
+    Atomically points an alias to a collection.
+
+    Args:
+        client (QdrantClient): The Qdrant client.
+        alias_name (str): The name of the alias, used by the readers & writers.
+        collection_name (str): The collection the alias must point to.
+        replace_collection (bool): Whether to delete a collection named like the alias, as a collection
+            can't be replaced by an alias atomically. It is needed only once, when migrating to aliases.
+
+    Raises:
+        ValueError: If a collection named like the alias exists and replace_collection is False.
+
+    Returns:
+        Optional[str]: The collection the alias pointed to before, if any.
+    """
+
+    previous_collection_name = None
+    for alias in client.get_aliases().aliases:
+        if alias.alias_name == alias_name:
+            previous_collection_name = alias.collection_name
+
+    if previous_collection_name is None and _collection_exists(client, alias_name):
+        if not replace_collection:
+            raise ValueError(
+                f"{alias_name} is a collection, not an alias. Pass replace_collection=True to delete it "
+                "and replace it with an alias."
+            )
+
+        logger.warning(
+            f"Deleting the {alias_name} collection to replace it with an alias."
+        )
+        client.delete_collection(collection_name=alias_name)
+        previous_collection_name = alias_name
+
+    operations = []
+    if previous_collection_name is not None and previous_collection_name != alias_name:
+        operations.append(
+            DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=alias_name))
+        )
+    operations.append(
+        CreateAliasOperation(
+            create_alias=CreateAlias(
+                collection_name=collection_name, alias_name=alias_name
+            )
+        )
+    )
+    client.update_collection_aliases(change_aliases_operations=operations)
+    logger.info(
+        f"Switched the {alias_name} alias from {previous_collection_name} to {collection_name}."
+    )
+
+    return previous_collection_name
+
+
+def build_target_collection_name(alias_name: str, model_id: str) -> str:
+    """
+    Builds a unique name for the collection of a new embedding model.
+
+    Args:
+        alias_name (str): The name of the alias.
+        model_id (str): The identifier of the embedding model.
+
+    Returns:
+        str: The name of the collection.
+    """
+
+    model_slug = re.sub(r"[^0-9a-zA-Z]+", "_", model_id.split("/")[-1]).strip("_")
+    timestamp = datetime.datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+
+    return f"{alias_name}__{model_slug.lower()}_{timestamp}"
+
+
+def _changed_since(timestamp: Optional[float]) -> Optional[Filter]:
+    if timestamp is None:
+        return None
+
+    # The chunks indexed before the revision time was stored have only the creation time.
+    return Filter(
+        should=[
+            FieldCondition(key="updated_at_timestamp", range=Range(gte=int(timestamp))),
+            FieldCondition(key="created_at_timestamp", range=Range(gte=int(timestamp))),
+        ]
+    )
+
+
+def _vector_params(
+    client: QdrantClient, collection_name: str
+) -> Dict[str, VectorParams]:
+    """
+    Returns the params of every vector of a collection by its name, with "" for an unnamed vector.
+    """
+
+    vectors = client.get_collection(
+        collection_name=collection_name
+    ).config.params.vectors
+    if not isinstance(vectors, dict):
+        vectors = {"": vectors}
+
+    return vectors
+
+
+def _collection_exists(client: QdrantClient, collection_name: str) -> bool:
+    try:
+        client.get_collection(collection_name=collection_name)
+    except Exception:
+        return False
+
+    return True
@@ -0,0 +1,211 @@
+import gzip
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple, Union
+
+from bytewax.inputs import DynamicInput, StatelessSource
+
+logger = logging.getLogger(__name__)
+
+
+class NewsRecorder:
+    """
+    Records raw Alpaca news messages, together with their arrival timestamps,
+    into a gzip compressed JSONL file that can later be replayed with NewsReplayInput.
+
+    Every line has the following format: {"recorded_at": <unix timestamp>, "message": <raw message>}
+
+    Args:
+        file_path (Union[str, Path]): The path of the compressed JSONL file. New messages are appended.
+    """
+
+    def __init__(self, file_path: Union[str, Path]):
+        self._file_path = Path(file_path)
+        self._file_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._file = gzip.open(self._file_path, "at", encoding="utf-8")
+        self._n_recorded = 0
+
+    @property
+    def n_recorded(self) -> int:
+        """
+        Returns the number of messages recorded so far.
+
+        Returns:
+            int: The number of messages recorded so far.
+        """
+
+        return self._n_recorded
+
+    def record(self, message: Union[dict, List[dict]]) -> None:
+        """
+        Appends a raw message to the recording.
+
+        Args:
+            message (Union[dict, List[dict]]): The raw message as received from the Alpaca API.
+        """
+
+        line = json.dumps({"recorded_at": time.time(), "message": message})
+        self._file.write(f"{line}\n")
+        self._n_recorded += 1
+
+    def close(self) -> None:
+        """
+        Flushes and closes the recording file.
+        """
+
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+        logger.info(f"Recorded {self._n_recorded} messages to {self._file_path}.")
+
+    def __enter__(self) -> "NewsRecorder":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+def read_recording(file_path: Union[str, Path]) -> Iterator[Tuple[float, list]]:
+    """
+    Lazily reads a recording created by NewsRecorder.
+
+    Args:
+        file_path (Union[str, Path]): The path of the compressed JSONL file.
+
+    Yields:
+        Tuple[float, list]: The arrival timestamp and the raw message.
+    """
+
+    with gzip.open(file_path, "rt", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+
+            record = json.loads(line)
+            message = record["message"]
+            if isinstance(message, dict):
+                message = [message]
+
+            yield record["recorded_at"], message
+
+
+def _read_first_recorded_at(file_path: Union[str, Path]) -> Optional[float]:
+    records = read_recording(file_path)
+    try:
+        recorded_at, _ = next(records)
+    except StopIteration:
+        return None
+    finally:
+        records.close()
+
+    return recorded_at
+
+
+class NewsReplayInput(DynamicInput):
+    """Input class that replays a recording created by NewsRecorder.
+
+    The messages are distributed in a round-robin fashion across the workers
+    while keeping their original relative timing.
+
+    Args:
+        file_path (Union[str, Path]): The path of the compressed JSONL recording.
+        speed (Optional[float]): The replay speed relative to the original recording,
+            e.g. 1.0 for real time or 10.0 for 10x faster. Use None or 0 to replay as fast as possible.
+    """
+
+    def __init__(self, file_path: Union[str, Path], speed: Optional[float] = 1.0):
+        self._file_path = Path(file_path)
+        self._speed = speed
+
+        if not self._file_path.exists():
+            raise FileNotFoundError(f"No recording found at: {self._file_path}")
+
+    def build(self, worker_index, worker_count):
+        return NewsReplaySource(
+            file_path=self._file_path,
+            speed=self._speed,
+            worker_index=worker_index,
+            worker_count=worker_count,
+        )
+
+
+class NewsReplaySource(StatelessSource):
+    """
+    A source that emits the recorded messages assigned to a worker, on schedule.
+
+    Args:
+        file_path (Path): The path of the compressed JSONL recording.
+        speed (Optional[float]): The replay speed. Use None or 0 to replay as fast as possible.
+        worker_index (int): The index of the current worker.
+        worker_count (int): The total number of workers.
+    """
+
+    def __init__(
+        self,
+        file_path: Path,
+        speed: Optional[float],
+        worker_index: int,
+        worker_count: int,
+    ):
+        self._speed = speed
+        self._worker_index = worker_index
+        self._worker_count = worker_count
+
+        self._records = read_recording(file_path)
+        self._record_index = -1
+        # Anchor all the workers to the first message of the recording to keep their relative timing.
+        self._first_recorded_at = _read_first_recorded_at(file_path)
+        self._replay_started_at = None
+        self._pending = None
+
+    def next(self):
+        """
+        Returns the next message when it is due, otherwise None.
+
+        Returns:
+            Optional[List[dict]]: The recorded message or None if it is not yet due.
+        """
+
+        if self._pending is None:
+            self._pending = self._next_worker_record()
+
+        recorded_at, message = self._pending
+        if self._replay_started_at is None:
+            self._replay_started_at = time.monotonic()
+
+        if self._speed:
+            due_in = (recorded_at - self._first_recorded_at) / self._speed
+            if time.monotonic() - self._replay_started_at < due_in:
+                return None
+
+        self._pending = None
+
+        return message
+
+    def _next_worker_record(self) -> Tuple[float, list]:
+        """
+        Skips the records assigned to other workers.
+
+        Raises:
+            StopIteration: When the recording is exhausted.
+        """
+
+        while True:
+            # Raises StopIteration when the recording is exhausted.
+            record = next(self._records)
+            self._record_index += 1
+
+            if self._record_index % self._worker_count == self._worker_index:
+                return record
+
+    def close(self):
+        """
+        Closes the replay source.
+        """
+
+        self._records.close()
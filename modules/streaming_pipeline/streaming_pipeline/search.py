@@ -0,0 +1,156 @@
+import datetime
+import logging
+import threading
+import time
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+import torch
+
+from streaming_pipeline.collection import CollectionSpec, TimePartitionedCollections
+from streaming_pipeline.document_store import DocumentStore
+from streaming_pipeline.embeddings import EmbeddingModelSingleton
+from streaming_pipeline.vector_store import VectorStore
+
+logger = logging.getLogger(__name__)
+
+
+class NewsSearcher:
+    """
+    Embeds queries and searches the closest news in the vector DB.
+
+    The embeddings are computed under a lock, as the tokenizer can't be used by multiple threads at once,
+    while the searches run concurrently.
+
+    Args:
+        client (VectorStore): The vector store to search.
+        model (EmbeddingModelSingleton): The model used to embed the queries.
+        collection_spec (CollectionSpec): The layout of the collection to search.
+        partition_granularity (Optional[str]): If the news are written into daily ("day") or weekly ("week")
+            collections, search them in parallel and merge their hits.
+        horizon_days (Optional[float]): If provided, together with partition_granularity, only the news
+            from the latest N days are searched.
+        vector_name (Optional[str]): If the news are written with the "article" point layout, the named vector
+            to search, e.g., "summary". See constants.ARTICLE_VECTOR_NAMES.
+        document_store (Optional[DocumentStore]): If the news are written with normalized payloads,
+            the store the hits are hydrated from.
+    """
+
+    def __init__(
+        self,
+        client: VectorStore,
+        model: EmbeddingModelSingleton,
+        collection_spec: CollectionSpec,
+        partition_granularity: Optional[str] = None,
+        horizon_days: Optional[float] = None,
+        vector_name: Optional[str] = None,
+        document_store: Optional[DocumentStore] = None,
+    ):
+        self.client = client
+        self.model = model
+        self.collection_spec = collection_spec
+        self.horizon_days = horizon_days
+        self.vector_name = vector_name
+        self.document_store = document_store
+
+        self._embed_lock = threading.Lock()
+        self._partitions = None
+        if partition_granularity is not None:
+            self._partitions = TimePartitionedCollections(
+                client, spec=collection_spec, granularity=partition_granularity
+            )
+
+    def warm_up(self) -> None:
+        """
+        Embeds & searches a dummy query, so the first real query doesn't pay for loading the weights.
+        """
+
+        started_at = time.perf_counter()
+        self.search(self.embed(["warm up"])[0].tolist(), limit=1)
+        logger.info(
+            f"Warmed up the searcher in {time.perf_counter() - started_at:.2f}s."
+        )
+
+    def embed(self, queries: Union[str, List[str]]) -> np.ndarray:
+        """
+        Embeds a batch of queries.
+
+        Args:
+            queries (Union[str, List[str]]): The queries to embed.
+
+        Returns:
+            np.ndarray: The (n_queries, embedding_size) embeddings.
+        """
+
+        if isinstance(queries, str):
+            queries = [queries]
+
+        with self._embed_lock, torch.no_grad():
+            embeddings = self.model(queries, to_list=False)
+
+        return np.asarray(embeddings).reshape(len(queries), -1)
+
+    def search(self, query_vector: List[float], limit: int) -> list:
+        """
+        Searches the closest points to an embedded query.
+
+        Args:
+            query_vector (List[float]): The embedded query.
+            limit (int): The number of closest points to return.
+
+        Returns:
+            list: The hits, sorted from the closest.
+        """
+
+        if self.vector_name is not None:
+            query_vector = (self.vector_name, query_vector)
+
+        if self._partitions is not None:
+            from_datetime = None
+            if self.horizon_days is not None:
+                # Computed on every search, so a long-lived searcher doesn't drift behind the horizon.
+                from_datetime = datetime.datetime.now(
+                    datetime.timezone.utc
+                ) - datetime.timedelta(days=self.horizon_days)
+
+            hits = self._partitions.search(
+                query_vector=query_vector,
+                limit=limit,
+                from_datetime=from_datetime,
+            )
+        else:
+            hits = self.client.search(
+                collection_name=self.collection_spec.collection_name,
+                query_vector=query_vector,
+                search_params=self.collection_spec.search_params(),
+                limit=limit,
+            )
+
+        if self.document_store is not None:
+            hits = self.document_store.hydrate(hits)
+
+        return hits
+
+    def timed_search(self, query_vector: List[float], limit: int) -> Tuple[list, float]:
+        """
+        Searches the closest points to an embedded query and measures the latency in seconds.
+        """
+
+        started_at = time.perf_counter()
+        hits = self.search(query_vector, limit=limit)
+
+        return hits, time.perf_counter() - started_at
+
+
+def to_result(query: str, hits: list, latency: float) -> dict:
+    """
+    Converts the hits of a query into a JSON-serializable dict.
+    """
+
+    return {
+        "query": query,
+        "search_milliseconds": 1000 * latency,
+        "hits": [
+            {"id": hit.id, "score": hit.score, "payload": hit.payload} for hit in hits
+        ],
+    }
@@ -0,0 +1,94 @@
+import http.client
+import json
+import logging
+from typing import List, Optional, Union
+from urllib.parse import urlparse
+
+from streaming_pipeline import constants
+
+logger = logging.getLogger(__name__)
+
+
+class SearchClient:
+    """
+    A thin client of the SearchServer. It depends only on the standard library, so it starts instantly,
+    and it reuses the same keep-alive connection for all its requests.
+
+    Args:
+        url (Optional[str]): The URL of the SearchServer. Defaults to the local one.
+        timeout_seconds (float): The timeout of every request.
+    """
+
+    def __init__(self, url: Optional[str] = None, timeout_seconds: float = 30.0):
+        url = urlparse(url or f"http://127.0.0.1:{constants.SEARCH_SERVER_PORT}")
+
+        self._host = url.hostname
+        self._port = url.port or 80
+        self._timeout_seconds = timeout_seconds
+        self._connection = None
+
+    def search(self, queries: Union[str, List[str]], limit: int = 5) -> List[dict]:
+        """
+        Searches the closest news to the given queries.
+
+        Args:
+            queries (Union[str, List[str]]): The query or the queries to search for.
+            limit (int): The number of closest points to return per query.
+
+        Returns:
+            List[dict]: For every query, in order, its hits and search latency.
+        """
+
+        if isinstance(queries, str):
+            queries = [queries]
+
+        response = self._request(
+            "POST", "/search", body={"queries": queries, "limit": limit}
+        )
+
+        return response["results"]
+
+    def health(self) -> dict:
+        return self._request("GET", "/health")
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def __enter__(self) -> "SearchClient":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def _request(self, method: str, path: str, body: Optional[dict] = None) -> dict:
+        data = json.dumps(body).encode() if body is not None else None
+        headers = {"Content-Type": "application/json"} if data is not None else {}
+
+        # The server may have closed an idle keep-alive connection, so retry once on a fresh one.
+        for attempt in range(2):
+            if self._connection is None:
+                self._connection = http.client.HTTPConnection(
+                    self._host, self._port, timeout=self._timeout_seconds
+                )
+            try:
+                self._connection.request(method, path, body=data, headers=headers)
+                response = self._connection.getresponse()
+                response_body = json.loads(response.read() or b"{}")
+                break
+            except (
+                http.client.RemoteDisconnected,
+                BrokenPipeError,
+                ConnectionResetError,
+            ):
+                self.close()
+                if attempt == 1:
+                    raise
+
+        if response.status != 200:
+            raise RuntimeError(
+                f"The search server failed with {response.status}: {response_body.get('message')}"
+            )
+
+        return response_body
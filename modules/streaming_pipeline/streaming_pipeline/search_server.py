@@ -0,0 +1,200 @@
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from streaming_pipeline import constants
+from streaming_pipeline.search import NewsSearcher, to_result
+
+logger = logging.getLogger(__name__)
+
+
+SEARCH_PATH = "/search"
+HEALTH_PATH = "/health"
+
+
+class SearchServer:
+    """
+    A long-lived local search daemon, which keeps the embedding model & the vector DB client warm
+    between queries, so a query doesn't pay for loading the weights and opening the connections.
+
+    It serves a minimal JSON API over HTTP:
+    * `POST /search` with {"queries": [...], "limit": 5} (or a single "query"): embeds the queries
+      as one batch and returns their hits, in order, together with the embedding & search latencies;
+    * `GET /health`: returns the searched collection and the number of served queries.
+
+    Args:
+        searcher (NewsSearcher): The searcher used to embed & search the queries.
+        host (str): The host to bind to. Keep the default to accept only local clients.
+        port (int): The port to bind to. Use 0 to pick a free port.
+        max_limit (int): The maximum number of hits returned per query.
+        max_queries (int): The maximum number of queries accepted per request.
+    """
+
+    def __init__(
+        self,
+        searcher: NewsSearcher,
+        host: str = "127.0.0.1",
+        port: int = constants.SEARCH_SERVER_PORT,
+        max_limit: int = 100,
+        max_queries: int = 256,
+    ):
+        self.searcher = searcher
+        self.max_limit = max_limit
+        self.max_queries = max_queries
+
+        self._n_queries = 0
+        self._n_queries_lock = threading.Lock()
+        self._started_at = time.time()
+        self._thread = None
+
+        self._httpd = ThreadingHTTPServer((host, port), _SearchRequestHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.search_server = self
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+
+        return f"http://{host}:{port}"
+
+    def start(self) -> "SearchServer":
+        """
+        Starts serving requests in a background thread.
+        """
+
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+
+        return self
+
+    def serve_forever(self) -> None:
+        """
+        Serves requests in the current thread until stop() is called.
+        """
+
+        logger.info(
+            f"Serving searches over {self.searcher.collection_spec.collection_name} at {self.url}."
+        )
+        self._httpd.serve_forever(poll_interval=0.1)
+
+    def stop(self) -> None:
+        """
+        Stops the server.
+        """
+
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> "SearchServer":
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    def search(self, request: dict) -> dict:
+        """
+        Embeds the queries of a request as one batch and searches them one by one.
+
+        Args:
+            request (dict): The body of a `POST /search` request.
+
+        Returns:
+            dict: The results of the queries, in order, and the embedding latency of the batch.
+        """
+
+        queries = request.get("queries")
+        if queries is None and "query" in request:
+            queries = [request["query"]]
+        if (
+            not isinstance(queries, list)
+            or len(queries) == 0
+            or not all(isinstance(query, str) for query in queries)
+        ):
+            raise ValueError("Provide a 'query' string or a non-empty 'queries' list.")
+        if len(queries) > self.max_queries:
+            raise ValueError(
+                f"At most {self.max_queries} queries are accepted at once."
+            )
+
+        limit = int(request.get("limit", 5))
+        if not 1 <= limit <= self.max_limit:
+            raise ValueError(f"The limit must be between 1 and {self.max_limit}.")
+
+        started_at = time.perf_counter()
+        embeddings = self.searcher.embed(queries)
+        embed_seconds = time.perf_counter() - started_at
+
+        results = []
+        for query, embedding in zip(queries, embeddings):
+            hits, latency = self.searcher.timed_search(embedding.tolist(), limit=limit)
+            results.append(to_result(query, hits, latency))
+
+        with self._n_queries_lock:
+            self._n_queries += len(queries)
+
+        return {"results": results, "embed_milliseconds": 1000 * embed_seconds}
+
+    def health(self) -> dict:
+        return {
+            "status": "ok",
+            "collection_name": self.searcher.collection_spec.collection_name,
+            "n_queries": self._n_queries,
+            "uptime_seconds": time.time() - self._started_at,
+        }
+
+
+class _SearchRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def search_server(self) -> SearchServer:
+        return self.server.search_server
+
+    def log_message(self, format, *args):
+        logger.debug(f"[SearchServer]: {format % args}")
+
+    def do_GET(self):
+        if self.path.rstrip("/") != HEALTH_PATH:
+            self._send_json(404, {"message": "not found"})
+
+            return
+
+        self._send_json(200, self.search_server.health())
+
+    def do_POST(self):
+        content_length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(content_length)
+        if self.path.rstrip("/") != SEARCH_PATH:
+            self._send_json(404, {"message": "not found"})
+
+            return
+
+        try:
+            response = self.search_server.search(json.loads(body or b"{}"))
+        except (ValueError, TypeError, AttributeError) as e:
+            self._send_json(400, {"message": str(e)})
+
+            return
+        except Exception as e:
+            logger.exception("[SearchServer]: Failed to serve a search.")
+            self._send_json(500, {"message": str(e)})
+
+            return
+
+        self._send_json(200, response)
+
+    def _send_json(self, status_code: int, body: dict):
+        # The payloads may contain datetimes.
+        data = json.dumps(body, default=str).encode()
+
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
@@ -0,0 +1,523 @@
+import json
+import logging
+import mmap
+import os
+import struct
+import time
+import zlib
+from pathlib import Path
+from typing import Any, List, Optional, Set, Tuple, Union
+
+from bytewax.inputs import PartitionedInput, StatefulSource
+from bytewax.outputs import DynamicOutput, StatelessSink
+
+from streaming_pipeline import constants
+from streaming_pipeline.metrics import MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+# Every record is prefixed by its length and its CRC32 checksum.
+_HEADER = struct.Struct(">II")
+_SEGMENT_SUFFIX = ".log"
+_PARTITION_PREFIX = "partition-"
+
+
+class SegmentLogWriter:
+    """
+    Appends records to a partition of a segment-file log.
+
+    The partition is a directory of append-only segment files, named after the offset of their first record.
+    An offset is the position of a record in the partition, in bytes, hence a record is read
+    without any index, by mapping the segment containing it. Every append is flushed to the OS right away,
+    so the readers see it and it survives a crash of the process, while the fsyncs are batched,
+    either every fsync_max_records records or every fsync_interval_seconds.
+
+    Args:
+        dir_path (Union[str, Path]): The directory of the partition.
+        segment_max_bytes (int): The size after which a new segment is started.
+        fsync_interval_seconds (float): The maximum time between two fsyncs.
+        fsync_max_records (int): The maximum number of records between two fsyncs.
+        retention_seconds (Optional[float]): If provided, the full segments older than this are deleted.
+    """
+
+    def __init__(
+        self,
+        dir_path: Union[str, Path],
+        segment_max_bytes: int = constants.SEGMENT_LOG_SEGMENT_MAX_BYTES,
+        fsync_interval_seconds: float = constants.SEGMENT_LOG_FSYNC_INTERVAL_SECONDS,
+        fsync_max_records: int = 1000,
+        retention_seconds: Optional[float] = None,
+    ):
+        self._dir_path = Path(dir_path)
+        self._dir_path.mkdir(parents=True, exist_ok=True)
+        self._segment_max_bytes = segment_max_bytes
+        self._fsync_interval_seconds = fsync_interval_seconds
+        self._fsync_max_records = fsync_max_records
+        self._retention_seconds = retention_seconds
+
+        segments = list_segments(self._dir_path)
+        if len(segments) > 0:
+            self._segment_offset = segments[-1]
+            segment_path = _segment_path(self._dir_path, self._segment_offset)
+            self._next_offset = self._segment_offset + _valid_size(segment_path)
+            # Drop any torn record written during a crash.
+            os.truncate(segment_path, self._next_offset - self._segment_offset)
+        else:
+            self._segment_offset = 0
+            self._next_offset = 0
+        self._file = open(_segment_path(self._dir_path, self._segment_offset), "ab")
+
+        self._n_unsynced_records = 0
+        self._last_synced_at = time.monotonic()
+
+    @property
+    def next_offset(self) -> int:
+        """
+        Returns the offset the next record will be appended at.
+
+        Returns:
+            int: The offset of the next record.
+        """
+
+        return self._next_offset
+
+    def append(self, record: Any) -> int:
+        """
+        Appends a JSON serializable record to the log.
+
+        Args:
+            record (Any): The record.
+
+        Returns:
+            int: The offset of the record.
+        """
+
+        data = json.dumps(record).encode()
+        if self._next_offset - self._segment_offset >= self._segment_max_bytes:
+            self._roll()
+
+        offset = self._next_offset
+        self._file.write(_HEADER.pack(len(data), zlib.crc32(data)))
+        self._file.write(data)
+        self._file.flush()
+        self._next_offset += _HEADER.size + len(data)
+
+        self._n_unsynced_records += 1
+        if (
+            self._n_unsynced_records >= self._fsync_max_records
+            or time.monotonic() - self._last_synced_at >= self._fsync_interval_seconds
+        ):
+            self.sync()
+
+        return offset
+
+    def sync(self) -> None:
+        """
+        Flushes and fsyncs the appended records to disk.
+        """
+
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+        self._n_unsynced_records = 0
+        self._last_synced_at = time.monotonic()
+
+    def close(self) -> None:
+        """
+        Syncs and closes the current segment.
+        """
+
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
+
+    def _roll(self) -> None:
+        self.sync()
+        self._file.close()
+
+        self._segment_offset = self._next_offset
+        self._file = open(_segment_path(self._dir_path, self._segment_offset), "ab")
+        logger.info(f"Started segment {self._segment_offset} in {self._dir_path}.")
+
+        if self._retention_seconds is not None:
+            self._delete_expired_segments()
+
+    def _delete_expired_segments(self) -> None:
+        now = time.time()
+        for segment_offset in list_segments(self._dir_path)[:-1]:
+            segment_path = _segment_path(self._dir_path, segment_offset)
+            if now - segment_path.stat().st_mtime > self._retention_seconds:
+                segment_path.unlink()
+                logger.info(f"Deleted the expired segment {segment_path}.")
+
+
+class SegmentLogReader:
+    """
+    Reads the records of a partition of a segment-file log, starting from a given offset,
+    through memory-mapped segments. It follows the partition while it is being appended to.
+
+    Args:
+        dir_path (Union[str, Path]): The directory of the partition.
+        offset (Optional[int]): The offset to start reading from. Defaults to the first available record.
+    """
+
+    def __init__(self, dir_path: Union[str, Path], offset: Optional[int] = None):
+        self._dir_path = Path(dir_path)
+
+        segments = list_segments(self._dir_path)
+        if offset is None:
+            offset = segments[0] if len(segments) > 0 else 0
+        elif len(segments) > 0 and offset < segments[0]:
+            logger.warning(
+                f"Offset {offset} was deleted by the retention policy. Resuming from {segments[0]}."
+            )
+            offset = segments[0]
+        self._offset = offset
+
+        self._segment_offset = None
+        self._file = None
+        self._mmap = None
+
+    @property
+    def offset(self) -> int:
+        """
+        Returns the offset of the next record to be read.
+
+        Returns:
+            int: The offset of the next record.
+        """
+
+        return self._offset
+
+    def read(self) -> Optional[Tuple[int, Any]]:
+        """
+        Reads the next record, if it was already appended.
+
+        Returns:
+            Optional[Tuple[int, Any]]: The offset and the record or None if there is no new record.
+        """
+
+        if not self._open_segment():
+            return None
+
+        position = self._offset - self._segment_offset
+        if position + _HEADER.size > len(self._mmap):
+            self._remap()
+            if position + _HEADER.size > len(self._mmap):
+                return self._next_segment()
+
+        length, checksum = _HEADER.unpack_from(self._mmap, position)
+        start = position + _HEADER.size
+        if start + length > len(self._mmap):
+            self._remap()
+            if start + length > len(self._mmap):
+                # The record is not fully written yet.
+                return None
+
+        data = self._mmap[start : start + length]
+        if zlib.crc32(data) != checksum:
+            raise ValueError(
+                f"Corrupted record at offset {self._offset} of {self._dir_path}."
+            )
+
+        offset = self._offset
+        self._offset += _HEADER.size + length
+
+        return offset, json.loads(data)
+
+    def end_offset(self) -> int:
+        """
+        Returns the offset after the last record appended to the partition.
+
+        Returns:
+            int: The end offset.
+        """
+
+        segments = list_segments(self._dir_path)
+        if len(segments) == 0:
+            return 0
+
+        return segments[-1] + _segment_path(self._dir_path, segments[-1]).stat().st_size
+
+    def close(self) -> None:
+        """
+        Unmaps and closes the current segment.
+        """
+
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _open_segment(self) -> bool:
+        if self._mmap is not None:
+            return True
+
+        segment_offset = _find_segment(self._dir_path, self._offset)
+        if segment_offset is None:
+            return False
+
+        segment_path = _segment_path(self._dir_path, segment_offset)
+        if segment_path.stat().st_size == 0:
+            return False
+
+        self._segment_offset = segment_offset
+        self._file = open(segment_path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        return True
+
+    def _remap(self) -> None:
+        """
+        Maps the segment again, as it might have grown since it was mapped.
+        """
+
+        size = os.fstat(self._file.fileno()).st_size
+        if size > len(self._mmap):
+            self._mmap.close()
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _next_segment(self) -> Optional[Tuple[int, Any]]:
+        """
+        Moves to the next segment, if the current one was rolled.
+        """
+
+        segments = list_segments(self._dir_path)
+        next_segments = [offset for offset in segments if offset > self._segment_offset]
+        if len(next_segments) == 0 or self._offset < next_segments[0]:
+            return None
+
+        self.close()
+
+        return self.read()
+
+
+class SegmentLogOutput(DynamicOutput):
+    """Output class that appends the raw articles to a segment-file log.
+
+    Every worker writes to its own partition, so the ingestion workers never contend.
+
+    Args:
+        dir_path (Union[str, Path]): The directory of the log.
+        segment_max_bytes (int): The size after which a new segment is started.
+        fsync_interval_seconds (float): The maximum time between two fsyncs.
+        retention_seconds (Optional[float]): If provided, the full segments older than this are deleted.
+    """
+
+    def __init__(
+        self,
+        dir_path: Union[str, Path],
+        segment_max_bytes: int = constants.SEGMENT_LOG_SEGMENT_MAX_BYTES,
+        fsync_interval_seconds: float = constants.SEGMENT_LOG_FSYNC_INTERVAL_SECONDS,
+        retention_seconds: Optional[float] = None,
+    ):
+        self._dir_path = Path(dir_path)
+        self._segment_max_bytes = segment_max_bytes
+        self._fsync_interval_seconds = fsync_interval_seconds
+        self._retention_seconds = retention_seconds
+
+    def build(self, worker_index, worker_count):
+        return SegmentLogSink(
+            SegmentLogWriter(
+                self._dir_path / f"{_PARTITION_PREFIX}{worker_index:03d}",
+                segment_max_bytes=self._segment_max_bytes,
+                fsync_interval_seconds=self._fsync_interval_seconds,
+                retention_seconds=self._retention_seconds,
+            )
+        )
+
+
+class SegmentLogSink(StatelessSink):
+    """
+    A sink that appends every article of the raw messages as a record of the log.
+
+    Args:
+        writer (SegmentLogWriter): The writer of the worker's partition.
+    """
+
+    def __init__(self, writer: SegmentLogWriter):
+        self._writer = writer
+        self._metrics = MetricsRegistry()
+
+    def write(self, message: Union[dict, List[dict]]):
+        if isinstance(message, dict):
+            message = [message]
+
+        # The stream also emits control messages (e.g., subscriptions) besides the news.
+        articles = [article for article in message if article.get("T", "n") == "n"]
+        for article in articles:
+            self._writer.append(article)
+        self._metrics.increment("log_records_appended", len(articles))
+
+    def close(self):
+        self._writer.close()
+
+
+class SegmentLogInput(PartitionedInput):
+    """Input class that consumes the raw articles from a segment-file log.
+
+    Every partition of the log is read by a single worker. The offset of the next record is the
+    resume state of the partition, hence, with Bytewax recovery enabled (e.g., `--sqlite-directory`),
+    the offsets are committed together with the epochs and the flow resumes after the last processed article.
+
+    Args:
+        dir_path (Union[str, Path]): The directory of the log.
+        follow (bool): Whether to keep waiting for new records at the end of the log,
+            or to stop once all the partitions are consumed (e.g., to re-embed the raw articles).
+        batch_size (int): The maximum number of records emitted at once.
+    """
+
+    def __init__(
+        self, dir_path: Union[str, Path], follow: bool = True, batch_size: int = 50
+    ):
+        self._dir_path = Path(dir_path)
+        self._follow = follow
+        self._batch_size = batch_size
+
+    def list_parts(self) -> Set[str]:
+        if not self._dir_path.exists():
+            raise FileNotFoundError(f"No log found at: {self._dir_path}")
+
+        return {
+            path.name
+            for path in self._dir_path.iterdir()
+            if path.is_dir() and path.name.startswith(_PARTITION_PREFIX)
+        }
+
+    def build_part(self, for_part, resume_state):
+        return SegmentLogSource(
+            SegmentLogReader(self._dir_path / for_part, offset=resume_state),
+            partition=for_part,
+            follow=self._follow,
+            batch_size=self._batch_size,
+        )
+
+
+class SegmentLogSource(StatefulSource):
+    """
+    A source that emits the records of a partition of the log in batches.
+
+    Args:
+        reader (SegmentLogReader): The reader of the partition.
+        partition (str): The name of the partition.
+        follow (bool): Whether to keep waiting for new records at the end of the partition.
+        batch_size (int): The maximum number of records emitted at once.
+    """
+
+    def __init__(
+        self,
+        reader: SegmentLogReader,
+        partition: str,
+        follow: bool = True,
+        batch_size: int = 50,
+    ):
+        self._reader = reader
+        self._partition = partition
+        self._follow = follow
+        self._batch_size = batch_size
+        self._metrics = MetricsRegistry()
+
+    def next(self):
+        """
+        Returns the next batch of records, if any.
+
+        Raises:
+            StopIteration: When the partition is consumed and follow is False.
+
+        Returns:
+            Optional[List[dict]]: The records or None if there is no new record.
+        """
+
+        records = []
+        while len(records) < self._batch_size:
+            record = self._reader.read()
+            if record is None:
+                break
+
+            _, article = record
+            records.append(article)
+
+        self._metrics.set_gauge(
+            "log_consumer_lag_bytes",
+            self._reader.end_offset() - self._reader.offset,
+            labels={"partition": self._partition},
+        )
+
+        if len(records) == 0:
+            if not self._follow:
+                raise StopIteration()
+
+            return None
+
+        return records
+
+    def snapshot(self):
+        """
+        Returns the offset of the next record, used as the committed offset of the partition.
+        """
+
+        return self._reader.offset
+
+    def close(self):
+        self._reader.close()
+
+
+def list_segments(dir_path: Union[str, Path]) -> List[int]:
+    """
+    Lists the segments of a partition.
+
+    Args:
+        dir_path (Union[str, Path]): The directory of the partition.
+
+    Returns:
+        List[int]: The offsets of the first record of every segment, in increasing order.
+    """
+
+    dir_path = Path(dir_path)
+    if not dir_path.exists():
+        return []
+
+    return sorted(
+        int(path.stem)
+        for path in dir_path.iterdir()
+        if path.suffix == _SEGMENT_SUFFIX and path.stem.isdigit()
+    )
+
+
+def _segment_path(dir_path: Path, segment_offset: int) -> Path:
+    return dir_path / f"{segment_offset:020d}{_SEGMENT_SUFFIX}"
+
+
+def _find_segment(dir_path: Path, offset: int) -> Optional[int]:
+    segments = [
+        segment_offset
+        for segment_offset in list_segments(dir_path)
+        if segment_offset <= offset
+    ]
+    if len(segments) == 0:
+        return None
+
+    return segments[-1]
+
+
+def _valid_size(segment_path: Path) -> int:
+    """
+    Returns the size of the prefix of a segment made of complete & valid records.
+    """
+
+    size = 0
+    with open(segment_path, "rb") as f:
+        while True:
+            header = f.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                return size
+
+            length, checksum = _HEADER.unpack(header)
+            data = f.read(length)
+            if len(data) < length or zlib.crc32(data) != checksum:
+                return size
+
+            size += _HEADER.size + length
@@ -0,0 +1,298 @@
+import json
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import Distance, PointStruct
+
+from streaming_pipeline import constants
+from streaming_pipeline.collection import CollectionSpec, is_local_client
+
+logger = logging.getLogger(__name__)
+
+_ARROW_SUFFIXES = (".arrow", ".feather", ".ipc")
+
+
+def export_collection(
+    client: QdrantClient,
+    collection_name: str,
+    file_path: Union[str, Path],
+    batch_size: int = constants.SNAPSHOT_BATCH_SIZE,
+    report_interval_seconds: float = 10.0,
+) -> dict:
+    """
+    Exports the IDs, embeddings & payloads of a collection to a Parquet or Arrow IPC file.
+
+    The collection is scrolled page by page and every page is written as a record batch, so the memory stays
+    bounded by the page size. The embeddings are stored as fixed-size lists of float32, the payloads as JSON
+    strings, while the vector size & distance are stored in the metadata of the schema.
+
+    Args:
+        client (QdrantClient): The Qdrant client.
+        collection_name (str): The collection (or alias) to export.
+        file_path (Union[str, Path]): The output file. Its suffix selects the format: ".parquet" or
+            ".arrow" / ".feather" / ".ipc".
+        batch_size (int): The number of points scrolled & written at once.
+        report_interval_seconds (float): How often the export rate is reported.
+
+    Returns:
+        dict: The number of exported points, the elapsed time and the export rate.
+
+    Raises:
+        ValueError: If the collection stores named vectors, e.g., with the "article" point layout.
+    """
+
+    pa, pq = _import_pyarrow()
+
+    vectors_config = client.get_collection(
+        collection_name=collection_name
+    ).config.params.vectors
+    if isinstance(vectors_config, dict):
+        raise ValueError(
+            f"The {collection_name} collection stores named vectors, which the snapshots don't support."
+        )
+    schema = _build_schema(
+        pa,
+        vector_size=vectors_config.size,
+        distance=vectors_config.distance,
+        collection_name=collection_name,
+    )
+
+    file_path = Path(file_path)
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    if file_path.suffix in _ARROW_SUFFIXES:
+        writer = pa.ipc.new_file(str(file_path), schema)
+    else:
+        writer = pq.ParquetWriter(str(file_path), schema)
+
+    started_at = time.perf_counter()
+    last_reported_at = started_at
+    n_points = 0
+    offset = None
+    with writer:
+        while True:
+            records, offset = client.scroll(
+                collection_name=collection_name,
+                limit=batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True,
+            )
+            if len(records) > 0:
+                writer.write_batch(
+                    _to_record_batch(pa, records, schema, vectors_config.size)
+                )
+                n_points += len(records)
+
+            now = time.perf_counter()
+            if now - last_reported_at > report_interval_seconds:
+                _report("Exported", n_points, now - started_at)
+                last_reported_at = now
+
+            if offset is None:
+                break
+
+    results = _report("Exported", n_points, time.perf_counter() - started_at)
+    results["file_size_bytes"] = file_path.stat().st_size
+
+    return results
+
+
+def import_collection(
+    client: QdrantClient,
+    file_path: Union[str, Path],
+    collection_name: Optional[str] = None,
+    batch_size: int = constants.SNAPSHOT_BATCH_SIZE,
+    parallel: int = constants.SNAPSHOT_IMPORT_PARALLELISM,
+    report_interval_seconds: float = 10.0,
+) -> dict:
+    """
+    Bulk-loads a file written by export_collection into a collection.
+
+    The collection is created with the default spec for the exported vector size & distance, if it doesn't
+    exist. The record batches are read one by one and uploaded by a pool of threads, with at most
+    twice as many batches in flight as threads, so the memory stays bounded. The local clients are
+    loaded by a single thread, as they don't support concurrent writes.
+
+    Args:
+        client (QdrantClient): The Qdrant client.
+        file_path (Union[str, Path]): The file written by export_collection.
+        collection_name (Optional[str]): The collection to load into. Defaults to the exported collection.
+        batch_size (int): The number of points uploaded at once.
+        parallel (int): The number of concurrent uploads.
+        report_interval_seconds (float): How often the import rate is reported.
+
+    Returns:
+        dict: The number of imported points, the elapsed time and the import rate.
+    """
+
+    batches, metadata = _open(file_path, batch_size=batch_size)
+    collection_name = collection_name or metadata["collection_name"]
+    CollectionSpec(
+        collection_name=collection_name,
+        vector_size=int(metadata["vector_size"]),
+        distance=Distance(metadata["distance"]),
+    ).apply(client)
+
+    if is_local_client(client):
+        parallel = 1
+
+    started_at = time.perf_counter()
+    last_reported_at = started_at
+    n_points = 0
+    with ThreadPoolExecutor(max_workers=parallel) as executor:
+        in_flight = set()
+        for points in _to_points(batches, batch_size):
+            if len(in_flight) >= 2 * parallel:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                n_points += sum(future.result() for future in done)
+
+            in_flight.add(executor.submit(_upload, client, collection_name, points))
+
+            now = time.perf_counter()
+            if now - last_reported_at > report_interval_seconds:
+                _report("Imported", n_points, now - started_at)
+                last_reported_at = now
+
+        n_points += sum(future.result() for future in wait(in_flight).done)
+
+    return _report("Imported", n_points, time.perf_counter() - started_at)
+
+
+def load_vectors(file_path: Union[str, Path]) -> Tuple[np.ndarray, dict]:
+    """
+    Loads the embeddings of a file written by export_collection into memory, e.g., to benchmark the retrieval.
+
+    Args:
+        file_path (Union[str, Path]): The snapshot file.
+
+    Returns:
+        Tuple[np.ndarray, dict]: The (n_points, vector_size) float32 matrix of the embeddings and the metadata
+            of the snapshot: the collection name, the vector size & the distance.
+    """
+
+    batches, metadata = _open(file_path, batch_size=constants.SNAPSHOT_BATCH_SIZE)
+    vectors = [_to_vectors(batch) for batch in batches]
+    if len(vectors) == 0:
+        return np.empty((0, int(metadata["vector_size"])), dtype=np.float32), metadata
+
+    return np.concatenate(vectors), metadata
+
+
+def _open(file_path: Union[str, Path], batch_size: int) -> Tuple[Iterator, dict]:
+    pa, pq = _import_pyarrow()
+
+    file_path = Path(file_path)
+    if file_path.suffix in _ARROW_SUFFIXES:
+        reader = pa.ipc.open_file(str(file_path))
+        schema = reader.schema
+        batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+    else:
+        parquet_file = pq.ParquetFile(str(file_path))
+        schema = parquet_file.schema_arrow
+        batches = parquet_file.iter_batches(batch_size=batch_size)
+
+    metadata = {
+        key.decode(): value.decode() for key, value in (schema.metadata or {}).items()
+    }
+
+    return batches, metadata
+
+
+def _build_schema(pa, vector_size: int, distance: Distance, collection_name: str):
+    return pa.schema(
+        [
+            pa.field("id", pa.string(), nullable=False),
+            pa.field("vector", pa.list_(pa.float32(), vector_size), nullable=False),
+            pa.field("payload", pa.string()),
+        ],
+        metadata={
+            "collection_name": collection_name,
+            "vector_size": str(vector_size),
+            "distance": distance.value,
+        },
+    )
+
+
+def _to_record_batch(pa, records: list, schema, vector_size: int):
+    vectors = np.asarray([record.vector for record in records], dtype=np.float32)
+
+    return pa.record_batch(
+        [
+            pa.array([str(record.id) for record in records], type=pa.string()),
+            pa.FixedSizeListArray.from_arrays(
+                pa.array(vectors.reshape(-1), type=pa.float32()), vector_size
+            ),
+            pa.array(
+                [json.dumps(record.payload) for record in records], type=pa.string()
+            ),
+        ],
+        schema=schema,
+    )
+
+
+def _to_points(batches: Iterator, batch_size: int) -> Iterator[List[PointStruct]]:
+    for batch in batches:
+        vectors = _to_vectors(batch)
+        ids = batch.column("id").to_pylist()
+        payloads = batch.column("payload").to_pylist()
+
+        for start in range(0, len(batch), batch_size):
+            end = start + batch_size
+            yield [
+                PointStruct(
+                    # Qdrant IDs are either unsigned integers or UUIDs.
+                    id=int(point_id) if point_id.isdigit() else point_id,
+                    vector=vector.tolist(),
+                    payload=json.loads(payload) if payload is not None else None,
+                )
+                for point_id, vector, payload in zip(
+                    ids[start:end], vectors[start:end], payloads[start:end]
+                )
+            ]
+
+
+def _to_vectors(batch) -> np.ndarray:
+    vector_column = batch.column("vector")
+
+    return (
+        vector_column.flatten()
+        .to_numpy(zero_copy_only=False)
+        .reshape(len(batch), vector_column.type.list_size)
+    )
+
+
+def _upload(client: QdrantClient, collection_name: str, points: List[PointStruct]):
+    client.upsert(collection_name=collection_name, points=points)
+
+    return len(points)
+
+
+def _report(action: str, n_points: int, elapsed_seconds: float) -> dict:
+    points_per_second = n_points / max(elapsed_seconds, 1e-9)
+    logger.info(
+        f"{action} {n_points} points in {elapsed_seconds:.1f}s [{points_per_second:.1f} points/s]"
+    )
+
+    return {
+        "n_points": n_points,
+        "elapsed_seconds": elapsed_seconds,
+        "points_per_second": points_per_second,
+    }
+
+
+def _import_pyarrow():
+    # pyarrow is imported lazily, as it is only required for the snapshots.
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError(
+            "Exporting & importing snapshots requires pyarrow. Install the dependencies with: poetry install"
+        ) from e
+
+    return pa, pq
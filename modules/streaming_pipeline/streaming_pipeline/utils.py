@@ -1,4 +1,5 @@
 import datetime
+import json
 from typing import List, Tuple
 
 
@@ -19,6 +20,30 @@ def read_requirements(file_path: str) -> List[str]:
     return requirements
 
 
+def read_queries(file_path: str) -> List[str]:
+    """
+    Reads a file of search queries, one per line, either as plain text or as a JSON object with a "query" field.
+
+    Args:
+        file_path (str): The path to the file containing the queries.
+
+    Returns:
+        List[str]: The queries, without the blank lines.
+    """
+
+    queries = []
+    with open(file_path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                line = json.loads(line)["query"]
+            queries.append(line)
+
+    return queries
+
+
 def split_time_range_into_intervals(
     from_datetime: datetime.datetime, to_datetime: datetime.datetime, n: int
 ) -> List[Tuple[datetime.datetime, datetime.datetime]]:
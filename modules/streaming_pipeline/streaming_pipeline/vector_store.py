@@ -0,0 +1,963 @@
+import datetime
+import json
+import logging
+import shutil
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Protocol, Set, Tuple, Union
+
+import numpy as np
+from qdrant_client.http.models import (
+    CountResult,
+    Distance,
+    FieldCondition,
+    Filter,
+    HasIdCondition,
+    MatchAny,
+    MatchText,
+    MatchValue,
+    PayloadSchemaType,
+    PointIdsList,
+    PointStruct,
+    Record,
+    ScoredPoint,
+)
+
+from streaming_pipeline import constants
+
+logger = logging.getLogger(__name__)
+
+PointId = Union[int, str]
+
+
+class VectorStore(Protocol):
+    """
+    The subset of the Qdrant client API the streaming pipeline & the financial bot use, with the same signatures.
+    Hence, a QdrantClient is a VectorStore, while other backends (e.g., LocalVectorStore) are drop-in replacements.
+    """
+
+    def upsert(self, collection_name: str, points: List[PointStruct], **kwargs) -> Any:
+        ...
+
+    def delete(
+        self,
+        collection_name: str,
+        points_selector: Union[PointIdsList, List[PointId]],
+        **kwargs,
+    ) -> Any:
+        ...
+
+    def set_payload(
+        self, collection_name: str, payload: dict, points: List[PointId], **kwargs
+    ) -> Any:
+        ...
+
+    def retrieve(
+        self,
+        collection_name: str,
+        ids: List[PointId],
+        with_payload: Union[bool, List[str]] = True,
+        with_vectors: bool = False,
+        **kwargs,
+    ) -> List[Record]:
+        ...
+
+    def scroll(
+        self,
+        collection_name: str,
+        scroll_filter: Optional[Filter] = None,
+        limit: int = 10,
+        offset: Optional[PointId] = None,
+        with_payload: Union[bool, List[str]] = True,
+        with_vectors: bool = False,
+        **kwargs,
+    ) -> Tuple[List[Record], Optional[PointId]]:
+        ...
+
+    def search(
+        self,
+        collection_name: str,
+        query_vector: List[float],
+        query_filter: Optional[Filter] = None,
+        limit: int = 10,
+        with_payload: Union[bool, List[str]] = True,
+        with_vectors: bool = False,
+        **kwargs,
+    ) -> List[ScoredPoint]:
+        ...
+
+
+class LocalVectorStore:
+    """
+    An embedded vector store that searches exhaustively, as a drop-in replacement for Qdrant.
+
+    Every collection keeps its embeddings in a float32 matrix, memory-mapped from a file, and its IDs & payloads
+    in memory, persisted to SQLite. A search multiplies the matrix with the query in blocks of rows and keeps
+    a running top-k, so the memory stays bounded for large collections, while the results are exact and
+    deterministic. For up to a few million chunks, it answers in milliseconds without a network hop.
+
+    Like Qdrant, the payload fields can be indexed to filter on them efficiently: the keyword fields with
+    a mapping from their values to their rows & the numeric fields with a column of values compared at once.
+    The filters on the other fields are evaluated point by point.
+
+    Deleted points leave a hole in the matrix that is masked out of the searches. The store is safe to use
+    from multiple threads (e.g., the workers of a process), but not from multiple processes.
+
+    Args:
+        dir_path (Optional[Union[str, Path]]): The directory of the collections. If None, they are kept in memory.
+        block_size (int): The number of rows multiplied at once while searching.
+    """
+
+    def __init__(
+        self,
+        dir_path: Optional[Union[str, Path]] = None,
+        block_size: int = constants.LOCAL_VECTOR_STORE_BLOCK_SIZE,
+    ):
+        self._dir_path = Path(dir_path) if dir_path is not None else None
+        self._block_size = block_size
+        self._collections: Dict[str, _LocalCollection] = {}
+        self._lock = threading.Lock()
+
+        if self._dir_path is not None:
+            self._dir_path.mkdir(parents=True, exist_ok=True)
+            for collection_dir in sorted(self._dir_path.iterdir()):
+                if (collection_dir / _LocalCollection.DB_FILE_NAME).exists():
+                    self._collections[collection_dir.name] = _LocalCollection.open(
+                        collection_dir
+                    )
+
+    def create_collection(
+        self,
+        collection_name: str,
+        vector_size: int,
+        distance: Distance = Distance.COSINE,
+        payload_indexes: Optional[Dict[str, PayloadSchemaType]] = None,
+    ) -> None:
+        """
+        Creates a collection, if it doesn't exist, and the missing payload indexes.
+
+        Args:
+            collection_name (str): The name of the collection.
+            vector_size (int): The dimension of the embeddings.
+            distance (Distance): The distance between the embeddings.
+            payload_indexes (Optional[Dict[str, PayloadSchemaType]]): The payload fields to index.
+                Only the keyword, integer & float fields are supported.
+
+        Raises:
+            ValueError: If the collection exists with a different vector size or distance,
+                or if a payload index is not supported.
+        """
+
+        with self._lock:
+            collection = self._collections.get(collection_name)
+            if collection is None:
+                collection_dir = (
+                    self._dir_path / collection_name
+                    if self._dir_path is not None
+                    else None
+                )
+                self._collections[collection_name] = _LocalCollection.create(
+                    collection_dir, vector_size=vector_size, distance=distance
+                )
+                logger.info(
+                    f"Created the {collection_name} local collection [size={vector_size}, distance={distance}]."
+                )
+            elif (
+                collection.vector_size != vector_size or collection.distance != distance
+            ):
+                raise ValueError(
+                    f"The {collection_name} collection stores vectors of size {collection.vector_size} "
+                    f"with {collection.distance} distance, but size {vector_size} "
+                    f"with {distance} distance is expected."
+                )
+
+            for field_name, field_schema in (payload_indexes or {}).items():
+                if self._collections[collection_name].create_payload_index(
+                    field_name, field_schema
+                ):
+                    logger.info(
+                        f"Created the {field_schema.value} payload index on {collection_name}.{field_name}."
+                    )
+
+    def delete_collection(self, collection_name: str) -> None:
+        """
+        Deletes a collection with all its points.
+
+        Args:
+            collection_name (str): The name of the collection.
+        """
+
+        with self._lock:
+            collection = self._collections.pop(collection_name, None)
+        if collection is not None:
+            collection.close()
+            if collection.dir_path is not None:
+                shutil.rmtree(collection.dir_path)
+
+    def list_collections(self) -> List[str]:
+        """
+        Returns the names of the collections.
+        """
+
+        return sorted(self._collections)
+
+    def upsert(self, collection_name: str, points: List[PointStruct], **kwargs) -> None:
+        """
+        Inserts the points or overwrites the ones with the same IDs.
+
+        Args:
+            collection_name (str): The name of the collection.
+            points (List[PointStruct]): The points.
+        """
+
+        self._get(collection_name).upsert(points)
+
+    def delete(
+        self,
+        collection_name: str,
+        points_selector: Union[PointIdsList, List[PointId]],
+        **kwargs,
+    ) -> None:
+        """
+        Deletes points by ID.
+
+        Args:
+            collection_name (str): The name of the collection.
+            points_selector (Union[PointIdsList, List[PointId]]): The IDs of the points.
+        """
+
+        if isinstance(points_selector, PointIdsList):
+            points_selector = points_selector.points
+
+        self._get(collection_name).delete(points_selector)
+
+    def set_payload(
+        self, collection_name: str, payload: dict, points: List[PointId], **kwargs
+    ) -> None:
+        """
+        Merges the payload into the payloads of the points.
+
+        Args:
+            collection_name (str): The name of the collection.
+            payload (dict): The fields to set.
+            points (List[PointId]): The IDs of the points.
+        """
+
+        self._get(collection_name).set_payload(payload, points)
+
+    def retrieve(
+        self,
+        collection_name: str,
+        ids: List[PointId],
+        with_payload: Union[bool, List[str]] = True,
+        with_vectors: bool = False,
+        **kwargs,
+    ) -> List[Record]:
+        """
+        Returns the points with the given IDs. The missing ones are skipped.
+        """
+
+        return self._get(collection_name).retrieve(
+            ids, with_payload=with_payload, with_vectors=with_vectors
+        )
+
+    def scroll(
+        self,
+        collection_name: str,
+        scroll_filter: Optional[Filter] = None,
+        limit: int = 10,
+        offset: Optional[PointId] = None,
+        with_payload: Union[bool, List[str]] = True,
+        with_vectors: bool = False,
+        **kwargs,
+    ) -> Tuple[List[Record], Optional[int]]:
+        """
+        Pages through the points matching the filter, in insertion order.
+
+        Returns:
+            Tuple[List[Record], Optional[int]]: The points and the offset of the next page,
+                or None if it is the last page.
+        """
+
+        return self._get(collection_name).scroll(
+            scroll_filter,
+            limit=limit,
+            offset=offset,
+            with_payload=with_payload,
+            with_vectors=with_vectors,
+        )
+
+    def search(
+        self,
+        collection_name: str,
+        query_vector: List[float],
+        query_filter: Optional[Filter] = None,
+        limit: int = 10,
+        with_payload: Union[bool, List[str]] = True,
+        with_vectors: bool = False,
+        score_threshold: Optional[float] = None,
+        **kwargs,
+    ) -> List[ScoredPoint]:
+        """
+        Returns the exact top-k points closest to the query. The search parameters of Qdrant are ignored.
+
+        Returns:
+            List[ScoredPoint]: The points, sorted from the closest.
+        """
+
+        return self._get(collection_name).search(
+            np.asarray(query_vector, dtype=np.float32),
+            query_filter=query_filter,
+            limit=limit,
+            with_payload=with_payload,
+            with_vectors=with_vectors,
+            score_threshold=score_threshold,
+            block_size=self._block_size,
+        )
+
+    def count(
+        self, collection_name: str, count_filter: Optional[Filter] = None, **kwargs
+    ) -> CountResult:
+        """
+        Counts the points matching the filter.
+        """
+
+        return CountResult(count=self._get(collection_name).count(count_filter))
+
+    def close(self) -> None:
+        """
+        Flushes the embeddings to disk and closes the collections.
+        """
+
+        for collection in self._collections.values():
+            collection.close()
+
+    def _get(self, collection_name: str) -> "_LocalCollection":
+        try:
+            return self._collections[collection_name]
+        except KeyError:
+            raise ValueError(f"Collection {collection_name} not found.")
+
+
+class _LocalCollection:
+    DB_FILE_NAME = "points.sqlite3"
+    VECTORS_FILE_NAME = "vectors.f32"
+    MIN_CAPACITY = 1024
+    NUMERIC_SCHEMAS = (PayloadSchemaType.INTEGER, PayloadSchemaType.FLOAT)
+
+    def __init__(
+        self,
+        dir_path: Optional[Path],
+        vector_size: int,
+        distance: Distance,
+        db: sqlite3.Connection,
+    ):
+        self.dir_path = dir_path
+        self.vector_size = vector_size
+        self.distance = distance
+        self._db = db
+        self._lock = threading.RLock()
+
+        self._ids: List[Optional[PointId]] = []
+        self._payloads: List[Optional[dict]] = []
+        self._rows: Dict[PointId, int] = {}
+        self._vectors = self._allocate(self.MIN_CAPACITY)
+        self._alive = np.zeros(self.MIN_CAPACITY, dtype=bool)
+
+        self._payload_indexes: Dict[str, PayloadSchemaType] = {}
+        # The keyword indexes map every value to its rows, e.g., the document IDs to the rows of their chunks.
+        self._keyword_indexes: Dict[str, Dict[Any, Set[int]]] = {}
+        # The numeric indexes hold a column of values, NaN if missing, and the rows holding lists of values,
+        # which are compared one by one.
+        self._numeric_indexes: Dict[str, np.ndarray] = {}
+        self._numeric_list_rows: Dict[str, Set[int]] = {}
+
+    @classmethod
+    def create(
+        cls, dir_path: Optional[Path], vector_size: int, distance: Distance
+    ) -> "_LocalCollection":
+        if dir_path is not None:
+            dir_path.mkdir(parents=True, exist_ok=True)
+        db = _connect(dir_path)
+        with db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+            )
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS points "
+                "(row INTEGER PRIMARY KEY, point_id TEXT UNIQUE, payload TEXT)"
+            )
+            db.executemany(
+                "INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                [
+                    ("vector_size", str(vector_size)),
+                    ("distance", distance.value),
+                    ("n_rows", "0"),
+                    ("payload_indexes", "{}"),
+                ],
+            )
+
+        return cls(dir_path, vector_size=vector_size, distance=distance, db=db)
+
+    @classmethod
+    def open(cls, dir_path: Path) -> "_LocalCollection":
+        db = _connect(dir_path)
+        meta = dict(db.execute("SELECT key, value FROM meta"))
+        collection = cls(
+            dir_path,
+            vector_size=int(meta["vector_size"]),
+            distance=Distance(meta["distance"]),
+            db=db,
+        )
+        collection._load(n_rows=int(meta["n_rows"]))
+        for field_name, field_schema in json.loads(
+            meta.get("payload_indexes", "{}")
+        ).items():
+            collection.create_payload_index(field_name, PayloadSchemaType(field_schema))
+
+        return collection
+
+    @property
+    def n_rows(self) -> int:
+        return len(self._ids)
+
+    def create_payload_index(
+        self, field_name: str, field_schema: PayloadSchemaType
+    ) -> bool:
+        """
+        Indexes a payload field, if it isn't yet. Returns whether the index was created.
+        """
+
+        if field_schema not in (PayloadSchemaType.KEYWORD, *self.NUMERIC_SCHEMAS):
+            raise ValueError(
+                f"The local vector store doesn't support {field_schema.value} payload indexes."
+            )
+
+        with self._lock:
+            if field_name in self._payload_indexes:
+                return False
+
+            self._payload_indexes[field_name] = field_schema
+            if field_schema == PayloadSchemaType.KEYWORD:
+                self._keyword_indexes[field_name] = {}
+            else:
+                self._numeric_indexes[field_name] = np.full(
+                    len(self._alive), np.nan, dtype=np.float64
+                )
+                self._numeric_list_rows[field_name] = set()
+            for row, payload in enumerate(self._payloads):
+                if payload is not None:
+                    self._index_field(field_name, row, payload)
+
+            with self._db:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO meta VALUES ('payload_indexes', ?)",
+                    (
+                        json.dumps(
+                            {
+                                name: schema.value
+                                for name, schema in self._payload_indexes.items()
+                            }
+                        ),
+                    ),
+                )
+
+        return True
+
+    def upsert(self, points: List[PointStruct]) -> None:
+        if len(points) == 0:
+            return
+
+        vectors = np.asarray([point.vector for point in points], dtype=np.float32)
+        if vectors.ndim != 2 or vectors.shape[1] != self.vector_size:
+            raise ValueError(
+                f"Expected vectors of size {self.vector_size}, got shape {vectors.shape}."
+            )
+        if self.distance == Distance.COSINE:
+            # Like Qdrant, store the normalized vectors, so the cosine similarity is a dot product.
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.maximum(norms, 1e-12)
+
+        with self._lock:
+            rows = []
+            for point in points:
+                row = self._rows.get(point.id)
+                if row is None:
+                    row = self.n_rows
+                    self._ids.append(point.id)
+                    self._payloads.append(None)
+                    self._rows[point.id] = row
+                rows.append(row)
+            self._reserve(self.n_rows)
+
+            for point, row in zip(points, rows):
+                self._unindex(row)
+                self._payloads[row] = _to_json(point.payload or {})
+                self._index(row)
+
+            self._vectors[rows] = vectors
+            self._alive[rows] = True
+            self._persist(rows)
+
+    def delete(self, point_ids: Iterable[PointId]) -> None:
+        with self._lock:
+            rows = [
+                self._rows.pop(point_id)
+                for point_id in point_ids
+                if point_id in self._rows
+            ]
+            for row in rows:
+                self._unindex(row)
+                self._ids[row] = None
+                self._payloads[row] = None
+            self._alive[rows] = False
+            with self._db:
+                self._db.executemany(
+                    "DELETE FROM points WHERE row = ?", [(row,) for row in rows]
+                )
+
+    def set_payload(self, payload: dict, point_ids: Iterable[PointId]) -> None:
+        with self._lock:
+            rows = [
+                self._rows[point_id] for point_id in point_ids if point_id in self._rows
+            ]
+            payload = _to_json(payload)
+            for row in rows:
+                self._unindex(row)
+                self._payloads[row] = {**self._payloads[row], **payload}
+                self._index(row)
+            self._persist(rows)
+
+    def retrieve(
+        self,
+        point_ids: List[PointId],
+        with_payload: Union[bool, List[str]],
+        with_vectors: bool,
+    ) -> List[Record]:
+        rows = [
+            self._rows[point_id] for point_id in point_ids if point_id in self._rows
+        ]
+
+        return [self._to_record(row, with_payload, with_vectors) for row in rows]
+
+    def scroll(
+        self,
+        scroll_filter: Optional[Filter],
+        limit: int,
+        offset: Optional[int],
+        with_payload: Union[bool, List[str]],
+        with_vectors: bool,
+    ) -> Tuple[List[Record], Optional[int]]:
+        # Look for one more point than requested, which starts the next page, in growing windows of rows,
+        # hence a page costs the rows up to its last point, not the whole collection.
+        rows = []
+        start = offset or 0
+        window = max(limit + 1, self.MIN_CAPACITY)
+        with self._lock:
+            n_rows = self.n_rows
+            while start < n_rows and len(rows) <= limit:
+                end = min(start + window, n_rows)
+                rows.extend(
+                    (np.flatnonzero(self._mask(scroll_filter, start, end)) + start)[
+                        : limit + 1 - len(rows)
+                    ].tolist()
+                )
+                start = end
+                window *= 2
+
+            records = [
+                self._to_record(row, with_payload, with_vectors) for row in rows[:limit]
+            ]
+
+        return records, rows[limit] if len(rows) > limit else None
+
+    def search(
+        self,
+        query_vector: np.ndarray,
+        query_filter: Optional[Filter],
+        limit: int,
+        with_payload: Union[bool, List[str]],
+        with_vectors: bool,
+        score_threshold: Optional[float],
+        block_size: int,
+    ) -> List[ScoredPoint]:
+        if self.distance == Distance.COSINE:
+            query_vector = query_vector / max(np.linalg.norm(query_vector), 1e-12)
+        # The higher the score, the closer the point, also for the Euclidean distance.
+        sign = -1.0 if self.distance == Distance.EUCLID else 1.0
+
+        with self._lock:
+            n_rows = self.n_rows
+            mask = self._mask(query_filter, 0, n_rows)
+
+            best_rows = np.empty(0, dtype=np.int64)
+            best_scores = np.empty(0, dtype=np.float32)
+            for start in range(0, n_rows, block_size):
+                end = min(start + block_size, n_rows)
+                scores = sign * self._score(self._vectors[start:end], query_vector)
+                scores[~mask[start:end]] = -np.inf
+
+                rows = np.arange(start, end)
+                if len(scores) > limit:
+                    top = np.argpartition(-scores, limit - 1)[:limit]
+                    rows, scores = rows[top], scores[top]
+                best_rows = np.concatenate([best_rows, rows])
+                best_scores = np.concatenate([best_scores, scores])
+                if len(best_scores) > limit:
+                    top = np.argpartition(-best_scores, limit - 1)[:limit]
+                    best_rows, best_scores = best_rows[top], best_scores[top]
+
+            order = np.argsort(-best_scores, kind="stable")
+            hits = []
+            for row, score in zip(best_rows[order], best_scores[order]):
+                if score == -np.inf:
+                    break
+                score = float(sign * score)
+                if score_threshold is not None and (
+                    score < score_threshold if sign > 0 else score > score_threshold
+                ):
+                    break
+
+                record = self._to_record(int(row), with_payload, with_vectors)
+                hits.append(
+                    ScoredPoint(
+                        id=record.id,
+                        version=0,
+                        score=score,
+                        payload=record.payload,
+                        vector=record.vector,
+                    )
+                )
+
+        return hits
+
+    def count(self, count_filter: Optional[Filter]) -> int:
+        with self._lock:
+            return int(self._mask(count_filter, 0, self.n_rows).sum())
+
+    def close(self) -> None:
+        with self._lock:
+            if isinstance(self._vectors, np.memmap):
+                self._vectors.flush()
+            self._db.close()
+
+    def _mask(self, query_filter: Optional[Filter], start: int, end: int) -> np.ndarray:
+        """
+        Returns whether the points of the rows [start, end) are alive and match the filter.
+        """
+
+        mask = self._alive[start:end].copy()
+        if query_filter is not None:
+            mask &= self._filter_mask(query_filter, start, end)
+
+        return mask
+
+    def _filter_mask(self, query_filter: Filter, start: int, end: int) -> np.ndarray:
+        mask = np.ones(end - start, dtype=bool)
+        for condition in query_filter.must or []:
+            mask &= self._condition_mask(condition, start, end)
+        if query_filter.should:
+            should_mask = np.zeros(end - start, dtype=bool)
+            for condition in query_filter.should:
+                should_mask |= self._condition_mask(condition, start, end)
+            mask &= should_mask
+        for condition in query_filter.must_not or []:
+            mask &= ~self._condition_mask(condition, start, end)
+
+        return mask
+
+    def _condition_mask(self, condition, start: int, end: int) -> np.ndarray:
+        if isinstance(condition, Filter):
+            return self._filter_mask(condition, start, end)
+        if isinstance(condition, HasIdCondition):
+            return self._rows_mask(
+                (
+                    self._rows[point_id]
+                    for point_id in condition.has_id
+                    if point_id in self._rows
+                ),
+                start,
+                end,
+            )
+
+        if isinstance(condition, FieldCondition):
+            keyword_index = self._keyword_indexes.get(condition.key)
+            if isinstance(condition.match, MatchValue):
+                values = [condition.match.value]
+            elif isinstance(condition.match, MatchAny):
+                values = condition.match.any
+            else:
+                values = None
+            # Only the strings are indexed as keywords.
+            if (
+                keyword_index is not None
+                and values is not None
+                and all(isinstance(value, str) for value in values)
+            ):
+                return self._rows_mask(
+                    (row for value in values for row in keyword_index.get(value, ())),
+                    start,
+                    end,
+                )
+
+            column = self._numeric_indexes.get(condition.key)
+            if column is not None and condition.range is not None:
+                values = column[start:end]
+                bounds = condition.range
+                # The comparisons with NaN are False, hence the points missing the field never match.
+                mask = ~np.isnan(values)
+                if bounds.gt is not None:
+                    mask &= values > bounds.gt
+                if bounds.gte is not None:
+                    mask &= values >= bounds.gte
+                if bounds.lt is not None:
+                    mask &= values < bounds.lt
+                if bounds.lte is not None:
+                    mask &= values <= bounds.lte
+                for row in self._numeric_list_rows[condition.key]:
+                    if start <= row < end:
+                        mask[row - start] = _matches_condition(
+                            self._ids[row], self._payloads[row], condition
+                        )
+
+                return mask
+
+        return np.fromiter(
+            (
+                payload is not None and _matches_condition(point_id, payload, condition)
+                for point_id, payload in zip(
+                    self._ids[start:end], self._payloads[start:end]
+                )
+            ),
+            dtype=bool,
+            count=end - start,
+        )
+
+    @staticmethod
+    def _rows_mask(rows: Iterable[int], start: int, end: int) -> np.ndarray:
+        rows = np.fromiter(rows, dtype=np.int64)
+        rows = rows[(rows >= start) & (rows < end)]
+        mask = np.zeros(end - start, dtype=bool)
+        mask[rows - start] = True
+
+        return mask
+
+    def _index(self, row: int) -> None:
+        for field_name in (*self._keyword_indexes, *self._numeric_indexes):
+            self._index_field(field_name, row, self._payloads[row])
+
+    def _index_field(self, field_name: str, row: int, payload: dict) -> None:
+        value = payload.get(field_name)
+        if value is None:
+            return
+
+        if field_name in self._keyword_indexes:
+            keyword_index = self._keyword_indexes[field_name]
+            for item in value if isinstance(value, list) else [value]:
+                if isinstance(item, str):
+                    keyword_index.setdefault(item, set()).add(row)
+        elif isinstance(value, list):
+            self._numeric_list_rows[field_name].add(row)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            self._numeric_indexes[field_name][row] = value
+
+    def _unindex(self, row: int) -> None:
+        payload = self._payloads[row]
+        if payload is None:
+            return
+
+        for field_name, keyword_index in self._keyword_indexes.items():
+            value = payload.get(field_name)
+            for item in value if isinstance(value, list) else [value]:
+                rows = keyword_index.get(item)
+                if rows is not None:
+                    rows.discard(row)
+                    if len(rows) == 0:
+                        del keyword_index[item]
+        for field_name, column in self._numeric_indexes.items():
+            column[row] = np.nan
+            self._numeric_list_rows[field_name].discard(row)
+
+    def _score(self, vectors: np.ndarray, query_vector: np.ndarray) -> np.ndarray:
+        if self.distance == Distance.EUCLID:
+            differences = vectors - query_vector
+
+            return np.sqrt(np.einsum("ij,ij->i", differences, differences))
+
+        return vectors @ query_vector
+
+    def _to_record(
+        self, row: int, with_payload: Union[bool, List[str]], with_vectors: bool
+    ) -> Record:
+        payload = self._payloads[row]
+        if with_payload is False:
+            payload = None
+        elif isinstance(with_payload, list):
+            payload = {key: payload[key] for key in with_payload if key in payload}
+
+        return Record(
+            id=self._ids[row],
+            payload=payload,
+            vector=self._vectors[row].tolist() if with_vectors else None,
+        )
+
+    def _reserve(self, n_rows: int) -> None:
+        capacity = len(self._alive)
+        if n_rows <= capacity:
+            return
+
+        while capacity < n_rows:
+            capacity *= 2
+        vectors = self._allocate(capacity, previous=self._vectors)
+        self._vectors = vectors
+        self._alive = np.concatenate(
+            [self._alive, np.zeros(capacity - len(self._alive), dtype=bool)]
+        )
+        for field_name, column in self._numeric_indexes.items():
+            self._numeric_indexes[field_name] = np.concatenate(
+                [column, np.full(capacity - len(column), np.nan, dtype=np.float64)]
+            )
+
+    def _allocate(
+        self, capacity: int, previous: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        if self.dir_path is None:
+            vectors = np.zeros((capacity, self.vector_size), dtype=np.float32)
+            if previous is not None:
+                vectors[: len(previous)] = previous
+
+            return vectors
+
+        # The file only grows, hence the rows written through the previous mapping are kept.
+        if previous is not None:
+            previous.flush()
+        file_path = self.dir_path / self.VECTORS_FILE_NAME
+        size = file_path.stat().st_size if file_path.exists() else 0
+        with open(file_path, "ab") as f:
+            f.truncate(max(size, capacity * self.vector_size * 4))
+
+        return np.memmap(
+            file_path, dtype=np.float32, mode="r+", shape=(capacity, self.vector_size)
+        )
+
+    def _persist(self, rows: List[int]) -> None:
+        with self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO points VALUES (?, ?, ?)",
+                [
+                    (row, json.dumps(self._ids[row]), json.dumps(self._payloads[row]))
+                    for row in rows
+                ],
+            )
+            self._db.execute(
+                "UPDATE meta SET value = ? WHERE key = 'n_rows'", (str(self.n_rows),)
+            )
+
+    def _load(self, n_rows: int) -> None:
+        self._ids = [None] * n_rows
+        self._payloads = [None] * n_rows
+        self._reserve(n_rows)
+        for row, point_id, payload in self._db.execute(
+            "SELECT row, point_id, payload FROM points"
+        ):
+            point_id = json.loads(point_id)
+            self._ids[row] = point_id
+            self._payloads[row] = json.loads(payload)
+            self._rows[point_id] = row
+            self._alive[row] = True
+
+
+def _to_json(payload: dict) -> dict:
+    # Like the Qdrant server, return the datetimes as ISO formatted strings.
+    return json.loads(
+        json.dumps(
+            payload,
+            default=lambda value: value.isoformat()
+            if isinstance(value, (datetime.date, datetime.datetime))
+            else str(value),
+        )
+    )
+
+
+def _connect(dir_path: Optional[Path]) -> sqlite3.Connection:
+    database = (
+        str(dir_path / _LocalCollection.DB_FILE_NAME)
+        if dir_path is not None
+        else ":memory:"
+    )
+
+    # The connection is shared by the threads, guarded by the lock of the collection.
+    return sqlite3.connect(database, check_same_thread=False)
+
+
+def _matches(
+    point_id: PointId, payload: Optional[dict], query_filter: Optional[Filter]
+) -> bool:
+    """
+    Evaluates a Qdrant filter against a point. Only the conditions used across the repo are supported:
+    the match (value, any & text) and range conditions, the ID conditions and the nested filters.
+    """
+
+    if query_filter is None:
+        return True
+    if payload is None:
+        return False
+
+    if query_filter.must and not all(
+        _matches_condition(point_id, payload, condition)
+        for condition in query_filter.must
+    ):
+        return False
+    if query_filter.should and not any(
+        _matches_condition(point_id, payload, condition)
+        for condition in query_filter.should
+    ):
+        return False
+    if query_filter.must_not and any(
+        _matches_condition(point_id, payload, condition)
+        for condition in query_filter.must_not
+    ):
+        return False
+
+    return True
+
+
+def _matches_condition(point_id: PointId, payload: dict, condition) -> bool:
+    if isinstance(condition, Filter):
+        return _matches(point_id, payload, condition)
+    if isinstance(condition, HasIdCondition):
+        return point_id in condition.has_id
+    if not isinstance(condition, FieldCondition):
+        raise ValueError(f"Unsupported filter condition: {condition}")
+
+    value = payload
+    for key in condition.key.split("."):
+        value = value.get(key) if isinstance(value, dict) else None
+    values = value if isinstance(value, list) else [value]
+
+    if condition.match is not None:
+        match = condition.match
+        if isinstance(match, MatchValue):
+            return match.value in values
+        if isinstance(match, MatchAny):
+            return any(value in match.any for value in values)
+        if isinstance(match, MatchText):
+            return any(
+                isinstance(value, str) and match.text in value for value in values
+            )
+
+        raise ValueError(f"Unsupported match condition: {match}")
+    if condition.range is not None:
+        bounds = condition.range
+
+        return any(
+            isinstance(value, (int, float))
+            and (bounds.gt is None or value > bounds.gt)
+            and (bounds.gte is None or value >= bounds.gte)
+            and (bounds.lt is None or value < bounds.lt)
+            and (bounds.lte is None or value <= bounds.lte)
+            for value in values
+        )
+
+    raise ValueError(f"Unsupported filter condition: {condition}")
@@ -0,0 +1,15 @@
+import pytest
+
+from streaming_pipeline.metrics import MetricsRegistry
+
+
+@pytest.fixture
+def registry() -> MetricsRegistry:
+    """
+    Returns the process-wide metrics registry, emptied before & after the test.
+    """
+
+    registry = MetricsRegistry()
+    registry.reset()
+    yield registry
+    registry.reset()
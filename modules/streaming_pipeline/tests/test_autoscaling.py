@@ -0,0 +1,152 @@
+import json
+
+import pytest
+
+from streaming_pipeline.autoscaling import AutoscalingAdvisor
+
+
+def build_advisor(registry, **kwargs) -> AutoscalingAdvisor:
+    kwargs = {
+        "current_workers": 2,
+        "interval_seconds": 10.0,
+        "window_seconds": 10.0,
+        "target_utilization": 0.5,
+        "max_backlog_age_seconds": 30.0,
+        "min_workers": 1,
+        "max_workers": 16,
+        "scale_up_intervals": 2,
+        "scale_down_intervals": 3,
+        "registry": registry,
+        **kwargs,
+    }
+
+    return AutoscalingAdvisor(**kwargs)
+
+
+def simulate_interval(
+    registry, received: int, written: int, busy_seconds: float
+) -> None:
+    registry.increment("articles_received", received)
+    registry.increment("documents_written", written)
+    registry.observe_stage("embed", busy_seconds)
+
+
+def test_first_step_has_no_signal(registry):
+    advisor = build_advisor(registry)
+
+    assert advisor.step(now=0.0) is None
+
+
+def test_recommendation_serves_arrival_rate_at_target_utilization(registry):
+    advisor = build_advisor(registry)
+    advisor.step(now=0.0)
+
+    # 100 articles in 10s, each worker processing 10 articles per busy second.
+    simulate_interval(registry, received=100, written=100, busy_seconds=10.0)
+    signal = advisor.step(now=10.0)
+
+    assert signal["arrival_rate"] == pytest.approx(10.0)
+    assert signal["processing_rate"] == pytest.approx(10.0)
+    assert signal["utilization"] == pytest.approx(0.5)
+    assert signal["backlog_age_seconds"] == 0.0
+    # ceil(10 / (10 * 0.5))
+    assert signal["recommended_workers"] == 2
+    assert signal["event"] == "steady"
+
+
+def test_recommendation_drains_old_backlog(registry):
+    advisor = build_advisor(registry)
+    advisor.step(now=0.0)
+
+    simulate_interval(registry, received=100, written=100, busy_seconds=10.0)
+    registry.set_gauge("in_flight_articles", 600)
+    signal = advisor.step(now=10.0)
+
+    # Little's law: 600 in-flight articles / 10 articles per second.
+    assert signal["backlog_age_seconds"] == pytest.approx(60.0)
+    # ceil((10 + 600 / 30) / (10 * 0.5))
+    assert signal["recommended_workers"] == 6
+
+
+def test_unbounded_backlog_adds_a_worker(registry):
+    advisor = build_advisor(registry)
+    advisor.step(now=0.0)
+
+    simulate_interval(registry, received=100, written=0, busy_seconds=0.0)
+    registry.set_gauge("in_flight_articles", 100)
+    signal = advisor.step(now=10.0)
+
+    assert signal["backlog_age_seconds"] is None
+    assert signal["recommended_workers"] == 3
+
+
+def test_recommendation_is_clipped(registry):
+    advisor = build_advisor(registry, max_workers=4)
+    advisor.step(now=0.0)
+
+    simulate_interval(registry, received=1000, written=100, busy_seconds=10.0)
+
+    assert advisor.step(now=10.0)["recommended_workers"] == 4
+
+
+def test_time_scale_divides_the_rates(registry):
+    advisor = build_advisor(registry, time_scale=10.0)
+    advisor.step(now=0.0)
+
+    simulate_interval(registry, received=100, written=100, busy_seconds=1.0)
+    signal = advisor.step(now=1.0)
+
+    assert signal["arrival_rate"] == pytest.approx(10.0)
+    assert signal["elapsed_seconds"] == pytest.approx(10.0)
+    # ceil(10 / (100 * 0.5))
+    assert signal["recommended_workers"] == 1
+
+
+def test_scale_events_require_consecutive_intervals(registry):
+    advisor = build_advisor(registry)
+    now = 0.0
+    advisor.step(now=now)
+
+    events = []
+    # A burst of 4 intervals at 3x the volume, followed by 4 intervals at a third of it.
+    for received in [300] * 4 + [40] * 4:
+        simulate_interval(
+            registry, received=received, written=received, busy_seconds=received / 10
+        )
+        now += 10.0
+        events.append(advisor.step(now=now)["event"])
+
+    assert events == [
+        "steady",
+        "scale_up",
+        "scale_up",
+        "scale_up",
+        "steady",
+        "steady",
+        "scale_down",
+        "scale_down",
+    ]
+    assert registry.get_counter("autoscaling_events", {"event": "scale_up"}) == 3
+    assert registry.get_counter("autoscaling_events", {"event": "scale_down"}) == 2
+
+
+def test_signal_is_written_per_process(registry, tmp_path, monkeypatch):
+    monkeypatch.setattr("os.getpid", lambda: 1234)
+    advisor = build_advisor(
+        registry,
+        output_file_path=tmp_path / "autoscaling_{pid}.json",
+        history_file_path=tmp_path / "history_{pid}.jsonl",
+    )
+    advisor.step(now=0.0)
+    for now in (10.0, 20.0):
+        simulate_interval(registry, received=100, written=0, busy_seconds=0.0)
+        registry.set_gauge("in_flight_articles", 100)
+        advisor.step(now=now)
+
+    signal = json.loads((tmp_path / "autoscaling_1234.json").read_text())
+    history = (tmp_path / "history_1234.jsonl").read_text().splitlines()
+
+    assert signal["backlog_age_seconds"] is None
+    assert signal["event"] == "scale_up"
+    assert [json.loads(line) for line in history][-1] == signal
+    assert len(history) == 2
@@ -0,0 +1,99 @@
+import random
+
+from streaming_pipeline.dedup import MinHashLSHIndex
+
+VOCABULARY = [f"word{i}" for i in range(5000)]
+
+
+def random_text(rng: random.Random, n_words: int = 120) -> list:
+    return [rng.choice(VOCABULARY) for _ in range(n_words)]
+
+
+def edit(rng: random.Random, words: list, n_edits: int) -> list:
+    words = list(words)
+    for position in rng.sample(range(len(words)), n_edits):
+        words[position] = rng.choice(VOCABULARY)
+
+    return words
+
+
+def jaccard(words_a: list, words_b: list, shingle_size: int = 5) -> float:
+    shingles_a = {
+        tuple(words_a[i : i + shingle_size])
+        for i in range(len(words_a) - shingle_size + 1)
+    }
+    shingles_b = {
+        tuple(words_b[i : i + shingle_size])
+        for i in range(len(words_b) - shingle_size + 1)
+    }
+
+    return len(shingles_a & shingles_b) / len(shingles_a | shingles_b)
+
+
+def test_near_duplicates_are_recalled():
+    rng = random.Random(0)
+    index = MinHashLSHIndex(threshold=0.8)
+
+    n_pairs, n_found = 0, 0
+    for i in range(300):
+        words = random_text(rng)
+        index.query_and_insert(f"original-{i}", " ".join(words))
+
+        near_duplicate = edit(rng, words, n_edits=rng.randint(0, 2))
+        if jaccard(words, near_duplicate) < 0.9:
+            continue
+
+        n_pairs += 1
+        key, similarity = index.query_and_insert(
+            f"duplicate-{i}", " ".join(near_duplicate)
+        )
+        if key == f"original-{i}":
+            n_found += 1
+
+    assert n_pairs > 100
+    assert n_found / n_pairs >= 0.95
+
+
+def test_distinct_texts_are_not_matched():
+    rng = random.Random(1)
+    index = MinHashLSHIndex(threshold=0.8)
+
+    for i in range(300):
+        # Texts sharing about half of their shingles are not near-duplicates.
+        words = random_text(rng)
+        index.query_and_insert(f"original-{i}", " ".join(words))
+        key, _ = index.query_and_insert(
+            f"other-{i}", " ".join(words[:60] + random_text(rng, 60))
+        )
+
+        assert key is None
+
+
+def test_same_key_is_never_matched():
+    index = MinHashLSHIndex()
+    text = " ".join(random_text(random.Random(2)))
+
+    assert index.query_and_insert("article", text) == (None, 0.0)
+    assert index.query_and_insert("article", text) == (None, 0.0)
+    assert index.query_and_insert("revision", text)[0] == "article"
+    assert len(index) == 2
+
+
+def test_short_texts_are_not_indexed():
+    index = MinHashLSHIndex(shingle_size=5)
+
+    assert index.query_and_insert("a", "See the full story here.") == (None, 0.0)
+    assert index.query_and_insert("b", "See the full story here.") == (None, 0.0)
+    assert len(index) == 0
+
+
+def test_oldest_entries_are_evicted():
+    rng = random.Random(3)
+    index = MinHashLSHIndex(max_entries=10)
+    texts = [" ".join(random_text(rng)) for _ in range(20)]
+    for i, text in enumerate(texts):
+        index.query_and_insert(f"original-{i}", text)
+
+    assert len(index) == 10
+    assert index.query_and_insert("duplicate-0", texts[0])[0] is None
+    assert index.query_and_insert("duplicate-19", texts[19])[0] == "original-19"
@@ -0,0 +1,112 @@
+import json
+
+import pytest
+
+from streaming_pipeline.file_input import NewsFileInput
+
+
+def write_jsonl(file_path, n_records: int) -> list:
+    """
+    Writes articles of various lengths, with multi-byte characters and blank lines, to a JSONL file.
+    """
+
+    records = [
+        {
+            "id": i,
+            "headline": f"Headline {i} " + "é€" * (i % 7),
+            "summary": "x" * (i * 37 % 101),
+            "created_at": "2023-09-01T12:00:00Z",
+        }
+        for i in range(n_records)
+    ]
+    with open(file_path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            if record["id"] % 10 == 0:
+                f.write("\n")
+
+    return records
+
+
+def read_part(news_input: NewsFileInput, part: str, resume_state=None) -> list:
+    source = news_input.build_part(part, resume_state)
+    articles = []
+    try:
+        while True:
+            articles.extend(source.next())
+    except StopIteration:
+        pass
+    source.close()
+
+    return articles
+
+
+def sorted_parts(news_input: NewsFileInput) -> list:
+    return sorted(
+        news_input.list_parts(),
+        key=lambda part: int(part.rsplit("::")[1].split("-")[0]),
+    )
+
+
+@pytest.mark.parametrize("byte_range_bytes", [1, 7, 64, 1000, 1 << 20])
+def test_byte_ranges_read_every_line_once(tmp_path, byte_range_bytes):
+    file_path = tmp_path / "news.jsonl"
+    records = write_jsonl(file_path, 200)
+    news_input = NewsFileInput(file_path, byte_range_bytes=byte_range_bytes)
+
+    articles = [
+        article
+        for part in sorted_parts(news_input)
+        for article in read_part(news_input, part)
+    ]
+
+    assert [article["id"] for article in articles] == [
+        record["id"] for record in records
+    ]
+    assert [article["headline"] for article in articles] == [
+        record["headline"] for record in records
+    ]
+
+
+def test_byte_ranges_cover_the_file(tmp_path):
+    file_path = tmp_path / "news.jsonl"
+    write_jsonl(file_path, 50)
+    news_input = NewsFileInput(file_path, byte_range_bytes=100)
+
+    ranges = [
+        tuple(int(offset) for offset in part.rsplit("::")[1].split("-"))
+        for part in sorted_parts(news_input)
+    ]
+
+    assert ranges[0][0] == 0
+    assert ranges[-1][1] == file_path.stat().st_size
+    assert all(end == start for (_, end), (start, _) in zip(ranges, ranges[1:]))
+
+
+def test_byte_range_resumes_after_last_emitted_article(tmp_path):
+    file_path = tmp_path / "news.jsonl"
+    records = write_jsonl(file_path, 100)
+    news_input = NewsFileInput(file_path, byte_range_bytes=2000, batch_size=3)
+
+    for part in sorted_parts(news_input):
+        source = news_input.build_part(part, None)
+        first_batch = source.next()
+        resume_state = source.snapshot()
+        source.close()
+
+        assert first_batch + read_part(news_input, part, resume_state) == read_part(
+            news_input, part
+        )
+
+    assert sum(
+        len(read_part(news_input, part)) for part in news_input.list_parts()
+    ) == len(records)
+
+
+def test_empty_file_has_a_single_empty_range(tmp_path):
+    file_path = tmp_path / "news.jsonl"
+    file_path.touch()
+    news_input = NewsFileInput(file_path, byte_range_bytes=10)
+
+    assert news_input.list_parts() == {f"{file_path}::0-0"}
+    assert read_part(news_input, f"{file_path}::0-0") == []
@@ -0,0 +1,159 @@
+import struct
+import zlib
+
+import pytest
+
+from streaming_pipeline.segment_log import (
+    SegmentLogReader,
+    SegmentLogSource,
+    SegmentLogWriter,
+    list_segments,
+)
+
+
+def append_records(dir_path, records, **kwargs) -> list:
+    writer = SegmentLogWriter(dir_path, **kwargs)
+    offsets = [writer.append(record) for record in records]
+    writer.close()
+
+    return offsets
+
+
+def read_all(reader: SegmentLogReader) -> list:
+    records = []
+    while (record := reader.read()) is not None:
+        records.append(record)
+
+    return records
+
+
+def last_segment_path(dir_path):
+    return sorted(dir_path.glob("*.log"))[-1]
+
+
+def test_reader_reads_records_across_segments(tmp_path):
+    records = [{"id": i, "headline": f"Headline {i}"} for i in range(100)]
+    offsets = append_records(tmp_path, records, segment_max_bytes=256)
+
+    reader = SegmentLogReader(tmp_path)
+
+    assert len(list_segments(tmp_path)) > 1
+    assert read_all(reader) == list(zip(offsets, records))
+    assert reader.offset == reader.end_offset()
+
+
+def test_reader_resumes_from_committed_offset(tmp_path):
+    records = [{"id": i} for i in range(50)]
+    append_records(tmp_path, records, segment_max_bytes=128)
+
+    reader = SegmentLogReader(tmp_path)
+    first_records = [reader.read()[1] for _ in range(20)]
+    committed_offset = reader.offset
+    reader.close()
+
+    resumed_reader = SegmentLogReader(tmp_path, offset=committed_offset)
+
+    assert first_records + [record for _, record in read_all(resumed_reader)] == records
+
+
+def test_reader_follows_appended_records(tmp_path):
+    writer = SegmentLogWriter(tmp_path, segment_max_bytes=64)
+    reader = SegmentLogReader(tmp_path)
+
+    assert reader.read() is None
+
+    for i in range(10):
+        offset = writer.append({"id": i})
+
+        assert reader.read() == (offset, {"id": i})
+        assert reader.read() is None
+    writer.close()
+
+
+def test_source_snapshot_resumes_after_last_emitted_record(tmp_path):
+    records = [{"id": i} for i in range(25)]
+    append_records(tmp_path, records)
+
+    source = SegmentLogSource(
+        SegmentLogReader(tmp_path),
+        partition="partition-000",
+        follow=False,
+        batch_size=10,
+    )
+    first_batch = source.next()
+    resume_state = source.snapshot()
+    source.close()
+
+    source = SegmentLogSource(
+        SegmentLogReader(tmp_path, offset=resume_state),
+        partition="partition-000",
+        follow=False,
+        batch_size=10,
+    )
+    next_batches = source.next() + source.next()
+
+    assert first_batch + next_batches == records
+    with pytest.raises(StopIteration):
+        source.next()
+
+
+@pytest.mark.parametrize(
+    "torn_bytes",
+    [
+        # A partial header.
+        b"\x00\x00",
+        # A header without its data.
+        struct.pack(">II", 100, zlib.crc32(b"x" * 100)),
+        # A partial record.
+        struct.pack(">II", 100, zlib.crc32(b"x" * 100)) + b"x" * 50,
+        # A complete record with a wrong checksum.
+        struct.pack(">II", 4, 0) + b"null",
+    ],
+)
+def test_writer_drops_torn_record_on_restart(tmp_path, torn_bytes):
+    records = [{"id": i} for i in range(10)]
+    offsets = append_records(tmp_path, records)
+    with open(last_segment_path(tmp_path), "ab") as f:
+        f.write(torn_bytes)
+
+    writer = SegmentLogWriter(tmp_path)
+    offset = writer.append({"id": 10})
+    writer.close()
+
+    assert read_all(SegmentLogReader(tmp_path)) == [
+        *zip(offsets, records),
+        (offset, {"id": 10}),
+    ]
+
+
+def test_reader_waits_for_partially_written_record(tmp_path):
+    append_records(tmp_path, [{"id": 0}])
+    data = b'{"id": 1}'
+    segment_path = last_segment_path(tmp_path)
+
+    reader = SegmentLogReader(tmp_path)
+    reader.read()
+    with open(segment_path, "ab") as f:
+        f.write(struct.pack(">II", len(data), zlib.crc32(data)) + data[:4])
+        f.flush()
+
+        assert reader.read() is None
+
+        f.write(data[4:])
+        f.flush()
+
+        assert reader.read()[1] == {"id": 1}
+
+
+def test_reader_rejects_corrupted_record(tmp_path):
+    append_records(tmp_path, [{"id": 0}, {"id": 1}])
+    segment_path = last_segment_path(tmp_path)
+    content = bytearray(segment_path.read_bytes())
+    content[-2] ^= 0xFF
+    segment_path.write_bytes(bytes(content))
+
+    reader = SegmentLogReader(tmp_path)
+    reader.read()
+
+    with pytest.raises(ValueError, match="Corrupted record"):
+        reader.read()
@@ -0,0 +1,207 @@
+import numpy as np
+import pytest
+from qdrant_client.http.models import (
+    Distance,
+    FieldCondition,
+    Filter,
+    HasIdCondition,
+    MatchAny,
+    MatchText,
+    MatchValue,
+    PayloadSchemaType,
+    PointStruct,
+    Range,
+)
+
+from streaming_pipeline.vector_store import LocalVectorStore
+
+VECTOR_SIZE = 16
+PAYLOAD_INDEXES = {
+    "document_id": PayloadSchemaType.KEYWORD,
+    "created_at_timestamp": PayloadSchemaType.INTEGER,
+    "symbols": PayloadSchemaType.KEYWORD,
+}
+FILTERS = [
+    Filter(must=[FieldCondition(key="document_id", match=MatchValue(value="d7"))]),
+    Filter(
+        should=[
+            FieldCondition(key="created_at_timestamp", range=Range(gte=900)),
+            FieldCondition(key="symbols", match=MatchAny(any=["AAPL"])),
+        ],
+        must_not=[FieldCondition(key="source", match=MatchValue(value="benzinga"))],
+    ),
+    Filter(
+        must=[
+            FieldCondition(key="created_at_timestamp", range=Range(gt=100, lte=500)),
+            Filter(must=[HasIdCondition(has_id=list(range(0, 3000, 3)))]),
+        ]
+    ),
+    Filter(must=[FieldCondition(key="headline", match=MatchText(text="7"))]),
+]
+
+
+def build_points(n_points: int, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(n_points, VECTOR_SIZE)).astype(np.float32)
+
+    return [
+        PointStruct(
+            id=i,
+            vector=vectors[i].tolist(),
+            payload={
+                "document_id": f"d{i // 4}",
+                "created_at_timestamp": int(rng.integers(0, 1000)),
+                "symbols": ["AAPL", "TSLA", "NVDA"][i % 3 : i % 3 + 2],
+                "source": ["benzinga", "reuters"][i % 2],
+                "headline": f"Headline {i}",
+            },
+        )
+        for i in range(n_points)
+    ]
+
+
+def exact_top_k(
+    points: list, query: np.ndarray, distance: Distance, limit: int
+) -> list:
+    vectors = np.asarray([point.vector for point in points], dtype=np.float32)
+    if distance == Distance.COSINE:
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        scores = -(vectors @ (query / np.linalg.norm(query)))
+    elif distance == Distance.DOT:
+        scores = -(vectors @ query)
+    else:
+        scores = np.linalg.norm(vectors - query, axis=1)
+
+    return [points[i].id for i in np.argsort(scores, kind="stable")[:limit]]
+
+
+def scroll_all(store: LocalVectorStore, scroll_filter, limit: int) -> list:
+    ids, offset = [], None
+    while True:
+        records, offset = store.scroll(
+            "news", scroll_filter=scroll_filter, limit=limit, offset=offset
+        )
+        ids.extend(record.id for record in records)
+        if offset is None:
+            return ids
+
+
+@pytest.mark.parametrize("distance", [Distance.COSINE, Distance.DOT, Distance.EUCLID])
+@pytest.mark.parametrize("block_size", [7, 4096])
+def test_search_matches_exact_search(distance, block_size):
+    points = build_points(2000)
+    store = LocalVectorStore(block_size=block_size)
+    store.create_collection("news", vector_size=VECTOR_SIZE, distance=distance)
+    store.upsert("news", points)
+
+    rng = np.random.default_rng(1)
+    for _ in range(5):
+        query = rng.normal(size=VECTOR_SIZE).astype(np.float32)
+        hits = store.search("news", query_vector=query.tolist(), limit=10)
+
+        assert [hit.id for hit in hits] == exact_top_k(points, query, distance, 10)
+
+
+def test_filtered_search_matches_exact_search():
+    points = build_points(2000)
+    store = LocalVectorStore(block_size=100)
+    store.create_collection(
+        "news", vector_size=VECTOR_SIZE, payload_indexes=PAYLOAD_INDEXES
+    )
+    store.upsert("news", points)
+
+    query = np.random.default_rng(2).normal(size=VECTOR_SIZE).astype(np.float32)
+    hits = store.search(
+        "news", query_vector=query.tolist(), query_filter=FILTERS[1], limit=20
+    )
+    matching_points = [
+        point
+        for point in points
+        if point.payload["source"] != "benzinga"
+        and (
+            point.payload["created_at_timestamp"] >= 900
+            or "AAPL" in point.payload["symbols"]
+        )
+    ]
+
+    assert [hit.id for hit in hits] == exact_top_k(
+        matching_points, query, Distance.COSINE, 20
+    )
+
+
+@pytest.mark.parametrize("query_filter", FILTERS)
+def test_indexed_filters_match_unindexed_filters(query_filter):
+    points = build_points(3000)
+    indexed_store = LocalVectorStore()
+    indexed_store.create_collection(
+        "news", vector_size=VECTOR_SIZE, payload_indexes=PAYLOAD_INDEXES
+    )
+    store = LocalVectorStore()
+    store.create_collection("news", vector_size=VECTOR_SIZE)
+    for s in (indexed_store, store):
+        s.upsert("news", points)
+        s.delete("news", list(range(0, 3000, 5)))
+        s.set_payload("news", {"created_at_timestamp": 950}, list(range(1, 300, 2)))
+
+    expected_ids = scroll_all(store, query_filter, limit=3000)
+
+    assert len(expected_ids) > 0
+    assert scroll_all(indexed_store, query_filter, limit=37) == expected_ids
+    assert indexed_store.count("news", query_filter).count == len(expected_ids)
+
+
+def test_scroll_pages_through_all_points_once():
+    store = LocalVectorStore()
+    store.create_collection("news", vector_size=VECTOR_SIZE)
+    store.upsert("news", build_points(2500))
+    store.delete("news", list(range(2400, 2500)))
+
+    assert scroll_all(store, None, limit=100) == list(range(2400))
+
+
+def test_collection_persists_deletes_across_reopens(tmp_path):
+    points = build_points(1500)
+    store = LocalVectorStore(tmp_path, block_size=64)
+    store.create_collection(
+        "news", vector_size=VECTOR_SIZE, payload_indexes=PAYLOAD_INDEXES
+    )
+    store.upsert("news", points[:1000])
+    store.delete("news", list(range(0, 1000, 2)))
+    store.set_payload("news", {"source": "updated"}, [1, 3])
+    query = points[1].vector
+    hits = store.search("news", query_vector=query, limit=10)
+    store.close()
+
+    store = LocalVectorStore(tmp_path, block_size=64)
+
+    assert store.list_collections() == ["news"]
+    assert store.count("news").count == 500
+    assert store.retrieve("news", ids=[0, 1, 2]) == store.retrieve("news", ids=[1])
+    assert store.retrieve("news", ids=[3])[0].payload["source"] == "updated"
+    assert store.search("news", query_vector=query, limit=10) == hits
+    assert scroll_all(store, FILTERS[0], limit=10) == [29, 31]
+
+    # The matrix grows beyond its initial capacity after a reopen.
+    store.upsert("news", points[1000:])
+    store.close()
+    store = LocalVectorStore(tmp_path)
+
+    assert store.count("news").count == 1000
+    assert store.retrieve("news", ids=[1499], with_vectors=True)[0].vector == (
+        pytest.approx(
+            (np.asarray(points[1499].vector) / np.linalg.norm(points[1499].vector))
+            .astype(np.float32)
+            .tolist()
+        )
+    )
+
+
+def test_delete_collection_removes_its_files(tmp_path):
+    store = LocalVectorStore(tmp_path)
+    store.create_collection("news", vector_size=VECTOR_SIZE)
+    store.upsert("news", build_points(10))
+    store.delete_collection("news")
+
+    assert store.list_collections() == []
+    assert not (tmp_path / "news").exists()
+    assert LocalVectorStore(tmp_path).list_collections() == []
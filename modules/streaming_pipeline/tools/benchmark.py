@@ -0,0 +1,153 @@
+import datetime
+import json
+import logging
+import resource
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+from bytewax.testing import cluster_main, run_main
+from fire import Fire
+
+from streaming_pipeline import initialize
+from streaming_pipeline.flow import build as flow_builder
+from streaming_pipeline.metrics import MetricsRegistry
+from streaming_pipeline.mocked import generate_financial_news
+from streaming_pipeline.replay import NewsRecorder
+
+logger = logging.getLogger(__name__)
+
+
+def benchmark(
+    n_articles: int = 2000,
+    replay_file_path: Optional[str] = None,
+    worker_count: int = 1,
+    output_file_path: str = "benchmark_results.json",
+    model_cache_dir: Optional[str] = None,
+    seed: int = 42,
+    logging_config_path: str = "logging.yaml",
+):
+    """
+    Benchmarks the streaming pipeline end-to-end using an in-memory vector DB.
+
+    It reports the documents & chunks throughput, the time share of every stage of the flow
+    and the peak RSS memory of the process.
+
+    Args:
+        n_articles (int): The number of synthetic articles to process. Ignored if replay_file_path is provided.
+        replay_file_path (Optional[str]): If provided, the recording is replayed as fast as possible
+            instead of using synthetic articles.
+        worker_count (int): The number of Bytewax workers (threads) to run the flow with.
+        output_file_path (str): The path of the JSON file the results are written to.
+        model_cache_dir (Optional[str]): Path to the directory where the model cache is stored.
+        seed (int): The seed used to generate the synthetic articles.
+        logging_config_path (str): Path to the logging configuration file.
+
+    Returns:
+        None
+    """
+
+    initialize(logging_config_path=logging_config_path)
+
+    config = {
+        "n_articles": n_articles if replay_file_path is None else None,
+        "replay_file_path": replay_file_path,
+        "worker_count": worker_count,
+        "seed": seed,
+    }
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if replay_file_path is None:
+            replay_file_path = Path(tmp_dir) / "synthetic_news.jsonl.gz"
+            with NewsRecorder(replay_file_path) as recorder:
+                for article in generate_financial_news(n_articles, seed=seed):
+                    recorder.record([article])
+
+        flow = flow_builder(
+            replay_file_path=replay_file_path,
+            replay_speed=None,
+            model_cache_dir=model_cache_dir,
+            in_memory=True,
+            # The synthetic articles are historical, hence their freshness is meaningless.
+            freshness_alert_threshold_seconds=None,
+        )
+
+        metrics = MetricsRegistry()
+        metrics.reset()
+
+        logger.info(f"Running the benchmark with {worker_count} worker(s)...")
+        started_at = time.perf_counter()
+        if worker_count == 1:
+            run_main(flow)
+        else:
+            cluster_main(
+                flow, addresses=[], proc_id=0, worker_count_per_proc=worker_count
+            )
+        elapsed_seconds = time.perf_counter() - started_at
+
+    results = _build_results(
+        metrics=metrics,
+        elapsed_seconds=elapsed_seconds,
+        config=config,
+    )
+    logger.info(json.dumps(results, indent=2))
+
+    output_file_path = Path(output_file_path)
+    output_file_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_file_path, "w") as f:
+        json.dump(results, f, indent=2)
+    logger.info(f"Benchmark results written to {output_file_path}.")
+
+
+def _build_results(
+    metrics: MetricsRegistry, elapsed_seconds: float, config: dict
+) -> dict:
+    stages = metrics.stages()
+    counters = metrics.counters()
+
+    total_stage_seconds = sum(stats["total_seconds"] for stats in stages.values())
+    n_documents = counters.get("documents_written", 0)
+    n_chunks = counters.get("chunks_written", 0)
+
+    return {
+        "commit": _get_git_commit(),
+        "timestamp": datetime.datetime.utcnow().isoformat(),
+        "config": config,
+        "elapsed_seconds": elapsed_seconds,
+        "documents": n_documents,
+        "chunks": n_chunks,
+        "documents_per_second": n_documents / elapsed_seconds,
+        "chunks_per_second": n_chunks / elapsed_seconds,
+        "stages": {
+            stage: {
+                **stats,
+                "mean_milliseconds": 1000 * stats["total_seconds"] / stats["count"]
+                if stats["count"] > 0
+                else 0.0,
+                "time_share": stats["total_seconds"] / total_stage_seconds
+                if total_stage_seconds > 0
+                else 0.0,
+            }
+            for stage, stats in stages.items()
+        },
+        # On Linux, ru_maxrss is expressed in kilobytes.
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def _get_git_commit() -> Optional[str]:
+    try:
+        return (
+            subprocess.check_output(
+                ["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL
+            )
+            .decode()
+            .strip()
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == "__main__":
+    Fire(benchmark)
@@ -0,0 +1,344 @@
+import datetime
+import json
+import logging
+import time
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+import numpy as np
+from fire import Fire
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import CollectionStatus, Distance, PointStruct
+
+from streaming_pipeline import initialize
+from streaming_pipeline.collection import CollectionSpec
+from streaming_pipeline.snapshot import load_vectors
+from streaming_pipeline.vector_store import LocalVectorStore, VectorStore
+
+logger = logging.getLogger(__name__)
+
+# Index even small corpora with HNSW, otherwise Qdrant searches them exhaustively.
+_BASE_SPEC = {"indexing_threshold_kb": 1, "memmap_threshold_kb": None}
+
+DEFAULT_CONFIGS = [
+    {"name": "local_exact", "backend": "local"},
+    {"name": "qdrant_exact", "backend": "qdrant", "exact": True},
+    {
+        "name": "qdrant_m16_ef64",
+        "backend": "qdrant",
+        "spec": {"hnsw_m": 16, "search_hnsw_ef": 64, "quantization": False},
+    },
+    {
+        "name": "qdrant_m16_ef128",
+        "backend": "qdrant",
+        "spec": {"hnsw_m": 16, "search_hnsw_ef": 128, "quantization": False},
+    },
+    {
+        "name": "qdrant_m16_ef128_int8",
+        "backend": "qdrant",
+        "spec": {"hnsw_m": 16, "search_hnsw_ef": 128, "quantization": True},
+    },
+    {
+        "name": "qdrant_m32_ef256",
+        "backend": "qdrant",
+        "spec": {"hnsw_m": 32, "search_hnsw_ef": 256, "quantization": False},
+    },
+]
+
+
+def benchmark_retrieval(
+    snapshot_file_path: str,
+    configs_file_path: Optional[str] = None,
+    top_k: Sequence[int] = (1, 5, 10),
+    n_queries: int = 200,
+    qdrant_url: Optional[str] = None,
+    qdrant_api_key: Optional[str] = None,
+    output_file_path: str = "benchmarks/retrieval.json",
+    batch_size: int = 1024,
+    seed: int = 42,
+    env_file_path: str = ".env",
+    logging_config_path: str = "logging.yaml",
+):
+    """
+    Benchmarks the recall & latency of the retrieval for multiple index configurations over a corpus snapshot.
+
+    The queries are embeddings held out from the snapshot, while the rest of it is indexed by every
+    configuration. The ground truth is computed with an exact NumPy search. For every configuration & top-k,
+    it reports the recall@k (the share of the exact top-k that is retrieved) and the p50 & p99 latency
+    of the queries, sent one by one.
+
+    A configuration is a JSON object with:
+    * name: the name reported in the table;
+    * backend: "local" (the exact LocalVectorStore), "qdrant_memory" (the in-memory Qdrant client, which
+      ignores the index settings) or "qdrant" (the Qdrant server at qdrant_url);
+    * spec: the CollectionSpec fields to override, e.g., {"hnsw_m": 32, "search_hnsw_ef": 256};
+    * exact: whether to search without the HNSW index.
+
+    Args:
+        snapshot_file_path (str): A snapshot written by `tools.snapshot export`.
+        configs_file_path (Optional[str]): A JSON file with a list of configurations. Defaults to DEFAULT_CONFIGS.
+        top_k (Sequence[int]): The numbers of retrieved points to measure.
+        n_queries (int): The number of embeddings held out as queries.
+        qdrant_url (Optional[str]): The URL of the Qdrant server to benchmark. Its benchmark collections are
+            created & deleted, hence use a local or staging server. If None, the "qdrant" configurations are skipped.
+        qdrant_api_key (Optional[str]): The API key of the Qdrant server.
+        output_file_path (str): The path of the JSON file the results are written to.
+        batch_size (int): The number of points uploaded at once.
+        seed (int): The seed used to sample the queries.
+        env_file_path (str): Path to the environment file.
+        logging_config_path (str): Path to the logging configuration file.
+
+    Returns:
+        None
+    """
+
+    initialize(logging_config_path=logging_config_path, env_file_path=env_file_path)
+
+    vectors, metadata = load_vectors(snapshot_file_path)
+    distance = Distance(metadata["distance"])
+    top_k = sorted(int(k) for k in top_k)
+
+    rng = np.random.default_rng(seed)
+    is_query = np.zeros(len(vectors), dtype=bool)
+    is_query[
+        rng.choice(len(vectors), size=min(n_queries, len(vectors) // 2), replace=False)
+    ] = True
+    corpus, queries = vectors[~is_query], vectors[is_query]
+    logger.info(
+        f"Benchmarking {len(queries)} queries against {len(corpus)} embeddings of size {corpus.shape[1]}."
+    )
+
+    started_at = time.perf_counter()
+    ground_truth = exact_top_k(corpus, queries, k=top_k[-1], distance=distance)
+    logger.info(
+        f"Computed the ground truth in {time.perf_counter() - started_at:.1f}s."
+    )
+
+    configs = DEFAULT_CONFIGS
+    if configs_file_path is not None:
+        configs = json.loads(Path(configs_file_path).read_text())
+
+    results = []
+    for config in configs:
+        store = _build_store(config["backend"], qdrant_url, qdrant_api_key)
+        if store is None:
+            logger.warning(f"Skipping {config['name']}, as no qdrant_url is provided.")
+            continue
+
+        spec = CollectionSpec(
+            collection_name=f"retrieval_benchmark__{config['name']}",
+            vector_size=corpus.shape[1],
+            distance=distance,
+            **{**_BASE_SPEC, **config.get("spec", {})},
+        )
+        try:
+            indexing_seconds = _index(store, spec, corpus, batch_size=batch_size)
+            for k in top_k:
+                results.append(
+                    {
+                        "name": config["name"],
+                        "k": k,
+                        "indexing_seconds": indexing_seconds,
+                        **_measure(
+                            store,
+                            spec,
+                            queries,
+                            ground_truth[:, :k],
+                            exact=config.get("exact", False),
+                        ),
+                    }
+                )
+                logger.info(_format_row(results[-1]))
+        finally:
+            store.delete_collection(collection_name=spec.collection_name)
+
+    logger.info(f"\n{format_table(results)}")
+
+    output_file_path = Path(output_file_path)
+    output_file_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_file_path, "w") as f:
+        json.dump(
+            {
+                "timestamp": datetime.datetime.utcnow().isoformat(),
+                "snapshot_file_path": snapshot_file_path,
+                "n_points": len(corpus),
+                "n_queries": len(queries),
+                "vector_size": corpus.shape[1],
+                "distance": distance.value,
+                "configs": configs,
+                "results": results,
+            },
+            f,
+            indent=2,
+        )
+    logger.info(f"Retrieval benchmark results written to {output_file_path}.")
+
+
+def exact_top_k(
+    corpus: np.ndarray,
+    queries: np.ndarray,
+    k: int,
+    distance: Distance,
+    block_size: int = 65536,
+) -> np.ndarray:
+    """
+    Computes the exact top-k rows of the corpus for every query, in blocks of rows to bound the memory.
+
+    Args:
+        corpus (np.ndarray): The (n_points, vector_size) embeddings.
+        queries (np.ndarray): The (n_queries, vector_size) embeddings.
+        k (int): The number of rows to retrieve.
+        distance (Distance): The distance between the embeddings.
+        block_size (int): The number of rows scored at once.
+
+    Returns:
+        np.ndarray: The (n_queries, k) indices of the closest rows, sorted from the closest.
+    """
+
+    if distance == Distance.COSINE:
+        corpus = corpus / np.maximum(
+            np.linalg.norm(corpus, axis=1, keepdims=True), 1e-12
+        )
+        queries = queries / np.maximum(
+            np.linalg.norm(queries, axis=1, keepdims=True), 1e-12
+        )
+
+    best_rows = np.empty((len(queries), 0), dtype=np.int64)
+    best_scores = np.empty((len(queries), 0), dtype=np.float32)
+    for start in range(0, len(corpus), block_size):
+        block = corpus[start : start + block_size]
+        if distance == Distance.EUCLID:
+            # The closest rows have the highest negative squared distance, up to the norm of the query.
+            scores = 2 * queries @ block.T - np.einsum("ij,ij->i", block, block)
+        else:
+            scores = queries @ block.T
+
+        rows = np.broadcast_to(np.arange(start, start + len(block)), scores.shape)
+        best_rows = np.concatenate([best_rows, rows], axis=1)
+        best_scores = np.concatenate([best_scores, scores], axis=1)
+        if best_scores.shape[1] > k:
+            top = np.argpartition(-best_scores, k - 1, axis=1)[:, :k]
+            best_rows = np.take_along_axis(best_rows, top, axis=1)
+            best_scores = np.take_along_axis(best_scores, top, axis=1)
+
+    order = np.argsort(-best_scores, axis=1, kind="stable")
+
+    return np.take_along_axis(best_rows, order, axis=1)
+
+
+def format_table(results: List[dict]) -> str:
+    """
+    Formats the results as a Markdown table.
+    """
+
+    lines = [
+        "| config | k | recall@k | p50 (ms) | p99 (ms) | queries/s | indexing (s) |",
+        "|---|---|---|---|---|---|---|",
+    ]
+    for result in results:
+        lines.append(
+            f"| {result['name']} | {result['k']} | {result['recall']:.4f} "
+            f"| {result['p50_milliseconds']:.2f} | {result['p99_milliseconds']:.2f} "
+            f"| {result['queries_per_second']:.1f} | {result['indexing_seconds']:.1f} |"
+        )
+
+    return "\n".join(lines)
+
+
+def _build_store(
+    backend: str, qdrant_url: Optional[str], qdrant_api_key: Optional[str]
+) -> Optional[VectorStore]:
+    if backend == "local":
+        return LocalVectorStore()
+    if backend == "qdrant_memory":
+        return QdrantClient(":memory:")
+    if backend == "qdrant":
+        if qdrant_url is None:
+            return None
+
+        return QdrantClient(url=qdrant_url, api_key=qdrant_api_key)
+
+    raise ValueError(f"Unknown backend: {backend}")
+
+
+def _index(
+    store: VectorStore, spec: CollectionSpec, corpus: np.ndarray, batch_size: int
+) -> float:
+    started_at = time.perf_counter()
+    spec.apply(store)
+    for start in range(0, len(corpus), batch_size):
+        store.upsert(
+            collection_name=spec.collection_name,
+            points=[
+                PointStruct(id=start + offset, vector=vector.tolist(), payload={})
+                for offset, vector in enumerate(corpus[start : start + batch_size])
+            ],
+        )
+
+    if isinstance(store, QdrantClient):
+        # Wait for the optimizers to build the HNSW graph & the quantized embeddings.
+        while (
+            store.get_collection(collection_name=spec.collection_name).status
+            != CollectionStatus.GREEN
+        ):
+            time.sleep(1.0)
+
+    return time.perf_counter() - started_at
+
+
+def _measure(
+    store: VectorStore,
+    spec: CollectionSpec,
+    queries: np.ndarray,
+    ground_truth: np.ndarray,
+    exact: bool,
+    n_warmup_queries: int = 10,
+) -> dict:
+    k = ground_truth.shape[1]
+    search_kwargs = {}
+    if isinstance(store, QdrantClient):
+        search_kwargs["search_params"] = spec.search_params(exact=exact)
+
+    for query in queries[:n_warmup_queries]:
+        store.search(
+            collection_name=spec.collection_name,
+            query_vector=query.tolist(),
+            limit=k,
+            with_payload=False,
+            **search_kwargs,
+        )
+
+    latencies = []
+    n_retrieved = 0
+    for query, expected_rows in zip(queries, ground_truth):
+        query_vector = query.tolist()
+        started_at = time.perf_counter()
+        hits = store.search(
+            collection_name=spec.collection_name,
+            query_vector=query_vector,
+            limit=k,
+            with_payload=False,
+            **search_kwargs,
+        )
+        latencies.append(time.perf_counter() - started_at)
+        n_retrieved += len(set(hit.id for hit in hits) & set(expected_rows.tolist()))
+
+    latencies = np.asarray(latencies)
+
+    return {
+        "recall": n_retrieved / ground_truth.size,
+        "p50_milliseconds": 1000 * float(np.percentile(latencies, 50)),
+        "p99_milliseconds": 1000 * float(np.percentile(latencies, 99)),
+        "queries_per_second": len(latencies) / float(latencies.sum()),
+    }
+
+
+def _format_row(result: dict) -> str:
+    return (
+        f"{result['name']} k={result['k']}: recall={result['recall']:.4f}, "
+        f"p50={result['p50_milliseconds']:.2f}ms, p99={result['p99_milliseconds']:.2f}ms"
+    )
+
+
+if __name__ == "__main__":
+    Fire(benchmark_retrieval)
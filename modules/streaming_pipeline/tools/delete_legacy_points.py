@@ -0,0 +1,37 @@
+import logging
+
+from fire import Fire
+
+from streaming_pipeline import constants, initialize
+from streaming_pipeline.qdrant import build_qdrant_client, delete_legacy_points
+
+logger = logging.getLogger(__name__)
+
+
+def delete(
+    collection_name: str = constants.VECTOR_DB_OUTPUT_COLLECTION_NAME,
+    env_file_path: str = ".env",
+    logging_config_path: str = "logging.yaml",
+):
+    """
+    Deletes the points indexed before the chunks were keyed by their article (without a "document_id" payload),
+    which the article updates can't find and would otherwise duplicate forever.
+
+    Args:
+        collection_name (str): The collection (or alias) to clean up.
+        env_file_path (str): Path to the environment file.
+        logging_config_path (str): Path to the logging configuration file.
+
+    Returns:
+        None
+    """
+
+    initialize(logging_config_path=logging_config_path, env_file_path=env_file_path)
+
+    n_points = delete_legacy_points(build_qdrant_client(), collection_name)
+
+    logger.info(f"Deleted {n_points} legacy points from {collection_name}.")
+
+
+if __name__ == "__main__":
+    Fire(delete)
@@ -0,0 +1,52 @@
+import logging
+
+from fire import Fire
+from transformers import AutoConfig
+
+from streaming_pipeline import constants, initialize
+from streaming_pipeline.collection import CollectionSpec, TimePartitionedCollections
+from streaming_pipeline.qdrant import build_qdrant_client
+
+logger = logging.getLogger(__name__)
+
+
+def drop_expired_buckets(
+    retention_days: float,
+    partition_granularity: str = "day",
+    env_file_path: str = ".env",
+    logging_config_path: str = "logging.yaml",
+):
+    """
+    Drops the daily or weekly collections of news that ended longer ago than the retention.
+
+    Args:
+        retention_days (float): The number of days the news are kept for.
+        partition_granularity (str): The granularity of the collections: "day" or "week".
+        env_file_path (str): Path to the environment file.
+        logging_config_path (str): Path to the logging configuration file.
+
+    Returns:
+        None
+    """
+
+    initialize(logging_config_path=logging_config_path, env_file_path=env_file_path)
+
+    partitions = TimePartitionedCollections(
+        build_qdrant_client(),
+        spec=CollectionSpec(
+            collection_name=constants.VECTOR_DB_OUTPUT_COLLECTION_NAME,
+            # Only the configuration of the model is loaded, as no embeddings are computed.
+            vector_size=AutoConfig.from_pretrained(
+                constants.EMBEDDING_MODEL_ID
+            ).hidden_size,
+        ),
+        granularity=partition_granularity,
+        retention_days=retention_days,
+    )
+    dropped_buckets = partitions.drop_expired()
+
+    logger.info(f"Dropped {len(dropped_buckets)} expired buckets: {dropped_buckets}")
+
+
+if __name__ == "__main__":
+    Fire(drop_expired_buckets)
@@ -0,0 +1,72 @@
+import datetime
+import logging
+import time
+from typing import Optional
+
+from fire import Fire
+
+from streaming_pipeline import alpaca_batch, alpaca_stream, initialize
+from streaming_pipeline.replay import NewsRecorder
+
+logger = logging.getLogger(__name__)
+
+
+def record(
+    output_file_path: str,
+    latest_n_days: Optional[int] = None,
+    duration_seconds: Optional[int] = None,
+    env_file_path: str = ".env",
+    logging_config_path: str = "logging.yaml",
+):
+    """
+    Records raw Alpaca news messages into a compressed JSONL file that can be replayed
+    by the streaming pipeline with `tools.run_replay`.
+
+    Args:
+        output_file_path (str): The path of the compressed JSONL recording (e.g. "data/news.jsonl.gz").
+        latest_n_days (Optional[int]): If provided, the news from the latest N days are recorded
+            using the RESTful API. Otherwise, the real-time news stream is recorded.
+        duration_seconds (Optional[int]): For how long to record the real-time news stream.
+            If None, it records until interrupted.
+        env_file_path (str): Path to the environment file.
+        logging_config_path (str): Path to the logging configuration file.
+
+    Returns:
+        None
+    """
+
+    initialize(logging_config_path=logging_config_path, env_file_path=env_file_path)
+
+    with NewsRecorder(output_file_path) as recorder:
+        if latest_n_days is not None:
+            to_datetime = datetime.datetime.now()
+            from_datetime = to_datetime - datetime.timedelta(days=latest_n_days)
+            logger.info(f"Recording news from {from_datetime} to {to_datetime}.")
+
+            client = alpaca_batch.build_alpaca_client(
+                from_datetime=from_datetime, to_datetime=to_datetime, recorder=recorder
+            )
+            while client.list():
+                pass
+        else:
+            logger.info("Recording the real-time news stream.")
+
+            client = alpaca_stream.build_alpaca_client(recorder=recorder)
+            client.start()
+            client.subscribe()
+
+            started_at = time.monotonic()
+            try:
+                while (
+                    duration_seconds is None
+                    or time.monotonic() - started_at < duration_seconds
+                ):
+                    client.recv()
+            except KeyboardInterrupt:
+                logger.info("Recording interrupted.")
+            finally:
+                client.close()
+
+
+if __name__ == "__main__":
+    Fire(record)
@@ -0,0 +1,266 @@
+import datetime
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Optional
+
+from bytewax.recovery import SqliteRecoveryConfig
+from bytewax.testing import cluster_main
+from fire import Fire
+from qdrant_client import QdrantClient
+
+from streaming_pipeline import constants, initialize
+from streaming_pipeline.collection import CollectionSpec
+from streaming_pipeline.embeddings import EmbeddingModelSingleton
+from streaming_pipeline.flow import build as flow_builder
+from streaming_pipeline.metrics import MetricsRegistry
+from streaming_pipeline.qdrant import build_qdrant_client
+from streaming_pipeline.reindex import (
+    CollectionReindexer,
+    build_target_collection_name,
+    swap_alias,
+    verify_reindex,
+    verify_vectors_config,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def reindex(
+    model_id: str = constants.EMBEDDING_MODEL_ID,
+    alias_name: str = constants.VECTOR_DB_OUTPUT_COLLECTION_NAME,
+    source_collection_name: Optional[str] = None,
+    input_path: Optional[str] = None,
+    log_dir: Optional[str] = None,
+    point_layout: str = "chunk",
+    normalize_payloads: bool = False,
+    partition_granularity: Optional[str] = None,
+    target_collection_name: Optional[str] = None,
+    batch_size: int = constants.REINDEX_BATCH_SIZE,
+    worker_count: Optional[int] = None,
+    checkpoint_dir: str = "data/reindex",
+    swap: bool = True,
+    replace_collection: bool = False,
+    env_file_path: str = ".env",
+    logging_config_path: str = "logging.yaml",
+    model_cache_dir: Optional[str] = None,
+):
+    """
+    Re-embeds the news into a new collection, then atomically switches the alias the bot reads to it (blue/green).
+
+    The chunks are re-embedded either from the stored collection, which keeps the chunks as they were indexed,
+    or from a raw archive (the dumps of tools.run_from_files or the log of tools.run_ingest),
+    which also applies the current cleaning & chunking. The progress is checkpointed, hence running the
+    same command again after an interruption resumes the reindex into the same collection.
+
+    Args:
+        model_id (str): The identifier of the new embedding model.
+        alias_name (str): The alias the bot & the streaming pipeline use.
+        source_collection_name (Optional[str]): The collection to re-embed. Defaults to the alias.
+        input_path (Optional[str]): If provided, the news are re-embedded from these dumps instead.
+        log_dir (Optional[str]): If provided, the news are re-embedded from this ingestion log instead.
+        point_layout (str): "chunk" to write one point per chunk or "article" to write a single point per news,
+            with one named vector for its headline, summary & content. Only when re-embedding an archive.
+        normalize_payloads (bool): Whether to store the metadata of every news once, in a payload-only collection,
+            while its chunks keep only the fields they are filtered by. Only when re-embedding an archive.
+        partition_granularity (Optional[str]): If provided, the news are written into daily ("day") or weekly
+            ("week") collections named after the new collection. Only when re-embedding an archive. The alias
+            is not switched, as the readers find the buckets by their base name.
+        target_collection_name (Optional[str]): The new collection. Defaults to a name derived from
+            the alias, the model & the time, reused when resuming.
+        batch_size (int): The number of chunks embedded at once, when re-embedding the stored collection.
+        worker_count (Optional[int]): The number of workers, when re-embedding an archive.
+            Defaults to the number of cores.
+        checkpoint_dir (str): The directory of the checkpoints.
+        swap (bool): Whether to switch the alias to the new collection once it is complete.
+        replace_collection (bool): Whether to delete a collection named like the alias, to replace it
+            with the alias. It is needed only once, when migrating a collection to aliases.
+        env_file_path (str): Path to the environment file.
+        logging_config_path (str): Path to the logging configuration file.
+        model_cache_dir (Optional[str]): Path to the directory where the model cache is stored.
+
+    Returns:
+        None
+
+    Raises:
+        ValueError: If the point layout, the normalized payloads or the partitioning are requested
+            when re-embedding the stored collection.
+    """
+
+    initialize(logging_config_path=logging_config_path, env_file_path=env_file_path)
+
+    is_archive = input_path is not None or log_dir is not None
+    if not is_archive and (
+        point_layout != "chunk"
+        or normalize_payloads is True
+        or partition_granularity is not None
+    ):
+        raise ValueError(
+            "The point layout, the normalized payloads and the partitioning only apply when re-embedding "
+            "an archive. Pass --input_path or --log_dir."
+        )
+
+    checkpoint_dir = Path(checkpoint_dir)
+    checkpoint_dir.mkdir(parents=True, exist_ok=True)
+    state_file_path = checkpoint_dir / f"{alias_name}.json"
+    target_collection_name = _resolve_target_collection_name(
+        state_file_path, alias_name, model_id, target_collection_name
+    )
+
+    # The model is a singleton, hence the flow of the archive mode embeds with it too.
+    model = EmbeddingModelSingleton(model_id=model_id, cache_dir=model_cache_dir)
+    client = build_qdrant_client()
+
+    if is_archive:
+        flow = flow_builder(
+            is_batch=True,
+            input_path=input_path,
+            log_dir=log_dir,
+            collection_name=target_collection_name,
+            model_cache_dir=model_cache_dir,
+            # Historical articles are always stale, hence alerting on their freshness is meaningless.
+            freshness_alert_threshold_seconds=None,
+            partition_granularity=partition_granularity,
+            point_layout=point_layout,
+            normalize_payloads=normalize_payloads,
+        )
+
+        # Bytewax creates the SQLite files of the workers, but not their directory.
+        recovery_dir = checkpoint_dir / target_collection_name
+        recovery_dir.mkdir(parents=True, exist_ok=True)
+
+        started_at = time.perf_counter()
+        cluster_main(
+            flow,
+            addresses=[],
+            proc_id=0,
+            epoch_interval=datetime.timedelta(seconds=10),
+            recovery_config=SqliteRecoveryConfig(str(recovery_dir)),
+            worker_count_per_proc=worker_count or os.cpu_count(),
+        )
+        elapsed_seconds = time.perf_counter() - started_at
+        n_documents = MetricsRegistry().get_counter("documents_written")
+        logger.info(
+            f"Reindexed {n_documents:.0f} news into {target_collection_name} in {elapsed_seconds:.1f}s "
+            f"[{n_documents / max(elapsed_seconds, 1e-9):.1f} news/s]"
+        )
+    else:
+        reindexer = CollectionReindexer(
+            client,
+            model=model,
+            source_collection_name=source_collection_name or alias_name,
+            target_spec=CollectionSpec(
+                collection_name=target_collection_name,
+                vector_size=model.embedding_size,
+            ),
+            batch_size=batch_size,
+            checkpoint_file_path=checkpoint_dir / f"{target_collection_name}.json",
+        )
+        results = reindexer.run()
+        logger.info(json.dumps(results, indent=2))
+
+    if partition_granularity is not None:
+        state_file_path.unlink(missing_ok=True)
+        logger.info(
+            f"The news were written into the {partition_granularity} buckets of {target_collection_name}. "
+            "Point the readers to this base name (e.g., the vector collection of the bot) to switch to them."
+        )
+
+        return
+
+    if swap is True and not _can_swap(
+        client,
+        alias_name=alias_name,
+        source_collection_name=None
+        if is_archive
+        else source_collection_name or alias_name,
+        target_collection_name=target_collection_name,
+    ):
+        return
+
+    if swap is True:
+        previous_collection_name = swap_alias(
+            client,
+            alias_name=alias_name,
+            collection_name=target_collection_name,
+            replace_collection=replace_collection,
+        )
+        state_file_path.unlink(missing_ok=True)
+        if previous_collection_name not in (None, alias_name):
+            logger.info(
+                f"Once the new collection is validated, drop the previous one: {previous_collection_name}"
+            )
+    else:
+        logger.info(
+            f"The alias {alias_name} was not switched. Run again with --swap to switch it "
+            f"to {target_collection_name}."
+        )
+
+
+def _can_swap(
+    client: QdrantClient,
+    alias_name: str,
+    source_collection_name: Optional[str],
+    target_collection_name: str,
+) -> bool:
+    """
+    Refuses to switch the alias to an empty collection, to one whose vectors are laid out differently
+    than the ones of the collection the alias points to or, when re-embedding a collection,
+    to one that doesn't hold as many points as its source.
+    """
+
+    try:
+        if client.count(collection_name=target_collection_name, exact=True).count == 0:
+            raise ValueError(f"Nothing was reindexed into {target_collection_name}.")
+        verify_vectors_config(
+            client,
+            current_collection_name=alias_name,
+            target_collection_name=target_collection_name,
+        )
+        if source_collection_name is not None:
+            verify_reindex(
+                client,
+                source_collection_name=source_collection_name,
+                target_collection_name=target_collection_name,
+            )
+    except ValueError as e:
+        logger.error(f"{e} The alias {alias_name} was not switched.")
+
+        return False
+
+    return True
+
+
+def _resolve_target_collection_name(
+    state_file_path: Path,
+    alias_name: str,
+    model_id: str,
+    target_collection_name: Optional[str],
+) -> str:
+    """
+    Reuses the collection of an interrupted reindex with the same model, so it is resumed.
+    """
+
+    if target_collection_name is None and state_file_path.exists():
+        state = json.loads(state_file_path.read_text())
+        if state["model_id"] == model_id:
+            logger.info(f"Resuming the reindex into {state['target_collection_name']}.")
+
+            return state["target_collection_name"]
+
+    target_collection_name = target_collection_name or build_target_collection_name(
+        alias_name, model_id
+    )
+    state_file_path.write_text(
+        json.dumps(
+            {"model_id": model_id, "target_collection_name": target_collection_name}
+        )
+    )
+
+    return target_collection_name
+
+
+if __name__ == "__main__":
+    Fire(reindex)
@@ -0,0 +1,78 @@
+import logging
+from typing import Optional
+
+from fire import Fire
+
+from streaming_pipeline import initialize
+from streaming_pipeline.alpaca_server import AlpacaNewsLocalServer, load_articles
+
+logger = logging.getLogger(__name__)
+
+
+def run(
+    host: str = "127.0.0.1",
+    port: int = 8090,
+    n_articles: int = 1000,
+    recording_file_path: Optional[str] = None,
+    stream_rate: float = 10.0,
+    latency_seconds: float = 0.0,
+    latency_jitter_seconds: float = 0.0,
+    error_rate: float = 0.0,
+    seed: Optional[int] = 42,
+    logging_config_path: str = "logging.yaml",
+):
+    """
+    Runs a local stand-in of the Alpaca news RESTful & websocket APIs.
+
+    Point the streaming pipeline to it by setting the ALPACA_NEWS_BATCH_URL & ALPACA_NEWS_STREAM_URL
+    environment variables to the URLs logged at startup.
+
+    Args:
+        host (str): The host to bind to.
+        port (int): The port to bind to.
+        n_articles (int): The number of synthetic articles to serve.
+        recording_file_path (Optional[str]): If provided, the articles are loaded from this recording instead.
+        stream_rate (float): How many articles per second are pushed to every websocket subscriber.
+        latency_seconds (float): The latency injected before every response and websocket message.
+        latency_jitter_seconds (float): The maximum random jitter added to the injected latency.
+        error_rate (float): The probability of a request or a websocket message to fail.
+        seed (Optional[int]): The seed of the random generator used for the latency jitter & errors.
+        logging_config_path (str): Path to the logging configuration file.
+
+    Returns:
+        None
+
+    Raises:
+        ValueError: If the stream rate isn't positive.
+    """
+
+    if stream_rate <= 0:
+        raise ValueError(f"The stream rate must be positive, got {stream_rate}.")
+
+    initialize(logging_config_path=logging_config_path)
+
+    server = AlpacaNewsLocalServer(
+        articles=load_articles(
+            n_articles=n_articles, recording_file_path=recording_file_path
+        ),
+        host=host,
+        port=port,
+        stream_rate=stream_rate,
+        latency_seconds=latency_seconds,
+        latency_jitter_seconds=latency_jitter_seconds,
+        error_rate=error_rate,
+        seed=seed,
+    )
+    logger.info(f"ALPACA_NEWS_BATCH_URL={server.rest_url}")
+    logger.info(f"ALPACA_NEWS_STREAM_URL={server.stream_url}")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Stopping the local Alpaca news server.")
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    Fire(run)
@@ -1,5 +1,6 @@
 import datetime
 import logging
+from typing import Optional
 
 from streaming_pipeline import initialize
 from streaming_pipeline.flow import build as flow_builder
@@ -9,7 +10,15 @@ def build_flow(
     env_file_path: str = ".env",
     logging_config_path: str = "logging.yaml",
     model_cache_dir: str = None,
+    metrics_port: Optional[int] = None,
+    metrics_snapshot_path: Optional[str] = None,
     latest_n_days: int = 4,
+    near_duplicate_policy: Optional[str] = None,
+    boilerplate_file_path: Optional[str] = None,
+    partition_granularity: Optional[str] = None,
+    retention_days: Optional[float] = None,
+    point_layout: str = "chunk",
+    normalize_payloads: bool = False,
     debug: bool = False,
 ):
     """
@@ -19,7 +28,21 @@ def build_flow(
         env_file_path (str): Path to the environment file.
         logging_config_path (str): Path to the logging configuration file.
         model_cache_dir (str): Path to the directory where the model cache is stored.
+        metrics_port (Optional[int]): If provided, the Prometheus metrics are exposed on this port.
+        metrics_snapshot_path (Optional[str]): If provided, the Prometheus metrics are periodically
+            written to this file.
         latest_n_days (int): Number of days to extract news from.
+        near_duplicate_policy (Optional[str]): Either "drop" or "link" the news whose content
+            is a near-duplicate of a recent one. Use None to keep them.
+        boilerplate_file_path (Optional[str]): If provided, the paragraphs that recur across many news
+            are learned, persisted to this file and stripped before chunking.
+        partition_granularity (Optional[str]): If provided, the news are written into daily ("day")
+            or weekly ("week") collections.
+        retention_days (Optional[float]): If provided, the daily or weekly collections older than this are dropped.
+        point_layout (str): "chunk" to write one point per chunk or "article" to write a single point per news,
+            with one named vector for its headline, summary & content.
+        normalize_payloads (bool): Whether to store the metadata of every news once, in a payload-only collection,
+            while its chunks keep only the fields they are filtered by.
         debug (bool): Whether to run the flow in debug mode.
 
     Returns:
@@ -41,6 +64,17 @@ def build_flow(
         from_datetime=from_datetime,
         to_datetime=to_datetime,
         model_cache_dir=model_cache_dir,
+        metrics_port=metrics_port,
+        metrics_snapshot_path=metrics_snapshot_path,
+        # Historical articles are always stale, hence alerting on their freshness is meaningless.
+        freshness_alert_threshold_seconds=None,
+        near_duplicate_policy=near_duplicate_policy,
+        strip_boilerplate=boilerplate_file_path is not None,
+        boilerplate_file_path=boilerplate_file_path,
+        partition_granularity=partition_granularity,
+        retention_days=retention_days,
+        point_layout=point_layout,
+        normalize_payloads=normalize_payloads,
         debug=debug,
     )
 
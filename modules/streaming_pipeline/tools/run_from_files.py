@@ -0,0 +1,67 @@
+from typing import Optional
+
+from streaming_pipeline import initialize
+from streaming_pipeline.flow import build as flow_builder
+
+
+def build_flow(
+    input_path: str,
+    env_file_path: str = ".env",
+    logging_config_path: str = "logging.yaml",
+    model_cache_dir: str = None,
+    metrics_port: Optional[int] = None,
+    metrics_snapshot_path: Optional[str] = None,
+    near_duplicate_policy: Optional[str] = None,
+    boilerplate_file_path: Optional[str] = None,
+    local_vector_store_dir: Optional[str] = None,
+    point_layout: str = "chunk",
+    normalize_payloads: bool = False,
+    debug: bool = False,
+):
+    """
+    Builds a Bytewax flow that embeds historical news from JSON, JSONL or Parquet dumps.
+
+    Args:
+        input_path (str): A file, a directory or a glob pattern of the dumps (e.g., "data/news_*.jsonl").
+        env_file_path (str): Path to the environment file.
+        logging_config_path (str): Path to the logging configuration file.
+        model_cache_dir (str): Path to the directory where the model cache is stored.
+        metrics_port (Optional[int]): If provided, the Prometheus metrics are exposed on this port.
+        metrics_snapshot_path (Optional[str]): If provided, the Prometheus metrics are periodically
+            written to this file.
+        near_duplicate_policy (Optional[str]): Either "drop" or "link" the news whose content
+            is a near-duplicate of a recent one. Use None to keep them.
+        boilerplate_file_path (Optional[str]): If provided, the paragraphs that recur across many news
+            are learned, persisted to this file and stripped before chunking.
+        local_vector_store_dir (Optional[str]): If provided, the embeddings are written into the embedded
+            local vector store persisted in this directory instead of Qdrant.
+        point_layout (str): "chunk" to write one point per chunk or "article" to write a single point per news,
+            with one named vector for its headline, summary & content.
+        normalize_payloads (bool): Whether to store the metadata of every news once, in a payload-only collection,
+            while its chunks keep only the fields they are filtered by.
+        debug (bool): Whether to write the embeddings into an in-memory vector DB.
+
+    Returns:
+        flow (prefect.Flow): The Bytewax flow for embedding the news dumps.
+    """
+
+    initialize(logging_config_path=logging_config_path, env_file_path=env_file_path)
+
+    flow = flow_builder(
+        is_batch=True,
+        input_path=input_path,
+        model_cache_dir=model_cache_dir,
+        metrics_port=metrics_port,
+        metrics_snapshot_path=metrics_snapshot_path,
+        # Historical articles are always stale, hence alerting on their freshness is meaningless.
+        freshness_alert_threshold_seconds=None,
+        near_duplicate_policy=near_duplicate_policy,
+        strip_boilerplate=boilerplate_file_path is not None,
+        boilerplate_file_path=boilerplate_file_path,
+        local_vector_store_dir=local_vector_store_dir,
+        point_layout=point_layout,
+        normalize_payloads=normalize_payloads,
+        debug=debug,
+    )
+
+    return flow
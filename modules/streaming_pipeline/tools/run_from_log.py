@@ -0,0 +1,59 @@
+from typing import Optional
+
+from streaming_pipeline import constants, initialize
+from streaming_pipeline.flow import build as flow_builder
+
+
+def build_flow(
+    log_dir: str = "data/news_log",
+    env_file_path: str = ".env",
+    logging_config_path: str = "logging.yaml",
+    model_cache_dir: str = None,
+    follow: bool = True,
+    metrics_port: Optional[int] = None,
+    metrics_snapshot_path: Optional[str] = None,
+    freshness_alert_threshold_seconds: Optional[
+        float
+    ] = constants.FRESHNESS_ALERT_THRESHOLD_SECONDS,
+    deferred_content_window_seconds: Optional[float] = None,
+    debug: bool = False,
+):
+    """
+    Builds a Bytewax flow that embeds the news consumed from the segment-file log written by tools.run_ingest.
+
+    Args:
+        log_dir (str, optional): Path to the directory of the log. Defaults to "data/news_log".
+        env_file_path (str, optional): Path to the environment file. Defaults to ".env".
+        logging_config_path (str, optional): Path to the logging configuration file. Defaults to "logging.yaml".
+        model_cache_dir (str, optional): Path to the directory where the model cache is stored. Defaults to None.
+        follow (bool, optional): Whether to keep waiting for new news at the end of the log, or to stop
+            once the whole log is consumed (e.g., to re-embed the news with a new model). Defaults to True.
+        metrics_port (Optional[int], optional): If provided, the Prometheus metrics are exposed on this port.
+            Defaults to None.
+        metrics_snapshot_path (Optional[str], optional): If provided, the Prometheus metrics are periodically
+            written to this file. Defaults to None.
+        freshness_alert_threshold_seconds (Optional[float], optional): A warning is logged for every news
+            that becomes searchable later than this after its creation. Use None when replaying old news.
+            Defaults to constants.FRESHNESS_ALERT_THRESHOLD_SECONDS.
+        deferred_content_window_seconds (Optional[float], optional): If provided, the news are indexed in
+            two phases. Defaults to None.
+        debug (bool, optional): Whether to write the embeddings into an in-memory vector DB. Defaults to False.
+
+    Returns:
+        flow (prefect.Flow): The Bytewax flow for embedding the news from the log.
+    """
+
+    initialize(logging_config_path=logging_config_path, env_file_path=env_file_path)
+
+    flow = flow_builder(
+        is_batch=not follow,
+        log_dir=log_dir,
+        model_cache_dir=model_cache_dir,
+        metrics_port=metrics_port,
+        metrics_snapshot_path=metrics_snapshot_path,
+        freshness_alert_threshold_seconds=freshness_alert_threshold_seconds,
+        deferred_content_window_seconds=deferred_content_window_seconds,
+        debug=debug,
+    )
+
+    return flow
@@ -0,0 +1,55 @@
+import datetime
+import logging
+from typing import Optional
+
+from streaming_pipeline import initialize
+from streaming_pipeline.flow import build_ingest as flow_builder
+
+
+def build_flow(
+    log_dir: str = "data/news_log",
+    env_file_path: str = ".env",
+    logging_config_path: str = "logging.yaml",
+    backfill_n_days: Optional[int] = None,
+    retention_days: Optional[float] = None,
+    debug: bool = False,
+):
+    """
+    Builds a Bytewax flow that ingests the real-time news into a local segment-file log.
+
+    Args:
+        log_dir (str, optional): Path to the directory of the log. Defaults to "data/news_log".
+        env_file_path (str, optional): Path to the environment file. Defaults to ".env".
+        logging_config_path (str, optional): Path to the logging configuration file. Defaults to "logging.yaml".
+        backfill_n_days (Optional[int], optional): If provided, the news from the latest N days are also ingested
+            in a low-priority lane. Defaults to None.
+        retention_days (Optional[float], optional): If provided, the segments older than this are deleted.
+            Defaults to None.
+        debug (bool, optional): Whether to ingest mocked news. Defaults to False.
+
+    Returns:
+        flow (prefect.Flow): The Bytewax flow for ingesting the news.
+    """
+
+    initialize(logging_config_path=logging_config_path, env_file_path=env_file_path)
+
+    from_datetime = None
+    to_datetime = None
+    if backfill_n_days is not None:
+        to_datetime = datetime.datetime.now()
+        from_datetime = to_datetime - datetime.timedelta(days=backfill_n_days)
+        logging.getLogger(__name__).info(
+            f"Backfilling news from {from_datetime} to {to_datetime} [n_days={backfill_n_days}]"
+        )
+
+    flow = flow_builder(
+        log_dir=log_dir,
+        from_datetime=from_datetime,
+        to_datetime=to_datetime,
+        retention_seconds=retention_days * 24 * 60 * 60
+        if retention_days is not None
+        else None,
+        debug=debug,
+    )
+
+    return flow
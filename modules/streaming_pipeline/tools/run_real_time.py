@@ -1,4 +1,8 @@
-from streaming_pipeline import initialize
+import datetime
+import logging
+from typing import Optional
+
+from streaming_pipeline import constants, initialize
 from streaming_pipeline.flow import build as flow_builder
 
 
@@ -6,6 +10,25 @@ def build_flow(
     env_file_path: str = ".env",
     logging_config_path: str = "logging.yaml",
     model_cache_dir: str = None,
+    metrics_port: Optional[int] = None,
+    metrics_snapshot_path: Optional[str] = None,
+    autoscaling_file_path: Optional[str] = None,
+    current_workers: int = 1,
+    freshness_alert_threshold_seconds: Optional[
+        float
+    ] = constants.FRESHNESS_ALERT_THRESHOLD_SECONDS,
+    backfill_n_days: Optional[int] = None,
+    divert_oversized: bool = False,
+    deferred_content_window_seconds: Optional[
+        float
+    ] = constants.DEFERRED_CONTENT_WINDOW_SECONDS,
+    coalesce_window_seconds: Optional[float] = None,
+    near_duplicate_policy: Optional[str] = None,
+    boilerplate_file_path: Optional[str] = None,
+    partition_granularity: Optional[str] = None,
+    retention_days: Optional[float] = None,
+    point_layout: str = "chunk",
+    normalize_payloads: bool = False,
     debug: bool = False,
 ):
     """
@@ -15,6 +38,40 @@ def build_flow(
         env_file_path (str, optional): Path to the environment file. Defaults to ".env".
         logging_config_path (str, optional): Path to the logging configuration file. Defaults to "logging.yaml".
         model_cache_dir (str, optional): Path to the directory where the model cache is stored. Defaults to None.
+        metrics_port (Optional[int], optional): If provided, the Prometheus metrics are exposed on this port.
+            Defaults to None.
+        metrics_snapshot_path (Optional[str], optional): If provided, the Prometheus metrics are periodically
+            written to this file. Defaults to None.
+        autoscaling_file_path (Optional[str], optional): If provided, the autoscaling signal, including the
+            recommended number of workers, is periodically written as JSON to this file. Defaults to None.
+        current_workers (int, optional): The number of workers of this process (the `-w` option of Bytewax).
+            With multiple processes (`-p`), every process recommends the workers for its own share of the stream
+            only. Defaults to 1.
+        freshness_alert_threshold_seconds (Optional[float], optional): A warning is logged for every article
+            that becomes searchable later than this after its creation.
+            Defaults to constants.FRESHNESS_ALERT_THRESHOLD_SECONDS.
+        backfill_n_days (Optional[int], optional): If provided, the news from the latest N days are backfilled
+            in a low-priority lane that only consumes the throughput left unused by the real-time news.
+            Defaults to None.
+        divert_oversized (bool, optional): Whether to divert the oversized real-time news to the low-priority
+            lane. Defaults to False.
+        deferred_content_window_seconds (Optional[float], optional): The headline & summary of the news are
+            indexed right away, while their contents are batched in windows of this length. Use None to index
+            the whole news at once. Defaults to constants.DEFERRED_CONTENT_WINDOW_SECONDS.
+        coalesce_window_seconds (Optional[float], optional): If provided, only the latest revision of the news
+            received within the same window of this length is processed. Defaults to None.
+        near_duplicate_policy (Optional[str], optional): Either "drop" or "link" the news whose content
+            is a near-duplicate of a recent one. Defaults to None.
+        boilerplate_file_path (Optional[str], optional): If provided, the paragraphs that recur across many news
+            are learned, persisted to this file and stripped before chunking. Defaults to None.
+        partition_granularity (Optional[str], optional): If provided, the news are written into daily ("day")
+            or weekly ("week") collections. Defaults to None.
+        retention_days (Optional[float], optional): If provided, the daily or weekly collections older than this
+            are dropped. Defaults to None.
+        point_layout (str, optional): "chunk" to write one point per chunk or "article" to write a single point
+            per news, with one named vector for its headline, summary & content. Defaults to "chunk".
+        normalize_payloads (bool, optional): Whether to store the metadata of every news once, in a payload-only
+            collection, while its chunks keep only the fields they are filtered by. Defaults to False.
         debug (bool, optional): Whether to run the flow in debug mode. Defaults to False.
 
     Returns:
@@ -23,6 +80,38 @@ def build_flow(
 
     initialize(logging_config_path=logging_config_path, env_file_path=env_file_path)
 
-    flow = flow_builder(model_cache_dir=model_cache_dir, debug=debug)
+    from_datetime = None
+    to_datetime = None
+    if backfill_n_days is not None:
+        to_datetime = datetime.datetime.now()
+        from_datetime = to_datetime - datetime.timedelta(days=backfill_n_days)
+        logging.getLogger(__name__).info(
+            f"Backfilling news from {from_datetime} to {to_datetime} [n_days={backfill_n_days}]"
+        )
+
+    flow = flow_builder(
+        from_datetime=from_datetime,
+        to_datetime=to_datetime,
+        model_cache_dir=model_cache_dir,
+        metrics_port=metrics_port,
+        metrics_snapshot_path=metrics_snapshot_path,
+        autoscaling_file_path=autoscaling_file_path,
+        current_workers=current_workers,
+        freshness_alert_threshold_seconds=freshness_alert_threshold_seconds,
+        divert_oversized=divert_oversized,
+        # A single point per news can't be indexed in two phases.
+        deferred_content_window_seconds=deferred_content_window_seconds
+        if point_layout == "chunk"
+        else None,
+        coalesce_window_seconds=coalesce_window_seconds,
+        near_duplicate_policy=near_duplicate_policy,
+        strip_boilerplate=boilerplate_file_path is not None,
+        boilerplate_file_path=boilerplate_file_path,
+        partition_granularity=partition_granularity,
+        retention_days=retention_days,
+        point_layout=point_layout,
+        normalize_payloads=normalize_payloads,
+        debug=debug,
+    )
 
     return flow
@@ -0,0 +1,59 @@
+from typing import Optional
+
+from streaming_pipeline import initialize
+from streaming_pipeline.flow import build as flow_builder
+
+
+def build_flow(
+    replay_file_path: str,
+    replay_speed: Optional[float] = 1.0,
+    env_file_path: str = ".env",
+    logging_config_path: str = "logging.yaml",
+    model_cache_dir: str = None,
+    metrics_port: Optional[int] = None,
+    metrics_snapshot_path: Optional[str] = None,
+    autoscaling_history_file_path: Optional[str] = None,
+    current_workers: int = 1,
+    debug: bool = False,
+):
+    """
+    Builds a Bytewax flow that replays a recording of Alpaca news messages.
+
+    Args:
+        replay_file_path (str): Path to the compressed JSONL recording created by `tools.record`.
+        replay_speed (Optional[float], optional): The replay speed relative to the recording, e.g. 10.0 for 10x.
+            Use None or 0 to replay as fast as possible. Defaults to 1.0.
+        env_file_path (str, optional): Path to the environment file. Defaults to ".env".
+        logging_config_path (str, optional): Path to the logging configuration file. Defaults to "logging.yaml".
+        model_cache_dir (str, optional): Path to the directory where the model cache is stored. Defaults to None.
+        metrics_port (Optional[int], optional): If provided, the Prometheus metrics are exposed on this port.
+            Defaults to None.
+        metrics_snapshot_path (Optional[str], optional): If provided, the Prometheus metrics are periodically
+            written to this file. Defaults to None.
+        autoscaling_history_file_path (Optional[str], optional): If provided, the autoscaling signal is
+            simulated for the recorded news volume and appended as JSON lines to this file. Defaults to None.
+        current_workers (int, optional): The number of workers of this process (the `-w` option of Bytewax).
+            With multiple processes (`-p`), every process recommends the workers for its own share of the stream
+            only. Defaults to 1.
+        debug (bool, optional): Whether to run the flow in debug mode. Defaults to False.
+
+    Returns:
+        flow (prefect.Flow): The Bytewax flow for replaying the recorded news.
+    """
+
+    initialize(logging_config_path=logging_config_path, env_file_path=env_file_path)
+
+    flow = flow_builder(
+        replay_file_path=replay_file_path,
+        replay_speed=replay_speed,
+        model_cache_dir=model_cache_dir,
+        metrics_port=metrics_port,
+        metrics_snapshot_path=metrics_snapshot_path,
+        autoscaling_history_file_path=autoscaling_history_file_path,
+        current_workers=current_workers,
+        # Historical articles are always stale, hence alerting on their freshness is meaningless.
+        freshness_alert_threshold_seconds=None,
+        debug=debug,
+    )
+
+    return flow
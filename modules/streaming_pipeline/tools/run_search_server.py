@@ -0,0 +1,86 @@
+import logging
+from typing import Optional
+
+from fire import Fire
+
+from streaming_pipeline import constants, initialize
+from streaming_pipeline.collection import CollectionSpec
+from streaming_pipeline.document_store import DocumentStore
+from streaming_pipeline.embeddings import EmbeddingModelSingleton
+from streaming_pipeline.qdrant import build_qdrant_client
+from streaming_pipeline.search import NewsSearcher
+from streaming_pipeline.search_server import SearchServer
+from streaming_pipeline.vector_store import LocalVectorStore
+
+logger = logging.getLogger(__name__)
+
+
+def run(
+    host: str = "127.0.0.1",
+    port: int = constants.SEARCH_SERVER_PORT,
+    partition_granularity: Optional[str] = None,
+    horizon_days: Optional[float] = None,
+    local_vector_store_dir: Optional[str] = None,
+    vector_name: Optional[str] = None,
+    normalized_payloads: bool = False,
+    env_file_path: str = ".env",
+    logging_config_path: str = "logging.yaml",
+):
+    """
+    Runs a long-lived search daemon, which keeps the embedding model & the vector DB client warm.
+
+    Query it with `python -m tools.search_client`, which returns in milliseconds instead of
+    loading the model on every invocation.
+
+    Args:
+        host (str): The host to bind to.
+        port (int): The port to bind to.
+        partition_granularity (Optional[str]): If the news are written into daily ("day") or weekly ("week")
+            collections, search them in parallel and merge their hits.
+        horizon_days (Optional[float]): If provided, together with partition_granularity, only the news
+            from the latest N days are searched.
+        local_vector_store_dir (Optional[str]): If provided, search the embedded local vector store
+            persisted in this directory instead of Qdrant.
+        vector_name (Optional[str]): If the news are written with the "article" point layout, the named vector
+            to search: "headline", "summary" or "content".
+        normalized_payloads (bool): Whether the news are written with normalized payloads, hence the hits
+            are hydrated with the metadata of their articles.
+        env_file_path (str): Path to the environment file.
+        logging_config_path (str): Path to the logging configuration file.
+
+    Returns:
+        None
+    """
+
+    initialize(logging_config_path=logging_config_path, env_file_path=env_file_path)
+
+    if local_vector_store_dir is not None:
+        client = LocalVectorStore(dir_path=local_vector_store_dir)
+    else:
+        client = build_qdrant_client()
+    model = EmbeddingModelSingleton()
+    searcher = NewsSearcher(
+        client,
+        model=model,
+        collection_spec=CollectionSpec(
+            collection_name=constants.VECTOR_DB_OUTPUT_COLLECTION_NAME,
+            vector_size=model.embedding_size,
+        ),
+        partition_granularity=partition_granularity,
+        horizon_days=horizon_days,
+        vector_name=vector_name,
+        document_store=DocumentStore(client) if normalized_payloads else None,
+    )
+    searcher.warm_up()
+
+    server = SearchServer(searcher, host=host, port=port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Stopping the search server.")
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    Fire(run)
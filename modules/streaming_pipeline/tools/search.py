@@ -1,39 +1,185 @@
+import json
 import logging
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterator, List, Optional, Sequence
 
+import numpy as np
 from fire import Fire
 
 from streaming_pipeline import constants, initialize
+from streaming_pipeline.collection import CollectionSpec
+from streaming_pipeline.document_store import DocumentStore
 from streaming_pipeline.embeddings import EmbeddingModelSingleton
 from streaming_pipeline.qdrant import build_qdrant_client
+from streaming_pipeline.search import NewsSearcher, to_result
+from streaming_pipeline.utils import read_queries
+from streaming_pipeline.vector_store import LocalVectorStore
 
 logger = logging.getLogger(__name__)
 
 
-def search(query_string: str):
+def search(
+    query_string: Optional[str] = None,
+    queries_file_path: Optional[str] = None,
+    output_file_path: str = "data/search_results.jsonl",
+    limit: int = 5,
+    batch_size: int = 32,
+    concurrency: int = 8,
+    n_repeats: int = 1,
+    partition_granularity: Optional[str] = None,
+    horizon_days: Optional[float] = None,
+    local_vector_store_dir: Optional[str] = None,
+    vector_name: Optional[str] = None,
+    normalized_payloads: bool = False,
+):
     """
     Searches for the closest points to the given query string in the vector database.
 
+    In batch mode, the queries are read from a file, embedded in batches and searched concurrently,
+    while the embedding of the next batch overlaps with the searches of the previous one. The hits are
+    written as JSONL, in the order of the queries, and the throughput & the latency percentiles of
+    the embedding (per batch) and of the search (per query) are reported. Thus, it doubles as a load generator.
+
     Args:
-        query_string (str): The query string to search for.
+        query_string (Optional[str]): The query string to search for.
+        queries_file_path (Optional[str]): If provided, search the queries of this file instead: one per line,
+            either as plain text or as a JSON object with a "query" field.
+        output_file_path (str): The JSONL file the hits of the batch mode are written to.
+        limit (int): The number of closest points to return per query.
+        batch_size (int): The number of queries embedded at once, in batch mode.
+        concurrency (int): The maximum number of concurrent searches, in batch mode.
+        n_repeats (int): The number of times the queries are searched, in batch mode, e.g., to generate load.
+        partition_granularity (Optional[str]): If the news are written into daily ("day") or weekly ("week")
+            collections, search them in parallel and merge their hits.
+        horizon_days (Optional[float]): If provided, together with partition_granularity, only the news
+            from the latest N days are searched.
+        local_vector_store_dir (Optional[str]): If provided, search the embedded local vector store
+            persisted in this directory instead of Qdrant.
+        vector_name (Optional[str]): If the news are written with the "article" point layout, the named vector
+            to search: "headline", "summary" or "content".
+        normalized_payloads (bool): Whether the news are written with normalized payloads, hence the hits
+            are hydrated with the metadata of their articles.
 
     Returns:
         None
     """
 
+    if (query_string is None) == (queries_file_path is None):
+        raise ValueError("Provide either a query_string or a queries_file_path.")
+
     initialize()
 
-    client = build_qdrant_client()
+    if local_vector_store_dir is not None:
+        client = LocalVectorStore(dir_path=local_vector_store_dir)
+    else:
+        client = build_qdrant_client()
     model = EmbeddingModelSingleton()
+    searcher = NewsSearcher(
+        client,
+        model=model,
+        collection_spec=CollectionSpec(
+            collection_name=constants.VECTOR_DB_OUTPUT_COLLECTION_NAME,
+            vector_size=model.embedding_size,
+        ),
+        partition_granularity=partition_granularity,
+        horizon_days=horizon_days,
+        vector_name=vector_name,
+        document_store=DocumentStore(client) if normalized_payloads else None,
+    )
+
+    if query_string is not None:
+        for hit in searcher.search(searcher.embed(query_string)[0].tolist(), limit):
+            logger.info(hit)
+    else:
+        _search_batch(
+            searcher,
+            queries=read_queries(queries_file_path) * n_repeats,
+            limit=limit,
+            output_file_path=Path(output_file_path),
+            batch_size=batch_size,
+            concurrency=concurrency,
+        )
+
+
+def _search_batch(
+    searcher: NewsSearcher,
+    queries: List[str],
+    limit: int,
+    output_file_path: Path,
+    batch_size: int,
+    concurrency: int,
+) -> None:
+    embed_latencies = []
+    search_latencies = []
+    pending = deque()
+
+    def write_completed(f, max_pending: int) -> None:
+        # The hits are written in the order of the queries, as soon as the oldest search completes.
+        while len(pending) > max_pending or (len(pending) > 0 and pending[0][1].done()):
+            query, future = pending.popleft()
+            hits, latency = future.result()
+            search_latencies.append(latency)
+            f.write(f"{json.dumps(to_result(query, hits, latency), default=str)}\n")
+
+    if len(queries) > 0:
+        # Warm up the model & the connection, so the percentiles measure the steady state.
+        searcher.search(searcher.embed(queries[0])[0].tolist(), limit=limit)
+
+    output_file_path.parent.mkdir(parents=True, exist_ok=True)
+    started_at = time.perf_counter()
+    with open(output_file_path, "w") as f, ThreadPoolExecutor(
+        max_workers=concurrency
+    ) as executor:
+        for batch in _batched(queries, batch_size):
+            embedded_at = time.perf_counter()
+            embeddings = searcher.embed(batch)
+            embed_latencies.append(time.perf_counter() - embedded_at)
+
+            for query, embedding in zip(batch, embeddings):
+                pending.append(
+                    (
+                        query,
+                        executor.submit(
+                            searcher.timed_search, embedding.tolist(), limit
+                        ),
+                    )
+                )
+            # Bound the queued searches, so the embedding doesn't run arbitrarily ahead.
+            write_completed(f, max_pending=2 * concurrency)
+        write_completed(f, max_pending=0)
+    elapsed_seconds = time.perf_counter() - started_at
+
+    logger.info(
+        f"Searched {len(queries)} queries in {elapsed_seconds:.2f}s "
+        f"[{len(queries) / elapsed_seconds:.1f} queries/s, concurrency={concurrency}]"
+    )
+    logger.info(
+        f"Embedding per batch of {batch_size}: {_format_percentiles(embed_latencies)}"
+    )
+    logger.info(f"Search per query: {_format_percentiles(search_latencies)}")
+    logger.info(f"Hits written to {output_file_path}.")
+
+
+def _batched(items: List[str], batch_size: int) -> Iterator[List[str]]:
+    for start in range(0, len(items), batch_size):
+        yield items[start : start + batch_size]
+
+
+def _format_percentiles(
+    latencies: List[float], percentiles: Sequence[float] = (50, 95, 99)
+) -> str:
+    if len(latencies) == 0:
+        return "n/a"
 
-    query_embedding = model(query_string, to_list=True)
+    values = np.percentile(np.asarray(latencies) * 1000, percentiles)
 
-    hits = client.search(
-        collection_name=constants.VECTOR_DB_OUTPUT_COLLECTION_NAME,
-        query_vector=query_embedding,
-        limit=5,  # Return 5 closest points
+    return ", ".join(
+        f"p{percentile:g}={value:.2f}ms"
+        for percentile, value in zip(percentiles, values)
     )
-    for hit in hits:
-        logger.info(hit)
 
 
 if __name__ == "__main__":
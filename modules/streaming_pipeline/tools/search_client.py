@@ -0,0 +1,58 @@
+import json
+import logging
+from typing import Optional
+
+from fire import Fire
+
+from streaming_pipeline import initialize
+from streaming_pipeline.search_client import SearchClient
+from streaming_pipeline.utils import read_queries
+
+logger = logging.getLogger(__name__)
+
+
+def search(
+    query_string: Optional[str] = None,
+    queries_file_path: Optional[str] = None,
+    limit: int = 5,
+    url: Optional[str] = None,
+    batch_size: int = 32,
+    logging_config_path: str = "logging.yaml",
+):
+    """
+    Searches the closest news through a running search daemon (see tools.run_search_server)
+    and prints the results of every query as a JSON line.
+
+    Args:
+        query_string (Optional[str]): The query string to search for.
+        queries_file_path (Optional[str]): If provided, search the queries of this file instead: one per line,
+            either as plain text or as a JSON object with a "query" field.
+        limit (int): The number of closest points to return per query.
+        url (Optional[str]): The URL of the search daemon. Defaults to the local one.
+        batch_size (int): The number of queries sent per request.
+        logging_config_path (str): Path to the logging configuration file.
+
+    Returns:
+        None
+    """
+
+    if (query_string is None) == (queries_file_path is None):
+        raise ValueError("Provide either a query_string or a queries_file_path.")
+
+    initialize(logging_config_path=logging_config_path, env_file_path=None)
+
+    if query_string is not None:
+        queries = [query_string]
+    else:
+        queries = read_queries(queries_file_path)
+
+    with SearchClient(url=url) as client:
+        for start in range(0, len(queries), batch_size):
+            for result in client.search(
+                queries[start : start + batch_size], limit=limit
+            ):
+                print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    Fire(search)
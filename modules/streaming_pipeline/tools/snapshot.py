@@ -0,0 +1,82 @@
+import json
+import logging
+from typing import Optional
+
+from fire import Fire
+
+from streaming_pipeline import constants, initialize
+from streaming_pipeline.qdrant import build_qdrant_client
+from streaming_pipeline.snapshot import export_collection, import_collection
+
+logger = logging.getLogger(__name__)
+
+
+def export_snapshot(
+    file_path: str,
+    collection_name: str = constants.VECTOR_DB_OUTPUT_COLLECTION_NAME,
+    batch_size: int = constants.SNAPSHOT_BATCH_SIZE,
+    env_file_path: str = ".env",
+    logging_config_path: str = "logging.yaml",
+):
+    """
+    Exports the IDs, embeddings & payloads of a collection to a Parquet or Arrow IPC file.
+
+    Args:
+        file_path (str): The output file, e.g., "data/snapshots/news.parquet" or "data/snapshots/news.arrow".
+        collection_name (str): The collection (or alias) to export.
+        batch_size (int): The number of points scrolled at once.
+        env_file_path (str): Path to the environment file.
+        logging_config_path (str): Path to the logging configuration file.
+
+    Returns:
+        None
+    """
+
+    initialize(logging_config_path=logging_config_path, env_file_path=env_file_path)
+
+    results = export_collection(
+        build_qdrant_client(),
+        collection_name=collection_name,
+        file_path=file_path,
+        batch_size=batch_size,
+    )
+    logger.info(json.dumps(results, indent=2))
+
+
+def import_snapshot(
+    file_path: str,
+    collection_name: Optional[str] = None,
+    batch_size: int = constants.SNAPSHOT_BATCH_SIZE,
+    parallel: int = constants.SNAPSHOT_IMPORT_PARALLELISM,
+    env_file_path: str = ".env",
+    logging_config_path: str = "logging.yaml",
+):
+    """
+    Bulk-loads a snapshot written by export_snapshot into a collection.
+
+    Args:
+        file_path (str): The snapshot file.
+        collection_name (Optional[str]): The collection to load into. Defaults to the exported collection.
+        batch_size (int): The number of points uploaded at once.
+        parallel (int): The number of concurrent uploads.
+        env_file_path (str): Path to the environment file.
+        logging_config_path (str): Path to the logging configuration file.
+
+    Returns:
+        None
+    """
+
+    initialize(logging_config_path=logging_config_path, env_file_path=env_file_path)
+
+    results = import_collection(
+        build_qdrant_client(),
+        file_path=file_path,
+        collection_name=collection_name,
+        batch_size=batch_size,
+        parallel=parallel,
+    )
+    logger.info(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    Fire({"export": export_snapshot, "import": import_snapshot})